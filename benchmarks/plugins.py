@@ -0,0 +1,165 @@
+"""Measure CLI startup against a growing number of synthetic plugins.
+
+For each plugin count, generates that many plugin distributions in a temporary
+directory, each registering an `anaconda_cli.subcommand` entry point with a Typer
+app of the given number of commands. Then times, in fresh subprocesses:
+
+* help: `anaconda --help`
+* version: `anaconda --version`
+* plugin-help: `anaconda bench-plugin-0 --help`
+* noop: `anaconda bench-plugin-0 noop`, a command which does nothing
+
+and writes the timings to stdout (or --output) as JSON:
+
+    python benchmarks/plugins.py --plugins 1,10,50,200 --commands 5 --runs 10
+
+Each scenario gets one untimed warm-up run, so the plugin index and the help cache
+are populated as they would be for a user; --no-cache disables both.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+
+from startup import COLD
+from startup import summarize
+from startup import time_runs
+
+from anaconda_cli_base import __version__
+
+SCENARIOS = {
+    "help": ["--help"],
+    "version": ["--version"],
+    "plugin-help": ["bench-plugin-0", "--help"],
+    "noop": ["bench-plugin-0", "noop"],
+}
+
+PLUGIN_MODULE = '''\
+import typer
+
+app = typer.Typer(name="bench-plugin-{index}", help="Synthetic plugin {index}.")
+
+
+@app.command()
+def noop() -> None:
+    """Do nothing."""
+
+'''
+
+PLUGIN_COMMAND = '''
+@app.command("command-{number}")
+def command_{number}(
+    name: str = typer.Argument(..., help="A name."),
+    count: int = typer.Option(1, help="A count."),
+    force: bool = typer.Option(False, "--force", "-f", help="A flag."),
+) -> None:
+    """Synthetic command {number}."""
+'''
+
+
+def generate_plugins(path: Path, count: int, commands: int) -> None:
+    """Write count plugin distributions, with commands commands each, into path."""
+    for index in range(count):
+        module = f"anaconda_bench_plugin_{index}"
+        source = PLUGIN_MODULE.format(index=index) + "".join(
+            PLUGIN_COMMAND.format(number=number) for number in range(commands)
+        )
+        (path / f"{module}.py").write_text(source)
+
+        dist_info = path / f"{module}-0.1.0.dist-info"
+        dist_info.mkdir()
+        (dist_info / "METADATA").write_text(
+            f"Metadata-Version: 2.1\nName: {module}\nVersion: 0.1.0\n"
+        )
+        (dist_info / "entry_points.txt").write_text(
+            f"[anaconda_cli.subcommand]\nbench-plugin-{index} = {module}:app\n"
+        )
+
+
+def run_benchmarks(
+    count: int, commands: int, runs: int, use_cache: bool
+) -> List[Dict[str, Any]]:
+    with tempfile.TemporaryDirectory(prefix="anaconda-bench-") as tmp:
+        site = Path(tmp, "site-packages")
+        site.mkdir()
+        generate_plugins(site, count, commands)
+
+        env = {
+            key: value
+            for key, value in os.environ.items()
+            if not key.startswith("ANACONDA_CLI_")
+        }
+        env.update(
+            PYTHONPATH=os.pathsep.join(
+                filter(None, [str(site), env.get("PYTHONPATH")])
+            ),
+            ANACONDA_CLI_CACHE_DIR=str(Path(tmp, "cache")),
+            ANACONDA_CLI_FORCE_NEW="1",
+            OTEL_SDK_DISABLED="true",
+        )
+        if not use_cache:
+            env["ANACONDA_CLI_DISABLE_CACHE"] = "1"
+
+        results = []
+        for scenario, args in SCENARIOS.items():
+            timings = time_runs([*COLD, *args], runs, env)
+            results.append(
+                {
+                    "plugins": count,
+                    "commands_per_plugin": commands,
+                    "scenario": scenario,
+                    **summarize(timings),
+                }
+            )
+            median = results[-1]["median_ms"]
+            print(f"{count:>4} plugins  {scenario:<12} {median} ms", file=sys.stderr)
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--plugins",
+        default="1,10,50,200",
+        help="Comma-separated numbers of plugins to generate",
+    )
+    parser.add_argument("--commands", type=int, default=5, help="Commands per plugin")
+    parser.add_argument("--runs", type=int, default=10, help="Timed runs per scenario")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the plugin index and help cache",
+    )
+    parser.add_argument("--output", type=Path, help="Write the JSON here")
+    options = parser.parse_args()
+
+    results = []
+    for count in (int(n) for n in options.plugins.split(",")):
+        results.extend(
+            run_benchmarks(count, options.commands, options.runs, not options.no_cache)
+        )
+
+    report = {
+        "anaconda_cli_base": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": options.runs,
+        "cache": not options.no_cache,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2) + "\n"
+    if options.output:
+        options.output.write_text(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
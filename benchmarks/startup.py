@@ -0,0 +1,108 @@
+"""Compare the latency of a cold start with commands served by `anaconda daemon`.
+
+Runs a command (`anaconda versions` by default) repeatedly in three ways:
+
+* cold: a new `python -m anaconda_cli_base` process every time
+* daemon: through the anaconda-fast client, run inside the daemon process
+* fork: through the anaconda-fast client, run in a child forked from the daemon
+
+and writes the timings to stdout as JSON:
+
+    python benchmarks/startup.py --runs 20 -- versions
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Sequence
+
+from anaconda_cli_base import daemon
+
+COLD = [sys.executable, "-m", "anaconda_cli_base"]
+CLIENT = [
+    sys.executable,
+    "-c",
+    "from anaconda_cli_base.daemon import client_main; client_main()",
+]
+
+
+def time_runs(command: Sequence[str], runs: int, env: Dict[str, str]) -> List[float]:
+    """Return the wall time of each run in ms, after one untimed warm-up run."""
+    timings = []
+    for i in range(runs + 1):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True)
+        if i:
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        "min_ms": round(ordered[0], 1),
+        "median_ms": round(statistics.median(ordered), 1),
+        "p90_ms": round(ordered[math.ceil(0.9 * len(ordered)) - 1], 1),
+        "max_ms": round(ordered[-1], 1),
+    }
+
+
+def time_daemon(
+    args: List[str], runs: int, env: Dict[str, str], fork: bool
+) -> List[float]:
+    # The default socket path is shared with any daemon the user is running
+    with tempfile.TemporaryDirectory(prefix="acd-") as tmp:
+        socket_path = Path(tmp) / "daemon.sock"
+        env = {**env, "ANACONDA_CLI_DAEMON_SOCKET": str(socket_path)}
+        server = subprocess.Popen(
+            [*COLD, "daemon", *(["--fork"] if fork else [])],
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while not socket_path.exists():
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("The daemon did not start")
+                time.sleep(0.05)
+            return time_runs([*CLIENT, *args], runs, env)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Timed runs per mode")
+    parser.add_argument("args", nargs="*", default=["versions"], help="CLI arguments")
+    options = parser.parse_args()
+
+    if not daemon.daemon_supported():
+        sys.exit("The daemon requires Unix domain sockets")
+
+    env = dict(os.environ)
+    modes = {"cold": time_runs([*COLD, *options.args], options.runs, env)}
+    modes["daemon"] = time_daemon(options.args, options.runs, env, fork=False)
+    if daemon.fork_supported():
+        modes["fork"] = time_daemon(options.args, options.runs, env, fork=True)
+
+    result = {
+        "command": ["anaconda", *options.args],
+        "runs": options.runs,
+        "modes": {name: summarize(timings) for name, timings in modes.items()},
+    }
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
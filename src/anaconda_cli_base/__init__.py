@@ -1,10 +1,31 @@
+from typing import TYPE_CHECKING, Any
+
 try:
     from anaconda_cli_base._version import version as __version__
 except ImportError:  # pragma: nocover
     __version__ = "unknown"
 
-from anaconda_cli_base.console import init_logging, console
+from anaconda_cli_base.console import init_logging
+
+# Importing the submodule bound its name here, hiding the console itself
+globals().pop("console", None)
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+    console: Console
 
 __all__ = ["__version__", "console"]
 
+
+def __getattr__(name: str) -> Any:
+    # Importing rich is deferred until the console is used, see console.py
+    if name == "console":
+        from anaconda_cli_base.console import console
+
+        globals()["console"] = console
+        return console
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 init_logging()
@@ -0,0 +1,244 @@
+"""Run many ``anaconda`` commands in one process with ``anaconda batch``.
+
+Each line of the batch file is one command line, split like a shell would, with an
+optional leading ``anaconda``. Blank lines and ``#`` comments are skipped. Every
+command is dispatched through the root command group, exactly as ``anaconda``
+would run it, so the interpreter, the plugins and telemetry only start once.
+"""
+
+import json
+import os
+import shlex
+import sys
+import time
+import traceback
+from contextlib import closing
+from contextlib import contextmanager
+from dataclasses import asdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from typing import Generator
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import typer
+
+from anaconda_cli_base.cli import ClickException
+
+
+@dataclass
+class BatchResult:
+    """The outcome of one command of a batch."""
+
+    line: int
+    args: List[str]
+    exit_code: int
+    duration_ms: float
+
+
+def parse_line(text: str) -> List[str]:
+    """Split a line of a batch file into the arguments of the command.
+
+    Raises ValueError if the line cannot be split, e.g. with unbalanced quotes.
+    """
+    args = shlex.split(text, comments=True)
+    if args and args[0] == "anaconda":
+        args = args[1:]
+    return args
+
+
+@dataclass
+class Outcome:
+    """How a command ended, with the exception which failed it, if any."""
+
+    exit_code: int
+    error: Optional[BaseException] = None
+    # Whether the error was reported by its handler from ERROR_HANDLERS
+    handled: bool = False
+
+
+@contextmanager
+def isolated(args: List[str]) -> Iterator[None]:
+    """Run a command with sys.argv set to args, restoring the process state after.
+
+    The environment is restored, so that e.g. `--at`, which sets
+    ANACONDA_DEFAULT_SITE, does not leak into the next command.
+    """
+    saved_env = dict(os.environ)
+    saved_argv = sys.argv
+    sys.argv = ["anaconda", *args]
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.environ.clear()
+        os.environ.update(saved_env)
+        sys.argv = saved_argv
+
+
+def dispatch(command: Any, args: List[str], standalone_mode: bool = True) -> Outcome:
+    """Run one command through the root command group, reporting any error.
+
+    Without standalone_mode, usage errors are shown and the exit code of
+    typer.Exit is returned by click rather than raised as SystemExit, which is
+    still raised by the error handlers.
+    """
+    try:
+        rv = command.main(
+            args=args, prog_name="anaconda", standalone_mode=standalone_mode
+        )
+    except SystemExit as e:
+        if e.code is not None and not isinstance(e.code, int):
+            print(e.code, file=sys.stderr)
+            return Outcome(1)
+        exit_code = e.code or 0
+        # The error handlers exit with the error they handled as the cause
+        handled = e.__cause__
+        if exit_code and isinstance(handled, Exception):
+            return Outcome(exit_code, handled, handled=True)
+        return Outcome(exit_code)
+    except ClickException as e:
+        # Only raised without standalone mode, e.g. click's UsageError, which can
+        # show itself along with the usage of the command
+        show = getattr(e, "show", None)
+        if callable(show):
+            show()
+        else:
+            print(f"Error: {e}", file=sys.stderr)
+        return Outcome(getattr(e, "exit_code", 1), e)
+    except typer.Abort as e:
+        print("Aborted!", file=sys.stderr)
+        return Outcome(1, e)
+    except Exception as e:
+        # Re-raised by the error handling with --verbose
+        traceback.print_exc()
+        return Outcome(1, e)
+    return Outcome(rv if not standalone_mode and isinstance(rv, int) else 0)
+
+
+def run_command(command: Any, args: List[str], standalone_mode: bool = True) -> int:
+    """Run one command through the root command group, returning its exit code."""
+    with isolated(args):
+        return dispatch(command, args, standalone_mode).exit_code
+
+
+@dataclass
+class Completed:
+    """A command which has run, with the output it printed, where captured."""
+
+    args: List[str]
+    outcome: Outcome
+    duration_ms: float
+    stdout: str = ""
+    stderr: str = ""
+
+
+def run_in_turn(
+    command: Any, commands: Iterable[List[str]]
+) -> Generator[Completed, None, None]:
+    """Run one command after the other, as they are consumed."""
+    for args in commands:
+        start = time.perf_counter()
+        with isolated(args):
+            outcome = dispatch(command, args)
+        yield Completed(
+            args=args,
+            outcome=outcome,
+            duration_ms=round((time.perf_counter() - start) * 1000, 1),
+        )
+
+
+def run_commands(
+    command: Any, lines: Iterable[str], fail_fast: bool = False, jobs: int = 1
+) -> List[BatchResult]:
+    """Run the command of each line, reporting each one in turn on stderr.
+
+    With more than one job, independent commands run concurrently, and their output
+    is printed along with their report, in the order of the lines.
+    """
+    parsed: List[Tuple[int, List[str], Optional[str]]] = []
+    for number, text in enumerate(lines, start=1):
+        try:
+            parsed.append((number, parse_line(text), None))
+        except ValueError as e:
+            parsed.append((number, [], str(e)))
+    commands = [args for _, args, error in parsed if args and error is None]
+
+    if jobs > 1:
+        from anaconda_cli_base.parallel import run_concurrently
+
+        completed = run_concurrently(command, commands, jobs)
+    else:
+        completed = run_in_turn(command, commands)
+
+    results = []
+    with closing(completed):
+        for number, args, error in parsed:
+            if error is not None:
+                print(f"anaconda batch: line {number}: {error}", file=sys.stderr)
+                result = BatchResult(line=number, args=[], exit_code=2, duration_ms=0)
+            elif not args:
+                continue
+            else:
+                done = next(completed)
+                sys.stdout.write(done.stdout)
+                sys.stderr.write(done.stderr)
+                result = BatchResult(
+                    line=number,
+                    args=args,
+                    exit_code=done.outcome.exit_code,
+                    duration_ms=done.duration_ms,
+                )
+            results.append(result)
+            print(
+                f"anaconda batch: line {number}: exit code {result.exit_code} "
+                f"in {result.duration_ms:.0f} ms: {shlex.join(args)}",
+                file=sys.stderr,
+            )
+            if result.exit_code != 0 and fail_fast:
+                break
+    return results
+
+
+def read_lines(file: str) -> List[str]:
+    """Read a batch file, or stdin for "-".
+
+    The whole batch is read up front, so that commands reading stdin do not
+    consume it.
+    """
+    if file == "-":
+        return sys.stdin.readlines()
+    with open(file, encoding="utf-8") as f:
+        return f.readlines()
+
+
+def run_batch(
+    command: Any,
+    lines: Iterable[str],
+    fail_fast: bool = False,
+    report: Optional[Path] = None,
+    jobs: int = 1,
+) -> int:
+    """Run the commands of a batch, summarizing them on stderr.
+
+    Returns 0 if every command succeeded, or else the exit code of the first
+    command which failed.
+    """
+    results = run_commands(command, lines, fail_fast=fail_fast, jobs=jobs)
+    failed = [result for result in results if result.exit_code != 0]
+    total_ms = sum(result.duration_ms for result in results)
+    print(
+        f"anaconda batch: {len(results)} commands, {len(failed)} failed, "
+        f"in {total_ms:.0f} ms",
+        file=sys.stderr,
+    )
+    if report is not None:
+        report.write_text(
+            json.dumps([asdict(result) for result in results], indent=2) + "\n"
+        )
+    return failed[0].exit_code if failed else 0
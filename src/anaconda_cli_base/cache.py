@@ -0,0 +1,79 @@
+"""A small on-disk cache used to keep CLI startup fast.
+
+Only the standard library is imported here, so that the cache can be consulted
+before any of the heavier dependencies (typer, rich, pydantic) are loaded.
+
+The cache directory defaults to ``~/.anaconda/cache`` and can be changed with
+the ``ANACONDA_CLI_CACHE_DIR`` environment variable. Setting
+``ANACONDA_CLI_DISABLE_CACHE`` to any value turns every read into a miss and
+every write into a no-op.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+
+def cache_dir() -> Path:
+    return Path(
+        os.path.expandvars(
+            os.path.expanduser(os.getenv("ANACONDA_CLI_CACHE_DIR", "~/.anaconda/cache"))
+        )
+    )
+
+
+def cache_enabled() -> bool:
+    return not os.getenv("ANACONDA_CLI_DISABLE_CACHE")
+
+
+def fingerprint(*parts: Any) -> str:
+    """Return a stable hash of JSON-serializable parts, suitable as a cache key."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def read_json(name: str) -> Optional[Any]:
+    """Read a cached JSON document, returning None if it is missing or unreadable."""
+    if not cache_enabled():
+        return None
+    try:
+        with open(cache_dir() / name, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(name: str, data: Any) -> None:
+    """Atomically write a JSON document into the cache.
+
+    Failures are logged and otherwise ignored, since a read-only or missing home
+    directory must never break the CLI.
+    """
+    if not cache_enabled():
+        return
+    path = cache_dir() / name
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_fd, tmp_path = tempfile.mkstemp(
+            dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", text=True
+        )
+    except OSError as e:
+        log.debug("Could not write cache file %s: %s", path, e)
+        return
+    try:
+        with os.fdopen(tmp_fd, "wt", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as e:
+        log.debug("Could not write cache file %s: %s", path, e)
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
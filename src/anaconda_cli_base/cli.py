@@ -1,34 +1,134 @@
 import functools
 import os
 import sys
+import threading
+import time
 from dataclasses import dataclass
 from dataclasses import field
+from pathlib import Path
 from typing import Any
 from typing import Callable
+from typing import ClassVar
 from typing import Dict
 from typing import Optional
 from typing import Union
 from typing import Sequence
 from typing import List
+from typing import Tuple
+from typing import Type
 from typing import cast
 
 import typer
 import click.core
+import click.exceptions
 import click.utils
-from rich.table import Table
+from typer.core import TyperCommand
 from typer.core import TyperGroup
 
 from anaconda_cli_base import __version__
-from anaconda_cli_base import console
+from anaconda_cli_base.plugin_index import PLUGIN_GROUP_NAME
+from anaconda_cli_base.plugin_index import IndexedEntryPoint
+from anaconda_cli_base.plugin_index import get_entry_points
+from anaconda_cli_base.plugins import load_lazy_subcommands
 from anaconda_cli_base.plugins import load_registered_subcommands
+from anaconda_cli_base.plugins import print_versions_table
+from anaconda_cli_base.plugins import register_lazy_subcommands
 from anaconda_cli_base.exceptions import ERROR_HANDLERS
+from anaconda_cli_base.help_cache import get_cached_help
+from anaconda_cli_base.help_cache import is_cacheable_help_request
+from anaconda_cli_base.help_cache import record_help
+from anaconda_cli_base.invocation import DEFAULT_SITE_ENV_VAR
+from anaconda_cli_base.invocation import Invocation
+from anaconda_cli_base.invocation import current
+from anaconda_cli_base.invocation import invoked
+from anaconda_cli_base import telemetry
 from anaconda_cli_base.telemetry import _before_command, _after_command
 
 
-class ErrorHandledGroup(TyperGroup):
-    # Set True during recursive retry (exit_code == -1) to avoid double-counting telemetry
-    _retrying: bool = False
+# The base of the usage errors raised by click. Typer only has TyperException since
+# it vendored click, while older versions raise the errors of click itself
+ClickException: Type[Exception] = getattr(
+    typer, "TyperException", click.exceptions.ClickException
+)
+
+
+def _handled_exit_code(error: BaseException) -> Optional[int]:
+    """The exit code of an error its command callback has reported, if it did."""
+    invocation = current()
+    if invocation is None or invocation.handled is None:
+        return None
+    handled, exit_code = invocation.handled
+    return exit_code if handled is error else None
+
+
+def _retried(callback: Callable) -> Callable:
+    """Wrap a command callback to run it again when the handler of its error asks to.
+
+    The callback is run again with the parameters click has parsed, while its context
+    is still open, so e.g. the files opened for its parameters are still usable.
+    """
+
+    @functools.wraps(callback)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        invocation = current()
+        if invocation is None or (invocation.params or {}).get("verbose", False):
+            # Errors are not handled with --verbose
+            return callback(*args, **kwargs)
+
+        from anaconda_cli_base.retry import retry_decision
+
+        attempt = 1
+        attempts: List[Tuple[int, float, Optional[BaseException]]] = []
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    rv = callback(*args, **kwargs)
+                except Exception as e:
+                    attempts.append((attempt, (time.perf_counter() - start) * 1000, e))
+                    if isinstance(e, (ClickException, typer.Abort, typer.Exit)):
+                        raise
+                    if _handled_exit_code(e) is not None:
+                        # Reported by a callback this one invoked
+                        raise
+                    result = ERROR_HANDLERS[type(e)](e)
+                    retry = retry_decision(result)
+                    if retry is None or attempt >= retry.max_attempts:
+                        invocation.handled = (
+                            e,
+                            retry.exit_code if retry is not None else cast(int, result),
+                        )
+                        raise
+                    time.sleep(retry.delay(attempt))
+                    attempt += 1
+                else:
+                    attempts.append(
+                        (attempt, (time.perf_counter() - start) * 1000, None)
+                    )
+                    return rv
+        finally:
+            if len(attempts) > 1:
+                invocation.attempts.extend(attempts)
+
+    setattr(wrapper, "_retried", True)
+    return wrapper
+
 
+# Held while the callbacks of a command are wrapped, by commands running concurrently
+_retry_callbacks_lock = threading.Lock()
+
+
+def _retry_callbacks(command: Any) -> None:
+    """Have the callbacks of a command and its subcommands retried by error handlers."""
+    with _retry_callbacks_lock:
+        callback = command.callback
+        if callback is not None and not getattr(callback, "_retried", False):
+            command.callback = _retried(callback)
+    for subcommand in getattr(command, "commands", {}).values():
+        _retry_callbacks(subcommand)
+
+
+class ErrorHandledGroup(TyperGroup):
     def list_commands(self, _: click.core.Context) -> List[str]:
         """Return list of commands in the order they appear on the CLI."""
         return sorted(self.commands, reverse=False)
@@ -41,14 +141,36 @@ class ErrorHandledGroup(TyperGroup):
         standalone_mode: bool = True,
         windows_expand_args: bool = True,
         **extra: Any,
-    ) -> None:
-        command_info = None
-        if not self._retrying:
-            resolved_args = args if args is not None else sys.argv[1:]
-            command_info = _before_command(resolved_args, prog_name)
+    ) -> Any:
+        # Commands run from within a command, e.g. by `anaconda batch` or a retry,
+        # are part of its telemetry session, which is flushed once at the end, but
+        # each is invoked on its own
+        argv = [prog_name or sys.argv[0], *args] if args is not None else sys.argv
+        with telemetry.session(), invoked(argv):
+            return self._main(
+                args,
+                prog_name,
+                complete_var,
+                standalone_mode,
+                windows_expand_args,
+                **extra,
+            )
+
+    def _main(
+        self,
+        args: Optional[Sequence[str]],
+        prog_name: Optional[str],
+        complete_var: Optional[str],
+        standalone_mode: bool,
+        windows_expand_args: bool,
+        **extra: Any,
+    ) -> Any:
+        resolved_args = args if args is not None else sys.argv[1:]
+        command_info = _before_command(resolved_args, prog_name)
+        start = time.perf_counter()
 
         try:
-            super().main(
+            rv = super().main(
                 args,
                 prog_name,
                 complete_var,
@@ -56,59 +178,171 @@ class ErrorHandledGroup(TyperGroup):
                 windows_expand_args,
                 **extra,
             )
-            if not self._retrying:
-                _after_command(command_info, success=True)
+            # Without standalone mode, click returns the exit code of typer.Exit
+            exit_code = rv if not standalone_mode and isinstance(rv, int) else 0
+            _after_command(command_info, success=exit_code == 0, exit_code=exit_code)
+            return rv
         except SystemExit as e:
-            if not self._retrying:
-                _after_command(
-                    command_info,
-                    success=(e.code in (None, 0)),
-                    exit_code=int(e.code or 0),
-                )
+            _after_command(
+                command_info,
+                success=(e.code in (None, 0)),
+                exit_code=int(e.code or 0),
+            )
+            raise
+        except (ClickException, typer.Abort) as e:
+            # Usage errors and aborts only get here without standalone mode, where
+            # click leaves them for the caller to report
+            _after_command(
+                command_info,
+                success=False,
+                error=e,
+                exit_code=getattr(e, "exit_code", 1),
+            )
             raise
         except Exception as e:
-            ctx = self._get_context(args, prog_name, windows_expand_args, **extra)
-            if ctx.params.get("verbose", False):
-                if not self._retrying:
-                    _after_command(command_info, success=False, error=e)
+            if self._is_verbose(args, prog_name, windows_expand_args, **extra):
+                _after_command(command_info, success=False, error=e)
                 raise e
 
-            callback = ERROR_HANDLERS[type(e)]
-            exit_code = callback(e)
-            if exit_code == -1:
-                self._retrying = True
-                try:
-                    self.main(
-                        args,
-                        prog_name,
-                        complete_var,
-                        standalone_mode,
-                        windows_expand_args,
-                        **extra,
-                    )
-                except SystemExit as retry_exit:
-                    _after_command(
-                        command_info,
-                        success=(retry_exit.code in (None, 0)),
-                        exit_code=int(retry_exit.code or 0),
-                    )
-                    raise
-                finally:
-                    self._retrying = False
-                _after_command(command_info, success=True)
-            else:
-                if not self._retrying:
-                    _after_command(
-                        command_info, success=False, error=e, exit_code=exit_code
+            def run_again() -> Any:
+                # Used when the error was not raised by the callback of a command,
+                # e.g. while loading a plugin, so the whole command is run again
+                return super(ErrorHandledGroup, self).main(
+                    args,
+                    prog_name,
+                    complete_var,
+                    False,
+                    windows_expand_args,
+                    **extra,
+                )
+
+            return self._handle_error(
+                e,
+                command_info,
+                resolved_args,
+                standalone_mode,
+                (time.perf_counter() - start) * 1000,
+                run_again,
+            )
+        finally:
+            invocation = current()
+            if invocation is not None:
+                for attempt, duration_ms, error in invocation.attempts:
+                    telemetry._record_attempt(command_info, attempt, duration_ms, error)
+
+    def resolve_command(self, ctx: Any, args: List[str]) -> Any:
+        # Typed loosely, since the context and commands are those of the click
+        # typer uses, which it vendors in recent versions
+        cmd_name, cmd, args = super().resolve_command(ctx, args)
+        if cmd is not None:
+            _retry_callbacks(cmd)
+        return cmd_name, cmd, args
+
+    def _handle_error(
+        self,
+        error: Exception,
+        command_info: Optional[telemetry._CommandInfo],
+        args: Sequence[str],
+        standalone_mode: bool,
+        duration_ms: float,
+        run_again: Callable[[], Any],
+    ) -> Any:
+        """Report an error with its handler, retrying the whole command if it asks to.
+
+        Errors of a command callback were reported, and retried, by the callback.
+        """
+        from anaconda_cli_base.retry import retry_decision
+
+        attempt = 1
+        attempts: List[Tuple[int, float, Optional[BaseException]]] = [
+            (attempt, duration_ms, error)
+        ]
+        try:
+            while True:
+                handled_exit_code = _handled_exit_code(error)
+                if handled_exit_code is not None:
+                    exit_code = handled_exit_code
+                    break
+                result = ERROR_HANDLERS[type(error)](error)
+                retry = retry_decision(result)
+                if retry is None or attempt >= retry.max_attempts:
+                    # Handlers which do not retry return the exit code
+                    exit_code = (
+                        retry.exit_code if retry is not None else cast(int, result)
                     )
-                if not args:
-                    args = sys.argv[1:]
-                cmd = " ".join(args or [])
-                console.print(
-                    f"\nTo see a more detailed error message run the command again as"
-                    f"\n  [green]anaconda --verbose {cmd}[/green]"
+                    break
+
+                time.sleep(retry.delay(attempt))
+                attempt += 1
+                start = time.perf_counter()
+                try:
+                    rv = run_again()
+                    # Without standalone mode, click returns the exit code of typer.Exit
+                    exit_code = rv if isinstance(rv, int) else 0
+                except typer.Exit as e:
+                    rv = exit_code = e.exit_code
+                except (ClickException, typer.Abort) as e:
+                    attempts.append((attempt, (time.perf_counter() - start) * 1000, e))
+                    return self._exit_on_click_error(e, command_info, standalone_mode)
+                except Exception as e:
+                    attempts.append((attempt, (time.perf_counter() - start) * 1000, e))
+                    error = e
+                    continue
+                attempts.append((attempt, (time.perf_counter() - start) * 1000, None))
+                _after_command(
+                    command_info, success=exit_code == 0, exit_code=exit_code
                 )
-                sys.exit(exit_code)
+                if standalone_mode:
+                    sys.exit(exit_code)
+                return rv
+        finally:
+            invocation = current()
+            if invocation is not None and len(attempts) > 1:
+                invocation.attempts.extend(attempts)
+
+        _after_command(command_info, success=False, error=error, exit_code=exit_code)
+        cmd = " ".join(args)
+        from anaconda_cli_base.console import console
+
+        console.print(
+            f"\nTo see a more detailed error message run the command again as"
+            f"\n  [green]anaconda --verbose {cmd}[/green]"
+        )
+        # The error is the cause of the exit, for callers which report it
+        raise SystemExit(exit_code) from error
+
+    @staticmethod
+    def _exit_on_click_error(
+        error: Exception,
+        command_info: Optional[telemetry._CommandInfo],
+        standalone_mode: bool,
+    ) -> Any:
+        """Report a usage error or an abort from a retry, as click would."""
+        exit_code = getattr(error, "exit_code", 1)
+        _after_command(command_info, success=False, error=error, exit_code=exit_code)
+        if not standalone_mode:
+            raise error
+        show = getattr(error, "show", None)
+        if callable(show):
+            show()
+        else:
+            typer.echo("Aborted!", err=True)
+        sys.exit(exit_code)
+
+    def _is_verbose(
+        self,
+        args: Optional[Sequence[str]],
+        prog_name: Optional[str],
+        windows_expand_args: bool,
+        **extra: Any,
+    ) -> bool:
+        """Whether --verbose was given to the root command."""
+        invocation = current()
+        if invocation is not None and invocation.params is not None:
+            return bool(invocation.params.get("verbose", False))
+        # The error was raised before the root callback ran
+        ctx = self._get_context(args, prog_name, windows_expand_args, **extra)
+        return bool(ctx.params.get("verbose", False))
 
     def _get_context(
         self,
@@ -136,8 +370,121 @@ class ErrorHandledGroup(TyperGroup):
         return ctx
 
 
-app = typer.Typer(
-    cls=ErrorHandledGroup,
+class LazyPluginGroup(ErrorHandledGroup):
+    """The root group, which imports plugin subcommands only when they are needed.
+
+    Plugins registered with `register_lazy_subcommands` are known by name from the
+    entry-point metadata. A plugin's Typer app is imported when `get_command`
+    resolves its name, so invoking a single plugin does not pay for importing the
+    others. Listing the commands, e.g. to render the full help, and commands that
+    are contributed by several plugins (login/logout/whoami) import all plugins.
+    """
+
+    # Plugin entry points by subcommand name, imported on first use
+    lazy_subcommands: ClassVar[Dict[str, IndexedEntryPoint]] = {}
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._all_lazy_subcommands_loaded = False
+        # Held while plugins are imported, so that commands running concurrently
+        # import each plugin once
+        self._load_lock = threading.RLock()
+
+    def get_command(
+        self, ctx: click.core.Context, cmd_name: str
+    ) -> Optional[click.core.Command]:
+        command = super().get_command(ctx, cmd_name)
+        if command is not None:
+            return command
+
+        with self._load_lock:
+            # Unless another thread has loaded the plugin in the meantime
+            if cmd_name not in self.commands:
+                if cmd_name in self.lazy_subcommands:
+                    self._load_lazy_subcommands([cmd_name])
+                else:
+                    self._load_all_lazy_subcommands()
+        return super().get_command(ctx, cmd_name)
+
+    def list_commands(self, ctx: click.core.Context) -> List[str]:
+        self._load_all_lazy_subcommands()
+        return super().list_commands(ctx)
+
+    def _load_all_lazy_subcommands(self) -> None:
+        with self._load_lock:
+            if self._all_lazy_subcommands_loaded or not self.lazy_subcommands:
+                return
+            self._load_lazy_subcommands(
+                list(self.lazy_subcommands), add_auth_actions=True
+            )
+            self._all_lazy_subcommands_loaded = True
+
+    def _load_lazy_subcommands(
+        self, names: List[str], add_auth_actions: bool = False
+    ) -> None:
+        entry_points = [self.lazy_subcommands[name] for name in names]
+        staging_app = load_lazy_subcommands(entry_points, add_auth_actions)
+        staging_group = typer.main.get_group(staging_app)
+        for name, command in staging_group.commands.items():
+            self.add_command(command, name)
+
+
+class AnacondaTyper(typer.Typer):
+    """The root Typer app.
+
+    When called as the `anaconda` entrypoint, `anaconda --version` and help
+    requests found in the help cache are answered without importing any plugin or
+    building the Typer/Click command tree.
+    """
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        cli_args = sys.argv[1:]
+        if args or kwargs:
+            return super().__call__(*args, **kwargs)
+
+        if cli_args in (["-V"], ["--version"]):
+            _run_without_command_tree(cli_args, _versions_callback(self))
+
+        if is_cacheable_help_request(cli_args, _registered_subcommand_names(self)):
+            cached_help = get_cached_help(cli_args)
+            if cached_help is not None:
+                _run_without_command_tree(cli_args, cached_help.show)
+            return record_help(cli_args, super().__call__)
+
+        return super().__call__()
+
+
+def _versions_callback(app_: typer.Typer) -> Callable[[], None]:
+    """The callback of the versions command registered last on app_."""
+    for command_info in reversed(app_.registered_commands):
+        if command_info.name == "versions" and command_info.callback is not None:
+            return command_info.callback
+    raise LookupError("No versions command is registered")
+
+
+def _run_without_command_tree(args: List[str], func: Callable[[], None]) -> None:
+    """Run func in place of the CLI, tracking it like any other command, and exit."""
+    command_info = _before_command(args, None)
+    exit_code = 0
+    try:
+        func()
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else 0
+    except typer.Exit as e:
+        exit_code = e.exit_code
+    _after_command(command_info, success=exit_code == 0, exit_code=exit_code)
+    sys.exit(exit_code)
+
+
+def _registered_subcommand_names(app_: typer.Typer) -> List[str]:
+    """The names of plugin subcommands, whether imported or registered lazily."""
+    subcommands = [g.name for g in app_.registered_groups if g.name is not None]
+    subcommands.extend(LazyPluginGroup.lazy_subcommands)
+    return subcommands
+
+
+app = AnacondaTyper(
+    cls=LazyPluginGroup,
     add_completion=False,
     help="Welcome to the Anaconda CLI!",
     pretty_exceptions_enable=True,
@@ -151,12 +498,138 @@ app = typer.Typer(
 # calls this subcommand by name.
 @app.command("versions", hidden=True)
 def versions() -> None:
-    table = Table("Package", "Version", header_style="bold green")
-    table.add_row("anaconda-cli-base", __version__)
-    console.print(table)
+    print_versions_table({"anaconda-cli-base": __version__})
     raise typer.Exit()
 
 
+@app.command("completion", hidden=True)
+def completion(
+    ctx: typer.Context,
+    shell: Optional[str] = typer.Argument(
+        None, help="bash, zsh or fish. Defaults to the shell in $SHELL."
+    ),
+) -> None:
+    """Print a script which enables TAB completion of `anaconda` in the shell.
+
+    For example, add `eval "$(anaconda completion bash)"` to ~/.bashrc.
+    """
+    from anaconda_cli_base.completion import SHELLS
+    from anaconda_cli_base.completion import completion_script
+    from anaconda_cli_base.completion import refresh_snapshot
+
+    shell = shell or os.path.basename(os.getenv("SHELL", ""))
+    if shell not in SHELLS:
+        raise typer.BadParameter(
+            f"{shell!r} is not supported, use one of {', '.join(SHELLS)}",
+            param_hint="SHELL",
+        )
+    refresh_snapshot(ctx.find_root().command)
+    sys.stdout.write(completion_script(shell))
+
+
+class _ForwardingCommand(TyperCommand):
+    """A command which leaves all its arguments, including "--", in ctx.args."""
+
+    def parse_args(  # type: ignore[override]
+        self, ctx: click.core.Context, args: List[str]
+    ) -> List[str]:
+        ctx.args = list(args)
+        return []
+
+
+@app.command("debug", hidden=True, cls=_ForwardingCommand)
+def debug(ctx: typer.Context) -> None:
+    """Diagnostic tools for the Anaconda CLI and its plugins."""
+    # The tools are a separate Typer app, so that they are only imported when used
+    from anaconda_cli_base.debug import app as debug_app
+
+    command = typer.main.get_command(debug_app)
+    command.main(args=ctx.args, prog_name=f"{ctx.find_root().info_name} debug")
+
+
+@app.command("batch")
+def batch(
+    ctx: typer.Context,
+    file: str = typer.Argument(
+        ...,
+        metavar="FILE",
+        help="A file with one command per line, or - to read the commands from stdin.",
+    ),
+    fail_fast: bool = typer.Option(
+        False, "--fail-fast", help="Stop at the first command which fails."
+    ),
+    report: Optional[Path] = typer.Option(
+        None, help="Write the exit code and duration of each command to a JSON file."
+    ),
+    jobs: int = typer.Option(
+        1,
+        "--jobs",
+        "-j",
+        min=1,
+        help="Run up to this many independent commands at once.",
+    ),
+) -> None:
+    """Run many commands, one per line of FILE, in a single process."""
+    from anaconda_cli_base.batch import read_lines
+    from anaconda_cli_base.batch import run_batch
+
+    try:
+        lines = read_lines(file)
+    except OSError as e:
+        raise typer.BadParameter(str(e), param_hint="FILE")
+    raise typer.Exit(
+        run_batch(ctx.find_root().command, lines, fail_fast, report, jobs=jobs)
+    )
+
+
+@app.command("shell")
+def shell(
+    ctx: typer.Context,
+    timing: bool = typer.Option(
+        False, "--timing", help="Print the exit code and duration of each command."
+    ),
+) -> None:
+    """Run commands interactively, with the CLI and its plugins loaded only once."""
+    from anaconda_cli_base.shell import Shell
+
+    raise typer.Exit(Shell(ctx.find_root().command, timing=timing).run())
+
+
+@app.command("serve")
+def serve(
+    ctx: typer.Context,
+    stdio: bool = typer.Option(
+        False, "--stdio", help="Read requests from stdin and respond on stdout."
+    ),
+) -> None:
+    """Run commands for IDEs and agents, as a JSON-RPC server."""
+    if not stdio:
+        raise typer.BadParameter(
+            "only the --stdio transport is supported", param_hint="'--stdio'"
+        )
+    from anaconda_cli_base.serve import serve_stdio
+
+    raise typer.Exit(serve_stdio(ctx.find_root().command))
+
+
+@app.command("daemon", hidden=True)
+def daemon(
+    idle_timeout: float = typer.Option(
+        600.0,
+        help="Exit after no command has been received for this many seconds.",
+    ),
+    fork: bool = typer.Option(
+        False,
+        "--fork",
+        help="Run each command in a child process forked from the daemon (Linux only).",
+    ),
+) -> None:
+    """Run commands for `anaconda-fast` from a process with all plugins loaded."""
+    from anaconda_cli_base.daemon import serve
+
+    serve(idle_timeout=idle_timeout, fork=fork)
+
+
 @dataclass()
 class ContextExtras:
     """Encapsulates extra information we want to add to the `typer.Context`.
@@ -166,6 +639,8 @@ class ContextExtras:
     """
 
     params: Dict[str, Any] = field(default_factory=dict)
+    # The invocation of the command, see anaconda_cli_base.invocation
+    invocation: Optional[Invocation] = field(default_factory=current)
 
 
 @app.callback(invoke_without_command=True, no_args_is_help=True)
@@ -232,18 +707,25 @@ def main(
 
     # Store all the top-level params on the obj attribute
     ctx.obj.params.update(ctx.params.copy())
+    if ctx.obj.invocation is not None:
+        ctx.obj.invocation.params = ctx.obj.params
 
     if at is not None and at != "anaconda.org":
-        os.environ["ANACONDA_DEFAULT_SITE"] = at
+        if ctx.obj.invocation is not None:
+            ctx.obj.invocation.site = at
+        # For plugins which read the environment directly
+        os.environ[DEFAULT_SITE_ENV_VAR] = at
 
     if show_help:
+        from anaconda_cli_base.console import console
+
         console.print(ctx.get_help())
         raise typer.Exit()
 
     if version:
         cmd = cast(ErrorHandledGroup, ctx.command)
         versions = cmd.get_command(ctx, "versions")
-        func = cast(Callable, versions)
+        func = cast(Callable, cast(click.core.Command, versions).callback)
         ctx.invoke(func)
 
 
@@ -263,17 +745,13 @@ def _null_decorator(*args: Any, **kwargs: Any):  # type: ignore
 
 app.callback = _null_decorator  # type: ignore
 
-disable_plugins = bool(os.getenv("ANACONDA_CLI_DISABLE_PLUGINS"))
-if not disable_plugins:
-    load_registered_subcommands(app)
-
 
-def _select_main_entrypoint_app(app_: typer.Typer) -> Union[typer.Typer, Callable]:
-    """Select the main application to handle the `anaconda` entrypoint at the command line.
+def _legacy_cli_main(subcommands: Sequence[str]) -> Optional[Callable]:
+    """Return the legacy `binstar_client.scripts.cli` entrypoint, if it should be used.
 
-    This function, and its execution below at the bottom of this module, can be removed once
-    we are fully confident that the `binstar_client.scripts.cli` CLI application (defined
-    inside `anaconda-client`) can be replaced with the modern `click`/`typer`-based application.
+    This function can be removed once we are fully confident that the
+    `binstar_client.scripts.cli` CLI application (defined inside `anaconda-client`) can
+    be replaced with the modern `click`/`typer`-based application.
 
     If there are no additional plugins registered besides `anaconda-client`, then we fall back
     to the legacy CLI. If any additional plugins are installed, we use the new CLI.
@@ -285,9 +763,7 @@ def _select_main_entrypoint_app(app_: typer.Typer) -> Union[typer.Typer, Callabl
     Please register a bug in that case.
 
     """
-    subcommands = [g.name for g in app_.registered_groups]
-
-    anaconda_client_is_only_plugin = subcommands == ["org"]
+    anaconda_client_is_only_plugin = list(subcommands) == ["org"]
     force_new_cli_entrypoint = bool(os.getenv("ANACONDA_CLI_FORCE_NEW"))
     force_legacy_cli_entrypoint = bool(os.getenv("ANACONDA_CLIENT_FORCE_STANDALONE"))
     if force_legacy_cli_entrypoint and force_new_cli_entrypoint:
@@ -299,7 +775,6 @@ def _select_main_entrypoint_app(app_: typer.Typer) -> Union[typer.Typer, Callabl
         anaconda_client_is_only_plugin and not force_new_cli_entrypoint
     )
     if use_legacy_cli_entrypoint:
-        # TODO: We may want to do the conditional import first, and load the subcommand name from anaconda-client
         try:
             from binstar_client.scripts.cli import main
         except ImportError:
@@ -307,11 +782,35 @@ def _select_main_entrypoint_app(app_: typer.Typer) -> Union[typer.Typer, Callabl
         else:
             return functools.partial(main, allow_plugin_main=False)
 
-    return app_
+    return None
+
 
+def _select_main_entrypoint_app(app_: typer.Typer) -> Union[typer.Typer, Callable]:
+    """Select the main application to handle the `anaconda` entrypoint at the command line.
+
+    Either the legacy CLI (see `_legacy_cli_main`) or app_, based on the plugins
+    registered with app_.
+    """
+    return _legacy_cli_main(_registered_subcommand_names(app_)) or app_
 
-# Here, we re-assign the global `app` variable based on the selection logic.
+
+disable_plugins = bool(os.getenv("ANACONDA_CLI_DISABLE_PLUGINS"))
+eager_plugins = bool(os.getenv("ANACONDA_CLI_EAGER_PLUGINS"))
+
+# The choice between the legacy and the new CLI is made from the entry-point
+# metadata, before any plugin is imported, so the legacy CLI only pays for importing
+# anaconda-client and the new CLI imports nothing it then throws away.
 # This should be removed once we are confident that we can completely replace the
 # `binstar_client` CLI (that inside `anaconda-client`) with the modern
 # `click`/`typer`-based application.
-app = _select_main_entrypoint_app(app)  # type: ignore
+legacy_main = _legacy_cli_main(
+    [] if disable_plugins else [ep.name for ep in get_entry_points(PLUGIN_GROUP_NAME)]
+)
+if legacy_main is not None:
+    app = legacy_main  # type: ignore
+elif disable_plugins:
+    pass
+elif eager_plugins:
+    LazyPluginGroup.lazy_subcommands = load_registered_subcommands(app)
+else:
+    LazyPluginGroup.lazy_subcommands = register_lazy_subcommands(app)
@@ -0,0 +1,238 @@
+"""Shell completion for ``anaconda``, answered from a snapshot of the command tree.
+
+Typer's own completion resolves every TAB press by building the command tree,
+which imports every plugin. Instead, the names, options, hidden flags and choices
+of all commands are serialized to ``completion.json`` in the cache directory, and
+completions are computed from that snapshot with the standard library only.
+
+The snapshot is keyed by the plugin fingerprint, and is rebuilt when plugins are
+installed, upgraded or removed. The shell scripts printed by ``anaconda completion``
+call this module directly::
+
+    python -m anaconda_cli_base.completion bash CWORD WORD...
+
+where WORD... are the words of the command line, including ``anaconda`` itself,
+and CWORD is the index of the word being completed.
+"""
+
+import os
+import shlex
+import sys
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from anaconda_cli_base import __version__
+from anaconda_cli_base import cache
+from anaconda_cli_base.plugin_index import plugin_fingerprint
+from anaconda_cli_base.plugin_index import plugin_selection
+
+SNAPSHOT_FILENAME = "completion.json"
+
+SHELLS = ("bash", "zsh", "fish")
+
+# A node of the snapshot, i.e. the serialized form of a click command
+CommandTree = Dict[str, Any]
+
+_BASH_SCRIPT = """\
+_anaconda_completion() {
+    local IFS=$'\\n'
+    COMPREPLY=($(%(command)s bash "$COMP_CWORD" "${COMP_WORDS[@]}" 2>/dev/null))
+}
+complete -o default -F _anaconda_completion anaconda anaconda-fast
+"""
+
+_ZSH_SCRIPT = """\
+#compdef anaconda anaconda-fast
+_anaconda_completion() {
+    local -a completions
+    completions=("${(@f)$(%(command)s zsh "$((CURRENT - 1))" "${words[@]}" 2>/dev/null)}")
+    if [[ -n "${completions[*]}" ]]; then
+        _describe -t commands anaconda completions
+    else
+        _files
+    fi
+}
+compdef _anaconda_completion anaconda anaconda-fast
+"""
+
+_FISH_SCRIPT = """\
+function __anaconda_complete
+    set -l words (commandline -opc) (commandline -ct)
+    %(command)s fish (count (commandline -opc)) $words 2>/dev/null
+end
+complete -c anaconda -f -a "(__anaconda_complete)"
+complete -c anaconda-fast -f -a "(__anaconda_complete)"
+"""
+
+_SCRIPTS = {"bash": _BASH_SCRIPT, "zsh": _ZSH_SCRIPT, "fish": _FISH_SCRIPT}
+
+
+def snapshot_key() -> str:
+    selection = plugin_selection()
+    return cache.fingerprint(
+        __version__,
+        plugin_fingerprint(),
+        bool(os.getenv("ANACONDA_CLI_DISABLE_PLUGINS")),
+        None if selection.allow is None else sorted(selection.allow),
+        sorted(selection.skip),
+    )
+
+
+def _first_line(text: Optional[str]) -> str:
+    return (text or "").strip().split("\n", 1)[0]
+
+
+def build_command_tree(command: Any, ctx: Optional[Any] = None) -> CommandTree:
+    """Serialize a click command, and its subcommands, for the snapshot.
+
+    Typer may vendor its own copy of click, so the command is inspected by duck
+    typing rather than against the classes of the click package.
+    """
+    ctx = ctx or command.context_class(command, info_name=command.name)
+    options = []
+    for param in command.get_params(ctx):
+        if param.param_type_name != "option":
+            continue
+        options.append(
+            {
+                "names": [*param.opts, *param.secondary_opts],
+                "help": _first_line(param.help),
+                "hidden": param.hidden,
+                "takes_value": not (param.is_flag or param.count),
+                "choices": [str(c) for c in getattr(param.type, "choices", None) or []],
+            }
+        )
+
+    commands = {}
+    if hasattr(command, "list_commands"):
+        for name in command.list_commands(ctx):
+            subcommand = command.get_command(ctx, name)
+            if subcommand is None:
+                continue
+            sub_ctx = subcommand.context_class(subcommand, info_name=name, parent=ctx)
+            commands[name] = build_command_tree(subcommand, sub_ctx)
+
+    return {
+        "help": _first_line(command.get_short_help_str(limit=80)),
+        "hidden": command.hidden,
+        "options": options,
+        "commands": commands,
+    }
+
+
+def refresh_snapshot(command: Optional[Any] = None) -> CommandTree:
+    """Build the command tree of the CLI, importing every plugin, and cache it.
+
+    command is the root click command, which is built from the CLI app by default.
+    """
+    import typer
+
+    from anaconda_cli_base import cli
+
+    if command is not None:
+        tree = build_command_tree(command)
+    elif isinstance(cli.app, typer.Typer):
+        tree = build_command_tree(typer.main.get_command(cli.app))
+    else:
+        # The legacy anaconda-client CLI is selected, which has no completion
+        tree = {"help": "", "hidden": False, "options": [], "commands": {}}
+    cache.write_json(SNAPSHOT_FILENAME, {"key": snapshot_key(), "tree": tree})
+    return tree
+
+
+def load_snapshot() -> CommandTree:
+    """Return the cached command tree, rebuilding it if the plugins have changed."""
+    snapshot = cache.read_json(SNAPSHOT_FILENAME)
+    if (
+        isinstance(snapshot, dict)
+        and snapshot.get("key") == snapshot_key()
+        and isinstance(snapshot.get("tree"), dict)
+    ):
+        return snapshot["tree"]
+    return refresh_snapshot()
+
+
+def _find_option(node: CommandTree, name: str) -> Optional[Dict[str, Any]]:
+    for option in node["options"]:
+        if name in option["names"]:
+            return option
+    return None
+
+
+def complete(
+    tree: CommandTree, args: Sequence[str], incomplete: str
+) -> List[Tuple[str, str]]:
+    """Return the (value, help) completions for the incomplete word.
+
+    args are the complete words between the program name and the incomplete word.
+    """
+    node = tree
+    pending_option = None
+    for word in args:
+        if pending_option is not None:
+            pending_option = None
+        elif word.startswith("-") and word != "-":
+            name, has_value, _ = word.partition("=")
+            option = _find_option(node, name)
+            if option is not None and option["takes_value"] and not has_value:
+                pending_option = option
+        elif word in node["commands"]:
+            node = node["commands"][word]
+
+    if pending_option is not None:
+        return [(c, "") for c in pending_option["choices"] if c.startswith(incomplete)]
+
+    if incomplete.startswith("-"):
+        return [
+            (name, option["help"])
+            for option in node["options"]
+            if not option["hidden"]
+            for name in option["names"]
+            if name.startswith(incomplete)
+        ]
+
+    return [
+        (name, subcommand["help"])
+        for name, subcommand in node["commands"].items()
+        if not subcommand["hidden"] and name.startswith(incomplete)
+    ]
+
+
+def format_completions(shell: str, completions: List[Tuple[str, str]]) -> str:
+    if shell == "zsh":
+        # _describe separates the value from its description with a colon
+        escaped = [(value.replace(":", "\\:"), help) for value, help in completions]
+        lines = [f"{value}:{help}" if help else value for value, help in escaped]
+    elif shell == "fish":
+        lines = [f"{value}\t{help}" if help else value for value, help in completions]
+    else:
+        lines = [value for value, _ in completions]
+    return "".join(f"{line}\n" for line in lines)
+
+
+def completion_script(shell: str) -> str:
+    """The script which sets up completion of anaconda in the given shell."""
+    command = f"{shlex.quote(sys.executable)} -m anaconda_cli_base.completion"
+    return _SCRIPTS[shell] % {"command": command}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Print the completions for a command line: SHELL CWORD WORD..."""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2 or argv[0] not in SHELLS or not argv[1].isdigit():
+        sys.exit(
+            "usage: python -m anaconda_cli_base.completion {bash,zsh,fish} CWORD WORD..."
+        )
+    shell, cword, words = argv[0], int(argv[1]), list(argv[2:])
+
+    incomplete = words[cword] if cword < len(words) else ""
+    completions = complete(load_snapshot(), words[1:cword], incomplete)
+    sys.stdout.write(format_completions(shell, completions))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@ import os
 import re
 import sys
 import tempfile
+import threading
+import time
+from collections import OrderedDict
 from collections import deque
 
 from copy import deepcopy
@@ -10,8 +13,11 @@ from pathlib import Path
 from shutil import copy
 from tomlkit.toml_document import TOMLDocument
 from typing import Any
+from typing import Callable
 from typing import ClassVar
 from typing import Dict
+from typing import Mapping
+from typing import NamedTuple
 from typing import Optional
 from typing import Tuple
 from typing import Type
@@ -20,6 +26,7 @@ from typing import Union
 import tomlkit
 from pydantic import ValidationError
 from pydantic_settings import BaseSettings
+from pydantic_settings import EnvSettingsSource
 from pydantic_settings import PydanticBaseSettingsSource
 from pydantic_settings import PyprojectTomlConfigSettingsSource
 from pydantic_settings import SettingsConfigDict
@@ -28,6 +35,8 @@ from anaconda_cli_base.exceptions import (
     AnacondaConfigTomlSyntaxError,
     AnacondaConfigValidationError,
 )
+from anaconda_cli_base.invocation import invocation_environ
+from anaconda_cli_base.plugin_index import anaconda_config_path
 
 if sys.version_info >= (3, 11):
     import tomllib
@@ -44,31 +53,112 @@ def anaconda_secrets_dir() -> Optional[Path]:
     return path if path.is_dir() else None
 
 
-def anaconda_config_path() -> Path:
-    return Path(
-        os.path.expandvars(
-            os.path.expanduser(
-                os.getenv("ANACONDA_CONFIG_TOML", "~/.anaconda/config.toml")
+class ConfigCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    # Files read again because they changed since they were cached
+    revalidations: int
+    maxsize: int
+    currsize: int
+
+
+class ConfigFileCache:
+    """The config files read, each kept until the file changes.
+
+    An entry is only used while the file has the same identity as when it was read:
+    the same inode, size and modification time, which a single stat per read
+    compares. A file edited since, e.g. by another process while the daemon runs,
+    is read again. Beyond maxsize the least recently read files are dropped.
+    """
+
+    # A file may be modified again without changing its mtime for as long as the
+    # timestamp resolution of its file system, so recently modified files are not
+    # cached
+    RACY_NS = 2_000_000_000
+
+    def __init__(self, maxsize: int = 16) -> None:
+        self.maxsize = maxsize
+        # By path, the identity of the file when read and its contents
+        self._entries: "OrderedDict[Path, Tuple[Tuple[int, int, int], Dict[str, Any]]]"
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._revalidations = 0
+
+    def read(
+        self, file_path: Path, read: Callable[[Path], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """The contents of file_path, as returned by read when it was last read."""
+        st = os.stat(file_path)
+        identity = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None and entry[0] == identity:
+                self._entries.move_to_end(file_path)
+                self._hits += 1
+                return entry[1]
+            if entry is None:
+                self._misses += 1
+            else:
+                self._revalidations += 1
+
+        result = read(file_path)
+        with self._lock:
+            if time.time_ns() - st.st_mtime_ns < self.RACY_NS:
+                self._entries.pop(file_path, None)
+            else:
+                self._entries[file_path] = (identity, result)
+                self._entries.move_to_end(file_path)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return result
+
+    def info(self) -> ConfigCacheInfo:
+        with self._lock:
+            return ConfigCacheInfo(
+                self._hits,
+                self._misses,
+                self._revalidations,
+                self.maxsize,
+                len(self._entries),
             )
-        )
-    )
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._revalidations = 0
 
 
 class AnacondaConfigTomlSettingsSource(PyprojectTomlConfigSettingsSource):
-    _cache: ClassVar[Dict[Path, Dict[str, Any]]] = {}
+    _cache: ClassVar[ConfigFileCache] = ConfigFileCache()
+
+    @classmethod
+    def cache_info(cls) -> ConfigCacheInfo:
+        """The hits, misses and revalidations of the config file cache."""
+        return cls._cache.info()
 
     def _read_file(self, file_path: Path) -> Dict[str, Any]:
         try:
-            result = self._cache.get(file_path)
-            if result is None:
-                result = super()._read_file(file_path)
-                self._cache[file_path] = result
-            return result
+            return self._cache.read(file_path, super()._read_file)
         except tomllib.TOMLDecodeError as e:
             arg = f"{anaconda_config_path()}: {e.args[0]}"
             raise AnacondaConfigTomlSyntaxError(arg)
 
 
+class InvocationSettingsSource(EnvSettingsSource):
+    """The environment variables set for the command being run, e.g. by `--at`.
+
+    They take precedence over os.environ, where they may be stale when a process
+    runs several commands.
+    """
+
+    def _load_env_vars(self) -> Mapping[str, Optional[str]]:
+        environ = invocation_environ()
+        if self.case_sensitive:
+            return environ
+        return {key.lower(): value for key, value in environ.items()}
+
+
 class AnacondaBaseSettings(BaseSettings):
     def __init_subclass__(
         cls,
@@ -141,7 +231,7 @@ class AnacondaBaseSettings(BaseSettings):
                 if kwarg in kwargs:
                     value = kwargs[str(kwarg)]
                     msg = f"- Error in init kwarg {e.title}({error['loc'][0]}={value})\n    {msg}"
-                elif env_var in os.environ:
+                elif env_var in os.environ or env_var in invocation_environ():
                     msg = f"- Error in environment variable {env_var}={input_value}\n    {msg}"
                 else:
                     table_header = ".".join(
@@ -167,6 +257,7 @@ class AnacondaBaseSettings(BaseSettings):
     ) -> Tuple[PydanticBaseSettingsSource, ...]:
         return (
             init_settings,
+            InvocationSettingsSource(settings_cls),
             env_settings,
             file_secret_settings,
             dotenv_settings,
@@ -379,11 +470,8 @@ class AnacondaBaseSettings(BaseSettings):
             with os.fdopen(tmp_fd, "wt") as f:
                 f.write(config_dump)
             # Atomic rename - if this fails, original file is untouched
+            # The cached config is read again, since the file has a new inode
             os.replace(tmp_path, config_toml)
-
-            # ensure that any existing cache of the config.toml file
-            # is cleared.
-            AnacondaConfigTomlSettingsSource._cache.clear()
         except Exception:
             # Clean up temp file if write or rename failed
             try:
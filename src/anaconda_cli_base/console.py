@@ -1,19 +1,30 @@
+"""The shared rich console, and interactive helpers built on it.
+
+rich is only imported once the console is first used: ``console`` is created on
+demand through the module ``__getattr__`` (PEP 562), so that commands which never
+print anything, and ``import anaconda_cli_base``, do not pay for it.
+"""
+
 import logging
 import os
-from typing import List, Sequence, Tuple, Union
+from typing import TYPE_CHECKING, Any, List, Sequence, Tuple, Union
+
+if TYPE_CHECKING:
+    from rich.console import Console
+    from rich.table import Table
 
-from readchar import key, readkey
-from rich.console import Console
-from rich.live import Live
-from rich.logging import RichHandler
-from rich.style import Style
-from rich.table import Table
+    console: Console
 
 __all__ = ["console", "select_from_list"]
 
-SELECTED = Style(color="green", bold=True)
 
-console = Console(soft_wrap=True)
+def __getattr__(name: str) -> Any:
+    if name == "console":
+        from rich.console import Console
+
+        globals()["console"] = value = Console(soft_wrap=True)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def init_logging() -> None:
@@ -25,6 +36,8 @@ def init_logging() -> None:
     #       here.
     log_level = os.getenv("LOGLEVEL", "INFO").upper()
     if log_level == "DEBUG":
+        from rich.logging import RichHandler
+
         logging.basicConfig(
             level=log_level,
             format="%(message)s",
@@ -33,14 +46,18 @@ def init_logging() -> None:
         )
 
 
-def _generate_table(header: str, rows: List[str], selected: int) -> Table:
+def _generate_table(header: str, rows: List[str], selected: int) -> "Table":
+    from rich.style import Style
+    from rich.table import Table
+
+    selected_style = Style(color="green", bold=True)
     table = Table(box=None)
 
     table.add_column(header)
 
     for i, row in enumerate(rows):
         if i == selected:
-            style = SELECTED
+            style = selected_style
             value = f"* {row}"
         else:
             style = None
@@ -55,6 +72,8 @@ def select_from_list(
 ) -> str:
     """Dynamically select from a list of choices, by using the up/down keys."""
     # inspired by https://github.com/Textualize/rich/discussions/1785#discussioncomment-1883808
+    from readchar import key, readkey
+    from rich.live import Live
 
     # Construct two lists, one of values, one for display
     # Display names are shown to the user, but values is indexed to return the value.
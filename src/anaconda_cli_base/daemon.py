@@ -0,0 +1,496 @@
+"""A warm daemon which runs ``anaconda`` commands without paying for startup.
+
+``anaconda daemon`` imports the CLI and every plugin once, then listens on a
+per-user Unix socket. The ``anaconda-fast`` client forwards its arguments,
+environment, working directory and stdio file descriptors to the daemon, which
+runs the command through the root command group, exactly as ``anaconda`` would,
+and sends back the exit code. The command reads and writes the client's own
+terminal, and Ctrl-C in the client interrupts the command in the daemon.
+
+The client falls back to running the command itself whenever no daemon is
+listening, or the daemon was started with a different set of plugins, so it can be
+used as a drop-in replacement for ``anaconda``.
+
+Commands run one at a time. The daemon exits after no command has been received
+for the idle timeout.
+
+On Linux, ``anaconda daemon --fork`` runs as a fork server (a "zygote") instead:
+each command runs in a fresh child process forked from the daemon, which shares
+the already imported modules copy-on-write. Commands are then isolated from each
+other, and several can run at the same time.
+
+Only the standard library is imported at module level, so that the client starts
+quickly.
+"""
+
+import json
+import logging
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from anaconda_cli_base import __version__
+from anaconda_cli_base import cache
+from anaconda_cli_base.plugin_index import plugin_fingerprint
+
+log = logging.getLogger(__name__)
+
+DEFAULT_IDLE_TIMEOUT = 600.0
+
+# Requests are a 4-byte length followed by a JSON payload, sent along with the
+# client's stdin, stdout and stderr file descriptors
+_HEADER = struct.Struct("!I")
+_STDIO_FDS = (0, 1, 2)
+
+# SOL_LOCAL and sizeof(struct xucred), for LOCAL_PEERCRED on macOS and BSD
+_SOL_LOCAL = 0
+_XUCRED_SIZE = 76
+
+# The exit code reported for a command interrupted with Ctrl-C
+_INTERRUPTED_EXIT_CODE = 130
+
+
+class DaemonError(RuntimeError):
+    """Raised when the daemon cannot be started."""
+
+
+def daemon_supported() -> bool:
+    return hasattr(socket, "AF_UNIX") and hasattr(socket, "send_fds")
+
+
+def fork_supported() -> bool:
+    # fork() without exec() is unsafe on macOS once system frameworks are loaded
+    return daemon_supported() and sys.platform.startswith("linux")
+
+
+def socket_path() -> Path:
+    """The path of the daemon socket for this user and environment.
+
+    Can be set explicitly with ANACONDA_CLI_DAEMON_SOCKET.
+    """
+    override = os.getenv("ANACONDA_CLI_DAEMON_SOCKET")
+    if override:
+        return Path(override)
+    # Unix socket paths are limited to ~100 characters, so the socket lives in a
+    # short per-user directory rather than in the cache directory
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    user_dir = Path(runtime_dir) / f"anaconda-cli-{os.getuid()}"
+    return user_dir / f"daemon-{cache.fingerprint(sys.prefix)[:12]}.sock"
+
+
+def _ensure_private_dir(path: Path) -> None:
+    """Create the directory of the socket, which only this user may access.
+
+    Another user could have created the directory first, e.g. in /tmp, to listen
+    on the socket in it, so an existing directory is checked too.
+    """
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    st = os.lstat(path)
+    if (
+        not stat.S_ISDIR(st.st_mode)
+        or st.st_uid != os.getuid()
+        or stat.S_IMODE(st.st_mode) != 0o700
+    ):
+        raise DaemonError(
+            f"{path} must be a directory owned by the current user with mode 0700"
+        )
+
+
+def _peer_uid(conn: socket.socket) -> Optional[int]:
+    """The uid of the process on the other end of conn, or None if unknown."""
+    try:
+        if hasattr(socket, "SO_PEERCRED"):
+            # struct ucred on Linux
+            creds = conn.getsockopt(
+                socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+            )
+            _, uid, _ = struct.unpack("3i", creds)
+            return uid
+        if hasattr(socket, "LOCAL_PEERCRED"):
+            # struct xucred on macOS and BSD, where cr_uid follows cr_version
+            creds = conn.getsockopt(_SOL_LOCAL, socket.LOCAL_PEERCRED, _XUCRED_SIZE)
+            _, uid = struct.unpack_from("2I", creds)
+            return uid
+    except OSError:
+        pass
+    return None
+
+
+def _environment_key() -> str:
+    """Identifies the CLI version and installed plugins, to detect a stale daemon."""
+    return cache.fingerprint(__version__, plugin_fingerprint())
+
+
+def _recv_exactly(conn: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed before the request was complete")
+        data += chunk
+    return data
+
+
+def _send_message(conn: socket.socket, message: Dict[str, Any]) -> None:
+    conn.sendall(json.dumps(message).encode() + b"\n")
+
+
+# Client
+
+
+def _stdio_fds() -> List[int]:
+    """The client's stdio file descriptors, with /dev/null in place of closed ones."""
+    fds = []
+    for fd in _STDIO_FDS:
+        try:
+            os.fstat(fd)
+            fds.append(fd)
+        except OSError:
+            fds.append(os.open(os.devnull, os.O_RDWR))
+    return fds
+
+
+def run_on_daemon(args: List[str]) -> Optional[int]:
+    """Run a command on the daemon, returning its exit code.
+
+    Returns None, without running anything, when no compatible daemon is available.
+    """
+    if not daemon_supported():
+        return None
+
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(str(socket_path()))
+    except OSError:
+        conn.close()
+        return None
+
+    with conn:
+        # The environment may hold credentials, only send it to this user's daemon
+        if _peer_uid(conn) != os.getuid():
+            log.debug("Not running on the daemon at %s of another user", socket_path())
+            return None
+
+        payload = json.dumps(
+            {
+                "argv": args,
+                "env": dict(os.environ),
+                "cwd": os.getcwd(),
+                "key": _environment_key(),
+            }
+        ).encode()
+        data = _HEADER.pack(len(payload)) + payload
+        sent = socket.send_fds(conn, [data], _stdio_fds())
+        if sent < len(data):
+            conn.sendall(data[sent:])
+
+        def forward_interrupt(signum: int, frame: Any) -> None:
+            try:
+                _send_message(conn, {"signal": signum})
+            except OSError:
+                pass
+
+        previous_handler = signal.signal(signal.SIGINT, forward_interrupt)
+        try:
+            reply = conn.makefile("rb").readline()
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
+
+    if not reply:
+        print("Error: the anaconda daemon exited during the command", file=sys.stderr)
+        return 1
+    result = json.loads(reply)
+    if result.get("stale"):
+        return None
+    return int(result["exit_code"])
+
+
+def client_main() -> None:
+    """Entry point of ``anaconda-fast``.
+
+    Runs the command on the daemon when one is available, otherwise in this process.
+    """
+    exit_code = run_on_daemon(sys.argv[1:])
+    if exit_code is None:
+        from anaconda_cli_base.cli import app
+
+        app()
+        exit_code = 0
+    sys.exit(exit_code)
+
+
+# Server
+
+
+def _recv_request(conn: socket.socket) -> Tuple[Dict[str, Any], List[int]]:
+    data, fds, _, _ = socket.recv_fds(conn, _HEADER.size, len(_STDIO_FDS))
+    data += _recv_exactly(conn, _HEADER.size - len(data))
+    (size,) = _HEADER.unpack(data)
+    return json.loads(_recv_exactly(conn, size)), fds
+
+
+class _InterruptForwarder(threading.Thread):
+    """Turns interrupts forwarded by the client into a SIGINT for the main thread."""
+
+    def __init__(self, conn: socket.socket) -> None:
+        super().__init__(daemon=True, name="anaconda-daemon-interrupts")
+        self.conn = conn
+        self.active = True
+        self._lock = threading.Lock()
+
+    def run(self) -> None:
+        try:
+            for line in self.conn.makefile("rb"):
+                message = json.loads(line)
+                with self._lock:
+                    if self.active and message.get("signal") == signal.SIGINT:
+                        signal.raise_signal(signal.SIGINT)
+        except (OSError, ValueError):
+            pass
+
+    def stop(self) -> None:
+        with self._lock:
+            self.active = False
+
+
+class Daemon:
+    """Serves commands from ``anaconda-fast`` clients on a Unix socket.
+
+    With fork set, each command runs in a child process forked from the daemon.
+    """
+
+    # How often a fork server checks for exited children, in seconds
+    CHILD_POLL_INTERVAL = 1.0
+
+    def __init__(
+        self,
+        path: Path,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        fork: bool = False,
+    ) -> None:
+        if fork and not fork_supported():
+            raise DaemonError("The fork server is only available on Linux")
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.fork = fork
+        self.key = _environment_key()
+        self.command = self._load_command()
+        self._children: Set[int] = set()
+        self._server: Optional[socket.socket] = None
+
+    @staticmethod
+    def _load_command() -> Any:
+        import typer
+
+        from anaconda_cli_base import cli
+
+        if not isinstance(cli.app, typer.Typer):
+            raise DaemonError(
+                "The daemon is not available while the legacy anaconda-client CLI "
+                "is selected"
+            )
+        command = typer.main.get_command(cli.app)
+        # Import every plugin now, so that no command has to
+        if isinstance(command, cli.LazyPluginGroup):
+            command._load_all_lazy_subcommands()
+        return command
+
+    def _bind(self) -> socket.socket:
+        _ensure_private_dir(self.path.parent)
+        if self.path.exists():
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(str(self.path))
+            except OSError:
+                # Left behind by a daemon which did not exit cleanly
+                self.path.unlink()
+            else:
+                raise DaemonError(f"A daemon is already listening on {self.path}")
+            finally:
+                probe.close()
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            server.bind(str(self.path))
+        finally:
+            os.umask(old_umask)
+        server.listen()
+        if self.fork:
+            server.settimeout(min(self.idle_timeout, self.CHILD_POLL_INTERVAL))
+        else:
+            server.settimeout(self.idle_timeout)
+        return server
+
+    def serve(self) -> None:
+        """Serve commands until idle for idle_timeout seconds."""
+        from anaconda_cli_base import telemetry
+
+        if self.fork:
+            # Children set up their own telemetry backend, see telemetry._after_fork
+            telemetry.shutdown_telemetry()
+
+        self._server = server = self._bind()
+        log.debug("Daemon listening on %s", self.path)
+        last_active = time.monotonic()
+        try:
+            with telemetry.session():
+                while True:
+                    try:
+                        conn, _ = server.accept()
+                    except socket.timeout:
+                        if self._reap_children():
+                            last_active = time.monotonic()
+                        idle = time.monotonic() - last_active
+                        if self._children or idle < self.idle_timeout:
+                            continue
+                        log.debug("Daemon idle for %ss, exiting", self.idle_timeout)
+                        break
+                    with conn:
+                        if not self._handle(conn):
+                            break
+                    last_active = time.monotonic()
+        finally:
+            server.close()
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+
+    def _reap_children(self) -> bool:
+        """Collect exited children, returning True if any exited."""
+        reaped = False
+        for pid in list(self._children):
+            try:
+                finished, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                finished = pid
+            if finished:
+                self._children.discard(pid)
+                reaped = True
+        return reaped
+
+    def _handle(self, conn: socket.socket) -> bool:
+        """Handle one request, returning False if the daemon should exit."""
+        conn.settimeout(None)
+        try:
+            request, fds = _recv_request(conn)
+        except (OSError, ValueError) as e:
+            log.debug("Invalid request: %s", e)
+            return True
+
+        try:
+            if request.get("key") != self.key:
+                # The plugins or the CLI were changed since the daemon started
+                _send_message(conn, {"stale": True})
+                return False
+
+            if self.fork:
+                self._children.add(self._fork_and_run(conn, request, fds))
+            else:
+                exit_code = self._run_with_interrupts(conn, request, fds)
+                _send_message(conn, {"exit_code": exit_code})
+        except OSError as e:
+            log.debug("Lost connection to client: %s", e)
+        finally:
+            for fd in fds:
+                os.close(fd)
+        return True
+
+    def _fork_and_run(
+        self, conn: socket.socket, request: Dict[str, Any], fds: List[int]
+    ) -> int:
+        """Run the command in a child process, which replies to the client itself."""
+        pid = os.fork()
+        if pid:
+            return pid
+
+        exit_code = 1
+        try:
+            if self._server is not None:
+                self._server.close()
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            exit_code = self._run_with_interrupts(conn, request, fds)
+            _send_message(conn, {"exit_code": exit_code})
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            os._exit(exit_code)
+
+    def _run_with_interrupts(
+        self, conn: socket.socket, request: Dict[str, Any], fds: List[int]
+    ) -> int:
+        forwarder = _InterruptForwarder(conn)
+        forwarder.start()
+        try:
+            return self._run(request, fds)
+        finally:
+            forwarder.stop()
+
+    def _run(self, request: Dict[str, Any], fds: List[int]) -> int:
+        """Run a command with the stdio, environment and cwd of the client."""
+        args: List[str] = request["argv"]
+        saved_fds = [os.dup(fd) for fd in _STDIO_FDS]
+        saved_env = dict(os.environ)
+        saved_cwd = os.getcwd()
+        saved_argv = sys.argv
+        sys.stdout.flush()
+        sys.stderr.flush()
+        try:
+            for target, fd in zip(_STDIO_FDS, fds):
+                os.dup2(fd, target)
+            os.environ.clear()
+            os.environ.update(request["env"])
+            os.chdir(request["cwd"])
+            sys.argv = ["anaconda", *args]
+
+            try:
+                self.command.main(args=args, prog_name="anaconda")
+            except SystemExit as e:
+                if e.code is None or isinstance(e.code, int):
+                    return e.code or 0
+                print(e.code, file=sys.stderr)
+                return 1
+            except KeyboardInterrupt:
+                return _INTERRUPTED_EXIT_CODE
+            except Exception:
+                traceback.print_exc()
+                return 1
+            return 0
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for target, fd in zip(_STDIO_FDS, saved_fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            os.environ.clear()
+            os.environ.update(saved_env)
+            os.chdir(saved_cwd)
+            sys.argv = saved_argv
+
+
+def serve(idle_timeout: float = DEFAULT_IDLE_TIMEOUT, fork: bool = False) -> None:
+    """Run the daemon in this process until it has been idle for idle_timeout."""
+    if not daemon_supported():
+        raise DaemonError("The daemon requires Unix domain sockets")
+
+    def terminate(signum: int, frame: Any) -> None:
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, terminate)
+    Daemon(socket_path(), idle_timeout=idle_timeout, fork=fork).serve()
@@ -0,0 +1,477 @@
+"""Diagnostic tools for the CLI and its plugins, run as ``anaconda debug <tool>``.
+
+This module is only imported when ``anaconda debug`` runs.
+"""
+
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import typer
+
+from anaconda_cli_base import cache
+from anaconda_cli_base.plugin_index import INDEXED_GROUPS
+from anaconda_cli_base.plugin_index import PLUGIN_GROUP_NAME
+from anaconda_cli_base.plugin_index import get_entry_points
+
+if TYPE_CHECKING:
+    from importlib.metadata import Distribution
+
+app = typer.Typer(
+    name="debug",
+    help="Diagnostic tools for the Anaconda CLI and its plugins.",
+    add_completion=False,
+    no_args_is_help=True,
+)
+
+
+@app.callback()
+def main() -> None:
+    """Diagnostic tools for the Anaconda CLI and its plugins."""
+
+
+# Components which the import time is attributed to, by top-level module
+COMPONENTS: Dict[str, Tuple[str, ...]] = {
+    "anaconda-cli-base": ("anaconda_cli_base",),
+    "typer/click": ("typer", "click", "shellingham", "annotated_doc"),
+    "rich": ("rich", "markdown_it", "mdurl", "pygments"),
+    "pydantic": (
+        "pydantic",
+        "pydantic_core",
+        "pydantic_settings",
+        "annotated_types",
+        "typing_inspection",
+        "dotenv",
+        "tomlkit",
+    ),
+    "opentelemetry": (
+        "opentelemetry",
+        "anaconda_opentelemetry",
+        "grpc",
+        "google",
+    ),
+}
+
+
+@dataclass
+class ImportNode:
+    """A module in the output of ``python -X importtime``."""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    children: List["ImportNode"] = field(default_factory=list)
+
+
+@dataclass
+class ComponentTime:
+    name: str
+    modules: int = 0
+    self_us: int = 0
+
+
+def parse_importtime(output: str) -> List[ImportNode]:
+    """Build the import tree from the output of ``python -X importtime``.
+
+    Each module is reported after the modules it imported, indented by two spaces
+    per level of nesting. Other lines, e.g. from the command itself, are skipped.
+    """
+    pending: Dict[int, List[ImportNode]] = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # The header
+        name = fields[2].rstrip()
+        level = (len(name) - len(name.lstrip())) // 2
+        node = ImportNode(
+            name=name.strip(),
+            self_us=int(fields[0]),
+            cumulative_us=int(fields[1]),
+            children=pending.pop(level + 1, []),
+        )
+        pending.setdefault(level, []).append(node)
+    return pending.get(0, [])
+
+
+def _plugin_distributions() -> Dict[str, str]:
+    """The distributions which provide plugins, by their top-level modules."""
+    from importlib.metadata import packages_distributions
+
+    plugin_dists = {
+        entry_point.dist_name
+        for entry_point in get_entry_points(PLUGIN_GROUP_NAME)
+        if entry_point.dist_name is not None
+    }
+    return {
+        module: dist
+        for module, dists in packages_distributions().items()
+        for dist in dists
+        if dist in plugin_dists
+    }
+
+
+def component_of(module: str, plugin_modules: Dict[str, str]) -> str:
+    top_level = module.partition(".")[0]
+    for component, modules in COMPONENTS.items():
+        if top_level in modules:
+            return component
+    if top_level in plugin_modules:
+        return f"plugin: {plugin_modules[top_level]}"
+    if top_level in sys.stdlib_module_names or top_level.startswith("_"):
+        return "stdlib"
+    return "other"
+
+
+def attribute(
+    roots: List[ImportNode], plugin_modules: Dict[str, str]
+) -> List[ComponentTime]:
+    """Sum the own import time and the number of modules of each component."""
+    components: Dict[str, ComponentTime] = {}
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        name = component_of(node.name, plugin_modules)
+        component = components.setdefault(name, ComponentTime(name))
+        component.modules += 1
+        component.self_us += node.self_us
+        stack.extend(node.children)
+    return sorted(components.values(), key=lambda c: c.self_us, reverse=True)
+
+
+def _prune(node: ImportNode, min_us: int, depth: int) -> Optional[dict]:
+    if node.cumulative_us < min_us:
+        return None
+    children = []
+    if depth > 1:
+        for child in sorted(node.children, key=lambda c: -c.cumulative_us):
+            pruned = _prune(child, min_us, depth - 1)
+            if pruned is not None:
+                children.append(pruned)
+    return {
+        "name": node.name,
+        "self_ms": node.self_us / 1000,
+        "cumulative_ms": node.cumulative_us / 1000,
+        "children": children,
+    }
+
+
+def _print_report(
+    args: List[str], components: List[ComponentTime], tree: List[dict]
+) -> None:
+    from rich.table import Table
+    from rich.tree import Tree
+
+    from anaconda_cli_base.console import console
+
+    total_us = sum(c.self_us for c in components)
+    table = Table(
+        title=f"Import time of `anaconda {' '.join(args)}`", header_style="bold green"
+    )
+    table.add_column("Component")
+    table.add_column("Modules", justify="right")
+    table.add_column("Time (ms)", justify="right")
+    table.add_column("Share", justify="right")
+    for c in components:
+        table.add_row(
+            c.name,
+            str(c.modules),
+            f"{c.self_us / 1000:.1f}",
+            f"{c.self_us / total_us:.0%}" if total_us else "",
+        )
+    table.add_row(
+        "Total", str(sum(c.modules for c in components)), f"{total_us / 1000:.1f}", ""
+    )
+    console.print(table)
+
+    def add(parent: Tree, node: dict) -> None:
+        branch = parent.add(
+            f"{node['name']} [dim]{node['cumulative_ms']:.1f} ms "
+            f"(self {node['self_ms']:.1f} ms)[/dim]"
+        )
+        for child in node["children"]:
+            add(branch, child)
+
+    root = Tree("Slowest imports (cumulative)")
+    for node in tree:
+        add(root, node)
+    console.print(root)
+
+
+@app.command("imports")
+def imports(
+    args: Optional[List[str]] = typer.Argument(
+        None,
+        help="The arguments of the anaconda command to profile. Defaults to --help.",
+    ),
+    min_ms: float = typer.Option(
+        2.0, "--min-ms", help="Leave out imports which took less time from the tree."
+    ),
+    depth: int = typer.Option(4, help="The depth of the tree of slowest imports."),
+    as_json: bool = typer.Option(False, "--json", help="Print the report as JSON."),
+) -> None:
+    """Attribute the import time of a command to the CLI, its dependencies and plugins.
+
+    The command is run again in a new process under `python -X importtime`, with the
+    CLI cache disabled so that every import happens as on a cold start. Put `--`
+    before the command to profile if it has options, e.g.
+    `anaconda debug imports -- org upload --help`.
+    """
+    args = args or ["--help"]
+    env = {**os.environ, "ANACONDA_CLI_DISABLE_CACHE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "anaconda_cli_base", *args],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=env,
+    )
+    roots = parse_importtime(result.stderr)
+    if not roots:
+        raise typer.BadParameter(
+            f"`anaconda {' '.join(args)}` exited with code {result.returncode} "
+            "without reporting any import times"
+        )
+
+    components = attribute(roots, _plugin_distributions())
+    slowest = sorted(roots, key=lambda n: -n.cumulative_us)
+    tree = [
+        pruned
+        for pruned in (_prune(node, int(min_ms * 1000), depth) for node in slowest)
+        if pruned is not None
+    ]
+
+    if as_json:
+        report = {
+            "args": args,
+            "exit_code": result.returncode,
+            "total_ms": sum(c.self_us for c in components) / 1000,
+            "components": [
+                {"name": c.name, "modules": c.modules, "ms": c.self_us / 1000}
+                for c in components
+            ],
+            "tree": tree,
+        }
+        sys.stdout.write(json.dumps(report, indent=2) + "\n")
+    else:
+        _print_report(args, components, tree)
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _requirement_names(dist: "Distribution") -> List[str]:
+    """The names of the distributions dist depends on, leaving out optional extras."""
+    names = []
+    for requirement in dist.requires or []:
+        if re.search(r"\bextra\s*==", requirement):
+            continue
+        match = re.match(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)", requirement)
+        if match:
+            names.append(match.group(1))
+    return names
+
+
+def _distributions(names: Iterable[str], dependencies: bool) -> List["Distribution"]:
+    """The installed distributions named, and what they depend on if dependencies."""
+    from importlib.metadata import PackageNotFoundError
+    from importlib.metadata import distribution
+
+    found: Dict[str, "Distribution"] = {}
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if _normalize(name) in found:
+            continue
+        try:
+            dist = distribution(name)
+        except PackageNotFoundError:
+            continue
+        found[_normalize(name)] = dist
+        if dependencies:
+            pending.extend(_requirement_names(dist))
+    return list(found.values())
+
+
+def _package_sources(module: str) -> List[Path]:
+    """The source files of a top-level module or package, wherever it is imported from.
+
+    Editable installs do not list their sources in the distribution metadata.
+    """
+    from importlib.util import find_spec
+
+    try:
+        spec = find_spec(module)
+    except (ImportError, ValueError):
+        return []
+    if spec is None or spec.origin is None or not spec.origin.endswith(".py"):
+        return []
+    if spec.submodule_search_locations is None:
+        return [Path(spec.origin)]
+    return [
+        path
+        for location in spec.submodule_search_locations
+        for path in Path(location).rglob("*.py")
+    ]
+
+
+def find_sources(dependencies: bool = True) -> List[Path]:
+    """The Python sources of anaconda-cli-base and of the registered plugins.
+
+    The distributions are those providing an entry point of an indexed group, and
+    their dependencies if dependencies is True.
+    """
+    entry_points = [ep for group in INDEXED_GROUPS for ep in get_entry_points(group)]
+    dist_names = ["anaconda-cli-base"]
+    dist_names.extend(ep.dist_name for ep in entry_points if ep.dist_name is not None)
+
+    sources: Set[Path] = set()
+    for dist in _distributions(dist_names, dependencies):
+        for file in dist.files or []:
+            if file.suffix == ".py":
+                sources.add(Path(str(dist.locate_file(file))))
+    for module in {"anaconda_cli_base", *(ep.module for ep in entry_points)}:
+        sources.update(_package_sources(module.partition(".")[0]))
+    return sorted(path for path in sources if path.is_file())
+
+
+def compile_sources(sources: Iterable[Path], prefix: Path) -> Tuple[int, int]:
+    """Compile sources into the pycache prefix, returning the numbers compiled and failed."""
+    import py_compile
+    from importlib.util import cache_from_source
+
+    compiled = failed = 0
+    saved_prefix = sys.pycache_prefix
+    # cache_from_source() maps a source to its path under sys.pycache_prefix
+    sys.pycache_prefix = str(prefix)
+    try:
+        for source in sources:
+            try:
+                py_compile.compile(
+                    str(source), cfile=cache_from_source(str(source)), doraise=True
+                )
+            except (py_compile.PyCompileError, OSError, ValueError):
+                failed += 1
+            else:
+                compiled += 1
+    finally:
+        sys.pycache_prefix = saved_prefix
+    return compiled, failed
+
+
+def _time_startup(args: List[str], env: Dict[str, str], runs: int) -> float:
+    """The median wall time, in ms, of running the CLI with args."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "anaconda_cli_base", *args],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=env,
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+@app.command("precompile")
+def precompile(
+    prefix: Optional[Path] = typer.Option(
+        None,
+        help=(
+            "The pycache prefix to compile into. Defaults to PYTHONPYCACHEPREFIX, "
+            "if set, or the pycache directory of the CLI cache."
+        ),
+    ),
+    dependencies: bool = typer.Option(
+        True, help="Also compile the dependencies of anaconda-cli-base and the plugins."
+    ),
+    runs: int = typer.Option(
+        3, min=0, help="Runs of `anaconda --help` to time before and after. 0 skips it."
+    ),
+    as_json: bool = typer.Option(False, "--json", help="Print the report as JSON."),
+) -> None:
+    """Compile the CLI and its plugins into a pycache prefix, for read-only installs.
+
+    Python only writes bytecode next to the sources, so when site-packages is
+    read-only every module is compiled again on each start. The modules of
+    anaconda-cli-base, of the distributions providing plugins and of their
+    dependencies are compiled into a writable prefix instead, which is used when
+    PYTHONPYCACHEPREFIX is set to it. `anaconda --help` is then run once with the
+    prefix, so that the standard library modules it imports are compiled too.
+
+    Can be run as a conda post-link step with `python -m anaconda_cli_base.debug
+    precompile`.
+    """
+    if prefix is None:
+        prefix = Path(sys.pycache_prefix or cache.cache_dir() / "pycache")
+    prefix = prefix.expanduser().resolve()
+
+    start = time.perf_counter()
+    compiled, failed = compile_sources(find_sources(dependencies), prefix)
+
+    env = {**os.environ, "ANACONDA_CLI_DISABLE_CACHE": "1"}
+    env.pop("PYTHONPYCACHEPREFIX", None)
+    with_prefix = {**env, "PYTHONPYCACHEPREFIX": str(prefix)}
+    with_prefix.pop("PYTHONDONTWRITEBYTECODE", None)
+    _time_startup(["--help"], with_prefix, runs=1)
+    compile_s = time.perf_counter() - start
+
+    before_ms = after_ms = None
+    if runs:
+        # As in a read-only install: the bytecode next to the sources is ignored
+        # with a pycache prefix, and none is written to the empty one, so every
+        # module is compiled on each run
+        with tempfile.TemporaryDirectory(prefix="anaconda-pycache-") as empty:
+            cold = {**env, "PYTHONPYCACHEPREFIX": empty, "PYTHONDONTWRITEBYTECODE": "1"}
+            before_ms = _time_startup(["--help"], cold, runs)
+        after_ms = _time_startup(["--help"], with_prefix, runs)
+
+    if as_json:
+        report = {
+            "prefix": str(prefix),
+            "compiled": compiled,
+            "failed": failed,
+            "seconds": round(compile_s, 2),
+            "before_ms": before_ms,
+            "after_ms": after_ms,
+        }
+        sys.stdout.write(json.dumps(report, indent=2) + "\n")
+        return
+
+    from anaconda_cli_base.console import console
+
+    console.print(
+        f"Compiled {compiled} modules into {prefix} in {compile_s:.1f} s"
+        + (f" ({failed} could not be compiled)" if failed else "")
+    )
+    if before_ms is not None and after_ms is not None:
+        console.print(
+            f"`anaconda --help` took {before_ms:.0f} ms without any bytecode and "
+            f"{after_ms:.0f} ms with the prefix, saving {before_ms - after_ms:.0f} ms"
+        )
+    if sys.pycache_prefix is None or Path(sys.pycache_prefix).resolve() != prefix:
+        console.print(f"Set PYTHONPYCACHEPREFIX={prefix} for the CLI to use it")
+
+
+if __name__ == "__main__":
+    app()
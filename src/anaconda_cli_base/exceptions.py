@@ -1,15 +1,15 @@
 import sys
-from collections import defaultdict
-from typing import Callable, Dict, Type
+from typing import TYPE_CHECKING, Any, Callable, Dict, Tuple, Type, Union
 
-from anaconda_cli_base.console import console
+if TYPE_CHECKING:
+    from anaconda_cli_base.retry import Retry
 
 if sys.version_info >= (3, 11):
     import tomllib
 else:
     import tomli as tomllib
 
-ErrorHandlingCallback = Callable[[Exception], int]
+ErrorHandlingCallback = Callable[[Exception], Union[int, "Retry"]]
 
 
 class AnacondaConfigTomlSyntaxError(tomllib.TOMLDecodeError): ...
@@ -18,18 +18,97 @@ class AnacondaConfigTomlSyntaxError(tomllib.TOMLDecodeError): ...
 class AnacondaConfigValidationError(ValueError): ...
 
 
+class PluginLoadError(ImportError):
+    """Raised when the entry point of a plugin fails to load."""
+
+    def __init__(self, plugin_name: str, entry_point: str) -> None:
+        self.plugin_name = plugin_name
+        module, _, _ = entry_point.partition(":")
+        super().__init__(
+            f"Failed to load plugin {plugin_name!r} from {entry_point!r}",
+            name=module.strip(),
+        )
+
+
 def catch_all(e: Exception) -> int:
+    from anaconda_cli_base.console import console
+
     console.print(f"[bold][red]{e.__class__.__name__}:[/bold][/red] ", end="")
     console.print(e, markup=False)
     return 1
 
 
-ERROR_HANDLERS: Dict[Type[Exception], ErrorHandlingCallback] = defaultdict(
-    lambda: catch_all
-)
+class ErrorHandlers(Dict[Type[Exception], ErrorHandlingCallback]):
+    """The registered error handlers, which also handle subclasses of their type.
+
+    Looking up an exception type without a handler of its own finds the handler of
+    the nearest class in its MRO, or `catch_all`. The handler found is cached per
+    type until the handlers change.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._resolved: Dict[type, ErrorHandlingCallback] = {}
+        self._generation = 0
+
+    def __missing__(self, exc: Type[Exception]) -> ErrorHandlingCallback:
+        try:
+            return self._resolved[exc]
+        except KeyError:
+            pass
+        generation = self._generation
+        handler: ErrorHandlingCallback = catch_all
+        for base in exc.__mro__:
+            if base in self:
+                handler = super().__getitem__(base)
+                break
+        # Unless a handler was registered meanwhile, by another thread
+        if generation == self._generation:
+            self._resolved[exc] = handler
+        return handler
+
+    def _invalidate(self) -> None:
+        self._generation += 1
+        self._resolved.clear()
+
+    def __setitem__(self, exc: Type[Exception], f: ErrorHandlingCallback) -> None:
+        super().__setitem__(exc, f)
+        self._invalidate()
+
+    def __delitem__(self, exc: Type[Exception]) -> None:
+        super().__delitem__(exc)
+        self._invalidate()
+
+    def pop(self, *args: Any) -> Any:
+        item = super().pop(*args)
+        self._invalidate()
+        return item
+
+    def popitem(self) -> Tuple[Type[Exception], ErrorHandlingCallback]:
+        item = super().popitem()
+        self._invalidate()
+        return item
+
+    def clear(self) -> None:
+        super().clear()
+        self._invalidate()
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        super().update(*args, **kwargs)
+        self._invalidate()
+
+    def setdefault(self, *args: Any) -> Any:
+        item = super().setdefault(*args)
+        self._invalidate()
+        return item
+
+
+ERROR_HANDLERS = ErrorHandlers()
 
 
 def register_error_handler(exc: Type[Exception]) -> Callable:
+    """Register the decorated function to handle exc, and its subclasses."""
+
     def decorator(f: ErrorHandlingCallback) -> Callable:
         ERROR_HANDLERS[exc] = f
         return f
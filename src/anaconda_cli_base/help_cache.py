@@ -0,0 +1,201 @@
+"""A cache of the rendered help for ``anaconda --help`` and ``anaconda <plugin> --help``.
+
+Rendering the root help builds the whole command tree, importing every plugin, and
+formats it with rich. The rendered text is cached on disk so that repeated help
+requests can be answered without building any Typer or Click objects.
+
+The cache key covers everything that can change the output: the installed plugins
+and their versions, the program name and the arguments, the terminal width and
+color mode, the ``ANACONDA_*`` environment variables and the identity of the config
+file.
+"""
+
+import logging
+import os
+import shutil
+import sys
+from typing import Any
+from typing import Callable
+from typing import Collection
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import TextIO
+
+from anaconda_cli_base import __version__
+from anaconda_cli_base import cache
+from anaconda_cli_base.plugin_index import anaconda_config_path
+from anaconda_cli_base.plugin_index import plugin_fingerprint
+
+log = logging.getLogger(__name__)
+
+CACHE_FILENAME = "help.json"
+
+# The number of rendered help texts to keep, most recently written first
+MAX_ENTRIES = 32
+
+HELP_FLAGS = ("--help", "-h")
+
+# Environment variables used by rich and typer to choose the width and colors
+_TERMINAL_ENV_VARS = (
+    "COLUMNS",
+    "LINES",
+    "TERM",
+    "COLORTERM",
+    "NO_COLOR",
+    "FORCE_COLOR",
+    "TERMINAL_WIDTH",
+    "_TYPER_FORCE_DISABLE_TERMINAL",
+)
+
+
+class CachedHelp(NamedTuple):
+    """The rendered help text for a set of arguments, and the code it exits with."""
+
+    output: str
+    exit_code: int
+
+    def show(self) -> None:
+        sys.stdout.write(self.output)
+        sys.stdout.flush()
+        sys.exit(self.exit_code)
+
+
+def is_cacheable_help_request(
+    args: Sequence[str], subcommands: Collection[str]
+) -> bool:
+    """Whether args request the root help, or the help of a plugin subcommand."""
+    if len(args) == 0:
+        return True
+    if len(args) == 1:
+        return args[0] in HELP_FLAGS
+    if len(args) == 2:
+        return args[0] in subcommands and args[1] in HELP_FLAGS
+    return False
+
+
+def _isatty(stream: TextIO) -> bool:
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def _config_file_identity() -> Optional[List[int]]:
+    try:
+        stat = os.stat(anaconda_config_path())
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _prog_name_sources() -> List[Optional[str]]:
+    """What click detects the program name in the usage from.
+
+    That is the basename of sys.argv[0], unless run with `python -m`, where it is
+    the package of __main__.
+    """
+    main_package = getattr(sys.modules.get("__main__"), "__package__", None)
+    return [os.path.basename(sys.argv[0]) if sys.argv else None, main_package]
+
+
+def help_cache_key(args: Sequence[str]) -> str:
+    environ = sorted(
+        (name, value)
+        for name, value in os.environ.items()
+        if name.startswith("ANACONDA_") or name in _TERMINAL_ENV_VARS
+    )
+    return cache.fingerprint(
+        __version__,
+        sys.prefix,
+        list(args),
+        _prog_name_sources(),
+        plugin_fingerprint(),
+        shutil.get_terminal_size().columns,
+        _isatty(sys.stdout),
+        environ,
+        _config_file_identity(),
+    )
+
+
+class _TeeStream:
+    """Forwards writes to a stream while keeping a copy of everything written.
+
+    All other attributes, e.g. isatty() and fileno(), are delegated so that rich
+    detects the same terminal capabilities as for the real stream.
+    """
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+        self._chunks: List[str] = []
+
+    def write(self, text: str) -> int:
+        # click probes for a binary stream with write(b""), which must fail here too
+        written = self.stream.write(text)
+        self._chunks.append(text)
+        return written
+
+    def getvalue(self) -> str:
+        return "".join(self._chunks)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.stream, name)
+
+
+def _exit_code(e: SystemExit) -> int:
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code
+    return 1
+
+
+def _read_entries() -> Dict[str, Dict[str, Any]]:
+    entries = cache.read_json(CACHE_FILENAME)
+    return entries if isinstance(entries, dict) else {}
+
+
+def _store(key: str, output: str, exit_code: int) -> None:
+    entries = _read_entries()
+    entries.pop(key, None)
+    entries = {
+        key: {"output": output, "exit_code": exit_code},
+        **dict(list(entries.items())[: MAX_ENTRIES - 1]),
+    }
+    cache.write_json(CACHE_FILENAME, entries)
+
+
+def get_cached_help(args: Sequence[str]) -> Optional[CachedHelp]:
+    """Return the cached help for args, if present and still valid."""
+    entry = _read_entries().get(help_cache_key(args))
+    if not isinstance(entry, dict) or not isinstance(entry.get("output"), str):
+        return None
+    exit_code = entry.get("exit_code", 0)
+    log.debug("Serving help for %s from the cache", list(args))
+    return CachedHelp(entry["output"], exit_code if isinstance(exit_code, int) else 0)
+
+
+def record_help(args: Sequence[str], invoke: Callable[[], Any]) -> Any:
+    """Call invoke to render the help for args, and cache its output.
+
+    Only output which renders successfully is cached. The root help exits with code
+    2 when no arguments are given, which is cached along with the text.
+    """
+    key = help_cache_key(args)
+    tee = _TeeStream(sys.stdout)
+    sys.stdout = tee  # type: ignore[assignment]
+    exit_code = 1
+    try:
+        result = invoke()
+        exit_code = 0
+        return result
+    except SystemExit as e:
+        exit_code = _exit_code(e)
+        raise
+    finally:
+        sys.stdout = tee.stream
+        output = tee.getvalue()
+        if output and exit_code in (0, 2):
+            _store(key, output, exit_code)
@@ -0,0 +1,82 @@
+"""The state of the command being run, scoped to its invocation.
+
+The root options choose things for the rest of the command, e.g. `--at` the site
+to use. These used to be handed on through process-wide state only, by setting
+ANACONDA_DEFAULT_SITE in os.environ and by rewriting sys.argv, which leaks into the
+next command of a process running several, like `anaconda batch` or the daemon.
+
+Each run of the root command group gets an `Invocation` instead, which is the
+current one for the duration of the command, through a context variable, and is
+also available as `ctx.obj.invocation`. The settings of `AnacondaBaseSettings`
+read its environment before os.environ. The process-wide state is still written,
+for plugins which read it directly.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+DEFAULT_SITE_ENV_VAR = "ANACONDA_DEFAULT_SITE"
+
+
+@dataclass
+class Invocation:
+    """What was chosen for the command being run."""
+
+    # The command line, as it would be in sys.argv
+    argv: List[str]
+    # Environment variables for this command only, read before os.environ
+    environ: Dict[str, str] = field(default_factory=dict)
+    # The options of the root command, once it has parsed them
+    params: Optional[Dict[str, Any]] = None
+    # The error of a command callback reported by its handler, with the exit code
+    handled: Optional[Tuple[BaseException, int]] = None
+    # The attempts of the commands retried by an error handler, as
+    # (attempt, duration in ms, error)
+    attempts: List[Tuple[int, float, Optional[BaseException]]] = field(
+        default_factory=list
+    )
+
+    @property
+    def site(self) -> Optional[str]:
+        """The site selected with `--at`, if any."""
+        return self.environ.get(DEFAULT_SITE_ENV_VAR)
+
+    @site.setter
+    def site(self, site: str) -> None:
+        self.environ[DEFAULT_SITE_ENV_VAR] = site
+
+
+_current: ContextVar[Optional[Invocation]] = ContextVar(
+    "anaconda_invocation", default=None
+)
+
+
+def current() -> Optional[Invocation]:
+    """The invocation of the command being run, if any."""
+    return _current.get()
+
+
+@contextmanager
+def invoked(argv: Sequence[str]) -> Iterator[Invocation]:
+    """Make a new invocation of the command line argv current within the block."""
+    invocation = Invocation(argv=list(argv))
+    token = _current.set(invocation)
+    try:
+        yield invocation
+    finally:
+        _current.reset(token)
+
+
+def invocation_environ() -> Dict[str, str]:
+    """The environment variables set for the command being run."""
+    invocation = _current.get()
+    return dict(invocation.environ) if invocation is not None else {}
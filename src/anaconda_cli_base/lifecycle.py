@@ -121,3 +121,20 @@ def _install_signal_handlers() -> None:
     except (OSError, ValueError):
         # Not on main thread or unsupported platform
         logger.debug("Could not install signal handlers", exc_info=True)
+
+
+def _after_fork() -> None:
+    """Reset the shutdown state in a forked child process.
+
+    The child has its own lifetime, so a shutdown triggered in the parent does not
+    carry over, and _trigger_lock may have been held by another thread at the time.
+    Registered hooks are kept.
+    """
+    global _trigger_lock, _triggered, _handlers_installed
+    _trigger_lock = threading.Lock()
+    _triggered = False
+    _handlers_installed = False
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,167 @@
+"""Run independent commands concurrently on a thread pool, in one process.
+
+Each command runs through the root command group on a worker thread, with its own
+click context (click keeps its context stack per thread), its own `ContextExtras`
+set by the root callback, and its own telemetry command info. What a command prints
+to sys.stdout and sys.stderr, which includes the rich console, is captured per
+thread and handed back with its result, in the order the commands were submitted.
+
+Not all state a command touches is per thread:
+
+* `--at` sets the site of the invocation, but also, for plugins which read it
+  directly, ANACONDA_DEFAULT_SITE in os.environ.
+* login, logout and whoami rewrite sys.argv for the legacy anaconda-client handler,
+  and set ANACONDA_DEFAULT_SITE for the others, in the same way.
+* the nested runners (batch, shell, serve and daemon) read stdin and replace
+  sys.stdout, sys.argv and os.environ themselves.
+
+Such commands are exclusive: they run on their own, after the commands submitted
+before them have finished and before any submitted after them starts, with the
+environment and sys.argv restored afterwards like a batch running one command at a
+time. Retries keep their state on the invocation of the command, and plugins are
+imported under a lock, so neither needs this.
+"""
+
+import io
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any
+from typing import Deque
+from typing import Generator
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import TextIO
+from typing import Tuple
+
+from anaconda_cli_base.batch import Completed
+from anaconda_cli_base.batch import dispatch
+from anaconda_cli_base.batch import isolated
+
+# Commands which change process-wide state, see the module docstring
+EXCLUSIVE_COMMANDS = frozenset(
+    {"login", "logout", "whoami", "batch", "shell", "serve", "daemon"}
+)
+
+
+def is_exclusive(args: List[str]) -> bool:
+    """Whether a command changes process-wide state, and must run on its own."""
+    return any(
+        arg == "--at" or arg.startswith("--at=") or arg in EXCLUSIVE_COMMANDS
+        for arg in args
+    )
+
+
+class ThreadOutput(io.TextIOBase):
+    """A stream which writes to a buffer of the current thread while capturing.
+
+    Threads which are not capturing write to the underlying stream.
+    """
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+        self._local = threading.local()
+
+    def _target(self) -> TextIO:
+        buffer: Optional[TextIO] = getattr(self._local, "buffer", None)
+        return self.stream if buffer is None else buffer
+
+    @contextmanager
+    def capture(self) -> Iterator[io.StringIO]:
+        """Capture what the current thread writes within the block."""
+        self._local.buffer = buffer = io.StringIO()
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def isatty(self) -> bool:
+        return self._target().isatty()
+
+    def fileno(self) -> int:
+        # Writing to the file descriptor would bypass the capture
+        if self._target() is not self.stream:
+            raise io.UnsupportedOperation("fileno")
+        return self.stream.fileno()
+
+    @property
+    def encoding(self) -> str:  # type: ignore[override]
+        return getattr(self.stream, "encoding", "utf-8")
+
+
+@contextmanager
+def thread_output() -> Iterator[Tuple[ThreadOutput, ThreadOutput]]:
+    """Replace sys.stdout and sys.stderr with streams which capture per thread."""
+    saved_stdout, saved_stderr = sys.stdout, sys.stderr
+    stdout, stderr = ThreadOutput(saved_stdout), ThreadOutput(saved_stderr)
+    sys.stdout, sys.stderr = stdout, stderr  # type: ignore[assignment]
+    try:
+        yield stdout, stderr
+    finally:
+        sys.stdout, sys.stderr = saved_stdout, saved_stderr
+
+
+def _run(
+    command: Any,
+    args: List[str],
+    stdout: ThreadOutput,
+    stderr: ThreadOutput,
+    exclusive: bool = False,
+) -> Completed:
+    start = time.perf_counter()
+    with stdout.capture() as out, stderr.capture() as err:
+        if exclusive:
+            with isolated(args):
+                outcome = dispatch(command, args)
+        else:
+            outcome = dispatch(command, args)
+    return Completed(
+        args=args,
+        outcome=outcome,
+        duration_ms=round((time.perf_counter() - start) * 1000, 1),
+        stdout=out.getvalue(),
+        stderr=err.getvalue(),
+    )
+
+
+def run_concurrently(
+    command: Any, commands: Iterable[List[str]], jobs: int
+) -> Generator[Completed, None, None]:
+    """Run up to jobs commands at once, yielding them in the order of commands.
+
+    Commands are submitted as their results are consumed, so that no more than jobs
+    are ahead of the consumer. Once the consumer stops, e.g. at the first failure,
+    the commands which were still running are finished, but not yielded.
+    """
+    # Neither sys.argv nor the environment are changed per command, apart from the
+    # exclusive ones, so they are restored once at the end
+    with isolated(sys.argv[1:]), thread_output() as (stdout, stderr):
+        with ThreadPoolExecutor(jobs, thread_name_prefix="anaconda-job") as pool:
+            pending: Deque["Future[Completed]"] = deque()
+            try:
+                for args in commands:
+                    if is_exclusive(args):
+                        while pending:
+                            yield pending.popleft().result()
+                        yield _run(command, args, stdout, stderr, exclusive=True)
+                        continue
+                    pending.append(pool.submit(_run, command, args, stdout, stderr))
+                    if len(pending) >= jobs:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
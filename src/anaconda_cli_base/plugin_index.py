@@ -0,0 +1,295 @@
+"""A persistent index of the entry points registered for the Anaconda CLI.
+
+``importlib.metadata.entry_points()`` scans every ``*.dist-info`` directory on
+``sys.path``, which is slow in large environments and on network filesystems.
+This module records the entry points of the groups used by the CLI, along with
+the name and version of the distribution providing each one, in a JSON file in
+the CLI cache directory.
+
+The index is keyed by ``sys.prefix``, the Python version, and the modification
+times of the ``sys.path`` entries. Installing or removing a package changes the
+modification time of its ``site-packages`` directory, so the index invalidates
+itself without having to look inside any ``*.dist-info`` directory.
+
+Only the standard library is imported here, and ``importlib.metadata`` only when
+the index has to be rebuilt or an entry point is loaded.
+
+The plugins to load can be narrowed down with an allowlist and a denylist, see
+`plugin_selection`.
+"""
+
+import logging
+import os
+import sys
+from dataclasses import asdict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+from anaconda_cli_base import cache
+
+log = logging.getLogger(__name__)
+
+PLUGIN_GROUP_NAME = "anaconda_cli.subcommand"
+MAIN_GROUP_NAME = "anaconda_cli.main"
+
+INDEXED_GROUPS = (PLUGIN_GROUP_NAME, MAIN_GROUP_NAME)
+
+# Bump when the layout of the index file changes
+INDEX_FORMAT_VERSION = 1
+
+# Comma-separated plugin names, taking precedence over [plugin_loading] in config.toml
+PLUGINS_ENV_VAR = "ANACONDA_CLI_PLUGINS"
+SKIP_PLUGINS_ENV_VAR = "ANACONDA_CLI_SKIP_PLUGINS"
+
+
+class DistributionInfo(NamedTuple):
+    """The subset of ``importlib.metadata.Distribution`` used by the CLI."""
+
+    name: str
+    version: str
+
+
+@dataclass(frozen=True)
+class IndexedEntryPoint:
+    """An entry point as recorded in the index.
+
+    Mirrors the parts of ``importlib.metadata.EntryPoint`` used by the CLI, but
+    can be loaded without touching the distribution metadata on disk.
+    """
+
+    name: str
+    value: str
+    group: str
+    dist_name: Optional[str] = None
+    dist_version: Optional[str] = None
+
+    @property
+    def dist(self) -> Optional[DistributionInfo]:
+        if self.dist_name is None:
+            return None
+        return DistributionInfo(self.dist_name, self.dist_version or "")
+
+    @property
+    def module(self) -> str:
+        return self.value.partition(":")[0].strip()
+
+    def load(self) -> Any:
+        """Import the module and return the object referred to by the entry point."""
+        from importlib.metadata import EntryPoint
+
+        return EntryPoint(self.name, self.value, self.group).load()
+
+
+def _index_filename() -> str:
+    return f"entry-points-{cache.fingerprint(sys.prefix)[:16]}.json"
+
+
+def _index_key() -> str:
+    """A fingerprint of the environment which changes when packages are installed."""
+    path_mtimes: List[Tuple[str, int]] = []
+    for path in sys.path:
+        try:
+            mtime = os.stat(path or os.curdir).st_mtime_ns
+        except OSError:
+            mtime = -1
+        path_mtimes.append((path, mtime))
+    return cache.fingerprint(
+        INDEX_FORMAT_VERSION, sys.prefix, sys.version, INDEXED_GROUPS, path_mtimes
+    )
+
+
+def _scan_entry_points() -> Dict[str, List[IndexedEntryPoint]]:
+    """Read the entry points of all indexed groups from the installed distributions."""
+    # Deferred, since the index usually makes scanning unnecessary
+    from importlib.metadata import entry_points
+
+    found = entry_points()
+    groups: Dict[str, List[IndexedEntryPoint]] = {}
+    for group in INDEXED_GROUPS:
+        groups[group] = []
+        for entry_point in found.select(group=group):
+            dist = entry_point.dist
+            groups[group].append(
+                IndexedEntryPoint(
+                    name=entry_point.name,
+                    value=entry_point.value,
+                    group=group,
+                    dist_name=dist.name if dist is not None else None,
+                    dist_version=dist.version if dist is not None else None,
+                )
+            )
+    return groups
+
+
+def _read_index(key: str) -> Optional[Dict[str, List[IndexedEntryPoint]]]:
+    data = cache.read_json(_index_filename())
+    if not isinstance(data, dict) or data.get("key") != key:
+        return None
+    try:
+        return {
+            group: [IndexedEntryPoint(**ep) for ep in data["groups"][group]]
+            for group in INDEXED_GROUPS
+        }
+    except (KeyError, TypeError):
+        return None
+
+
+def _write_index(key: str, groups: Dict[str, List[IndexedEntryPoint]]) -> None:
+    data = {
+        "key": key,
+        "groups": {
+            group: [asdict(ep) for ep in entry_points]
+            for group, entry_points in groups.items()
+        },
+    }
+    cache.write_json(_index_filename(), data)
+
+
+@lru_cache(maxsize=1)
+def load_index() -> Dict[str, Tuple[IndexedEntryPoint, ...]]:
+    """Return the entry points of all indexed groups, reading from the cache when valid.
+
+    The result is computed at most once per process.
+    """
+    key = _index_key()
+    groups = _read_index(key)
+    if groups is None:
+        log.debug("Entry-point index is missing or stale, scanning distributions")
+        groups = _scan_entry_points()
+        _write_index(key, groups)
+    return {group: tuple(eps) for group, eps in groups.items()}
+
+
+def get_entry_points(group: str) -> Tuple[IndexedEntryPoint, ...]:
+    """Return the entry points registered for an indexed group."""
+    if group not in INDEXED_GROUPS:
+        raise ValueError(f"Entry-point group {group!r} is not indexed")
+    return load_index()[group]
+
+
+def plugin_fingerprint() -> str:
+    """A hash of the installed plugins and their versions.
+
+    Suitable for keying any cached data derived from the set of installed plugins.
+    """
+    return cache.fingerprint(
+        sys.prefix,
+        [asdict(entry_point) for entry_point in get_entry_points(PLUGIN_GROUP_NAME)],
+    )
+
+
+@lru_cache(maxsize=1)
+def plugin_versions() -> Dict[str, str]:
+    """The versions of anaconda-cli-base and of each distribution providing a plugin.
+
+    Read from the entry-point index, so no plugin is imported and no distribution
+    metadata is parsed. Computed at most once per process.
+    """
+    from anaconda_cli_base import __version__
+
+    versions = {"anaconda-cli-base": __version__}
+    for entry_point in get_entry_points(PLUGIN_GROUP_NAME):
+        if entry_point.dist_name is not None:
+            versions[entry_point.dist_name] = entry_point.dist_version or ""
+    return versions
+
+
+@dataclass(frozen=True)
+class PluginSelection:
+    """The plugins to load: only those in allow, if set, and none of those in skip."""
+
+    allow: Optional[FrozenSet[str]] = None
+    skip: FrozenSet[str] = frozenset()
+
+    def includes(self, name: str) -> bool:
+        return (self.allow is None or name in self.allow) and name not in self.skip
+
+
+def _parse_names(value: Any) -> Optional[FrozenSet[str]]:
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list):
+        return None
+    return frozenset(str(name).strip() for name in value if str(name).strip())
+
+
+def anaconda_config_path() -> Path:
+    return Path(
+        os.path.expandvars(
+            os.path.expanduser(
+                os.getenv("ANACONDA_CONFIG_TOML", "~/.anaconda/config.toml")
+            )
+        )
+    )
+
+
+def _plugin_loading_table() -> Dict[str, Any]:
+    """The [plugin_loading] table of config.toml.
+
+    Read with tomllib rather than through `PluginLoadingConfig`, so that selecting
+    plugins does not import pydantic on every invocation. Errors are left for the
+    settings to report, if they are ever loaded.
+    """
+    try:
+        with open(anaconda_config_path(), "rb") as f:
+            table = tomllib.load(f).get("plugin_loading", {})
+    except (OSError, tomllib.TOMLDecodeError):
+        return {}
+    return table if isinstance(table, dict) else {}
+
+
+def plugin_selection() -> PluginSelection:
+    """The plugins selected with ANACONDA_CLI_PLUGINS and ANACONDA_CLI_SKIP_PLUGINS.
+
+    Either environment variable takes precedence over the plugins and skip_plugins
+    settings of the [plugin_loading] table in config.toml.
+    """
+    allow_env = os.getenv(PLUGINS_ENV_VAR)
+    skip_env = os.getenv(SKIP_PLUGINS_ENV_VAR)
+    table = {} if allow_env and skip_env else _plugin_loading_table()
+    allow = _parse_names(allow_env) if allow_env else _parse_names(table.get("plugins"))
+    skip = (
+        _parse_names(skip_env) if skip_env else _parse_names(table.get("skip_plugins"))
+    )
+    return PluginSelection(allow=allow, skip=skip or frozenset())
+
+
+def import_budget_set() -> bool:
+    """Whether max_import_ms or defer_slow_plugins of [plugin_loading] is set.
+
+    Checked in the environment and config.toml, like `plugin_selection`, so that
+    `PluginLoadingConfig` only needs to be loaded when there is a budget.
+    """
+    names = ("max_import_ms", "defer_slow_plugins")
+    env_vars = {f"ANACONDA_PLUGIN_LOADING_{name.upper()}" for name in names}
+    if any(key.upper() in env_vars for key in os.environ):
+        return True
+    table = _plugin_loading_table()
+    return any(name in table for name in names)
+
+
+def select_entry_points(
+    entry_points: Iterable[IndexedEntryPoint], selection: PluginSelection
+) -> Tuple[List[IndexedEntryPoint], List[IndexedEntryPoint]]:
+    """Split entry_points into those selected and those skipped."""
+    selected: List[IndexedEntryPoint] = []
+    skipped: List[IndexedEntryPoint] = []
+    for entry_point in entry_points:
+        (selected if selection.includes(entry_point.name) else skipped).append(
+            entry_point
+        )
+    return selected, skipped
@@ -0,0 +1,24 @@
+from typing import List
+from typing import Optional
+
+from pydantic import Field
+
+from anaconda_cli_base.config import AnacondaBaseSettings
+
+
+class PluginLoadingConfig(AnacondaBaseSettings, table_name="plugin_loading"):
+    """Plugin loading configuration.
+
+    Reads from [plugin_loading] in ~/.anaconda/config.toml.
+    Environment variables use ANACONDA_PLUGIN_LOADING_ prefix.
+    """
+
+    # Warn about any plugin which takes longer than this to import
+    max_import_ms: Optional[float] = Field(default=None, gt=0)
+    # Remember plugins over the budget, and only import them on demand afterwards
+    defer_slow_plugins: bool = False
+    # Only load these plugins, by subcommand name. Also read, without this class,
+    # by anaconda_cli_base.plugin_index.plugin_selection at startup.
+    plugins: Optional[List[str]] = None
+    # Never load these plugins, by subcommand name
+    skip_plugins: List[str] = []
@@ -1,63 +1,249 @@
 import logging
 import os
+import re
 import sys
+import threading
+import time
 import warnings
-from importlib.metadata import EntryPoint, Distribution
-from importlib.metadata import entry_points
-from sys import version_info
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import Distribution
+from typing import TYPE_CHECKING
 from typing import Any
 from typing import Callable
+from typing import Collection
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Sequence
 from typing import Tuple
-from typing import cast
-from typing import Set
 from typing import Union
 
 import typer
-from rich.table import Table
 from typer.models import DefaultPlaceholder
 
-from anaconda_cli_base.console import console, select_from_list
 from anaconda_cli_base import __version__
+from anaconda_cli_base import cache
+from anaconda_cli_base import startup_profile
+from anaconda_cli_base.exceptions import PluginLoadError
+from anaconda_cli_base.invocation import DEFAULT_SITE_ENV_VAR
+from anaconda_cli_base.invocation import current as current_invocation
+from anaconda_cli_base.plugin_index import PLUGIN_GROUP_NAME
+from anaconda_cli_base.plugin_index import DistributionInfo
+from anaconda_cli_base.plugin_index import IndexedEntryPoint
+from anaconda_cli_base.plugin_index import get_entry_points
+from anaconda_cli_base.plugin_index import import_budget_set
+from anaconda_cli_base.plugin_index import plugin_selection
+from anaconda_cli_base.plugin_index import select_entry_points
+from anaconda_cli_base.plugin_index import plugin_versions as indexed_plugin_versions
+
+if TYPE_CHECKING:
+    from anaconda_cli_base.plugin_loading_config import PluginLoadingConfig
 
 log = logging.getLogger(__name__)
 
-PLUGIN_GROUP_NAME = "anaconda_cli.subcommand"
-
 # Plugins which are available but hidden from help text
 HIDDEN_PLUGINS = ["cloud"]
 
+# Upper bound on the number of threads importing plugins when
+# ANACONDA_CLI_PARALLEL_PLUGIN_IMPORTS is set
+MAX_IMPORT_WORKERS = 8
+
+# Plugins found over the import budget, recorded in the CLI cache directory
+SLOW_PLUGINS_FILENAME = "slow-plugins.json"
+_slow_plugins_lock = threading.Lock()
+
 # Type aliases
 PluginName = str
 ModuleName = str
 SiteName = str
 SiteDisplayName = str
+LoadedEntryPoint = Tuple[
+    PluginName,
+    ModuleName,
+    typer.Typer,
+    Union[Distribution, DistributionInfo, None],
+]
 
 
-def _load_entry_points_for_group(
-    group: str,
-) -> List[Tuple[PluginName, ModuleName, typer.Typer, Union[Distribution, None]]]:
-    # The API was changed in Python 3.10, see https://docs.python.org/3/library/importlib.metadata.html#entry-points
-    found_entry_points: Tuple[EntryPoint, ...]
-    if version_info.major == 3 and version_info.minor <= 9:
-        found_entry_points = cast(
-            Tuple[EntryPoint, ...],
-            entry_points().get(group, tuple()),  # type:ignore
-        )
+def _plugin_loading_config() -> Optional["PluginLoadingConfig"]:
+    """The [plugin_loading] settings, or None when no import budget is set.
+
+    The settings import pydantic, which loading a plugin otherwise does not need.
+    """
+    if not import_budget_set():
+        return None
+    from anaconda_cli_base.plugin_loading_config import PluginLoadingConfig
+
+    return PluginLoadingConfig()
+
+
+def _read_slow_plugins() -> Dict[PluginName, Dict[str, Any]]:
+    slow_plugins = cache.read_json(SLOW_PLUGINS_FILENAME)
+    return slow_plugins if isinstance(slow_plugins, dict) else {}
+
+
+def _record_slow_plugin(entry_point: IndexedEntryPoint, import_ms: float) -> None:
+    with _slow_plugins_lock:
+        slow_plugins = _read_slow_plugins()
+        slow_plugins[entry_point.name] = {
+            "value": entry_point.value,
+            "dist_version": entry_point.dist_version,
+            "import_ms": round(import_ms, 1),
+        }
+        cache.write_json(SLOW_PLUGINS_FILENAME, slow_plugins)
+
+
+def _deferred_plugins(
+    entry_points: Sequence[IndexedEntryPoint],
+) -> Dict[PluginName, IndexedEntryPoint]:
+    """The plugins recorded as over the import budget, when they are to be deferred.
+
+    A record only applies to the version of the plugin that was measured, so a plugin
+    is imported and measured again after it is upgraded.
+    """
+    config = _plugin_loading_config()
+    if config is None or not config.defer_slow_plugins:
+        return {}
+    slow_plugins = _read_slow_plugins()
+    deferred = {}
+    for entry_point in entry_points:
+        record = slow_plugins.get(entry_point.name)
+        if (
+            isinstance(record, dict)
+            and record.get("value") == entry_point.value
+            and record.get("dist_version") == entry_point.dist_version
+        ):
+            deferred[entry_point.name] = entry_point
+    return deferred
+
+
+def _check_import_budget(
+    entry_point: IndexedEntryPoint,
+    subcommand_app: typer.Typer,
+    import_ms: float,
+    config: "PluginLoadingConfig",
+) -> None:
+    """Warn about a plugin which took longer than max_import_ms to import.
+
+    With defer_slow_plugins set, the plugin is also recorded so that later runs
+    only import it when it is invoked. Plugins providing a login command are never
+    deferred, since the login, logout and whoami actions need every auth handler.
+    """
+    if config.max_import_ms is None or import_ms <= config.max_import_ms:
+        return
+
+    if entry_point.dist_name is not None:
+        source = f"{entry_point.dist_name} {entry_point.dist_version or ''}".strip()
     else:
-        found_entry_points = tuple(entry_points().select(group=group))  # type: ignore
+        source = entry_point.value
+    log.warning(
+        "Plugin '%s' (%s) took %.0f ms to import, over the budget of %.0f ms",
+        entry_point.name,
+        source,
+        import_ms,
+        config.max_import_ms,
+    )
+
+    provides_login = "login" in [
+        cmd.name for cmd in getattr(subcommand_app, "registered_commands", [])
+    ]
+    if config.defer_slow_plugins and not provides_login:
+        _record_slow_plugin(entry_point, import_ms)
+
+
+def _import_entry_point(
+    entry_point: IndexedEntryPoint, config: Optional["PluginLoadingConfig"] = None
+) -> LoadedEntryPoint:
+    start = time.perf_counter()
+    try:
+        module: typer.Typer = entry_point.load()
+    except Exception as e:
+        raise PluginLoadError(entry_point.name, entry_point.value) from e
+    if config is not None:
+        import_ms = (time.perf_counter() - start) * 1000
+        _check_import_budget(entry_point, module, import_ms, config)
+    return (entry_point.name, entry_point.value, module, entry_point.dist)
+
+
+def _load_entry_point(
+    entry_point: IndexedEntryPoint, config: Optional["PluginLoadingConfig"] = None
+) -> LoadedEntryPoint:
+    with warnings.catch_warnings(), startup_profile.profile_import(
+        entry_point.name,
+        entry_point.value,
+        entry_point.dist_name,
+        entry_point.dist_version,
+    ):
+        # Suppress anaconda-cloud-auth rename warnings just during entrypoint load
+        warnings.filterwarnings("ignore", category=DeprecationWarning)
+        return _import_entry_point(entry_point, config)
 
-    loaded = []
-    for entry_point in found_entry_points:
-        with warnings.catch_warnings():
-            # Suppress anaconda-cloud-auth rename warnings just during entrypoint load
-            warnings.filterwarnings("ignore", category=DeprecationWarning)
-            module: typer.Typer = entry_point.load()
-        loaded.append((entry_point.name, entry_point.value, module, entry_point.dist))
 
-    return loaded
+def _ignore_plugin_deprecations(entry_points: Sequence[IndexedEntryPoint]) -> None:
+    """Ignore the deprecation warnings raised by the packages of entry_points.
+
+    A warning raised at the top of the module of an entry point with stacklevel=2
+    is attributed to importlib, which imports it, so those are ignored too.
+    """
+    packages = {entry_point.module.partition(".")[0] for entry_point in entry_points}
+    names = "|".join(re.escape(name) for name in sorted({"importlib", *packages}))
+    warnings.filterwarnings(
+        "ignore", category=DeprecationWarning, module=rf"(?:{names})(?:\.|$)"
+    )
+
+
+def _parallel_imports_enabled() -> bool:
+    return bool(os.getenv("ANACONDA_CLI_PARALLEL_PLUGIN_IMPORTS"))
+
+
+def _load_entry_points(
+    entry_points: Sequence[IndexedEntryPoint],
+) -> List[LoadedEntryPoint]:
+    """Import the plugins of entry_points, returning them in the same order.
+
+    The imports run on a thread pool when ANACONDA_CLI_PARALLEL_PLUGIN_IMPORTS is
+    set, since most of the time is spent reading and unmarshalling bytecode. If
+    any plugin fails to load, the error of the first failing plugin in
+    entry_points order is raised, regardless of which import finished first.
+
+    The imports always run serially while profiling startup, since new modules
+    and allocations cannot be attributed to a plugin otherwise.
+
+    Each import is measured against the [plugin_loading] max_import_ms budget, if
+    configured. Imports running in parallel contend for the GIL, so they are more
+    likely to exceed it.
+    """
+    if not entry_points:
+        return []
+
+    config = _plugin_loading_config()
+    parallel = _parallel_imports_enabled() and not startup_profile.enabled()
+    if not parallel or len(entry_points) < 2:
+        return [_load_entry_point(entry_point, config) for entry_point in entry_points]
+
+    # The warnings filters are process-global and catch_warnings() is not
+    # thread-safe, so the deprecation warnings of the plugins are suppressed once
+    # around the whole pool, rather than for each import.
+    with warnings.catch_warnings():
+        _ignore_plugin_deprecations(entry_points)
+        workers = min(len(entry_points), MAX_IMPORT_WORKERS)
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="anaconda-plugin-import"
+        ) as executor:
+            futures = [
+                executor.submit(_import_entry_point, entry_point, config)
+                for entry_point in entry_points
+            ]
+            return [future.result() for future in futures]
+
+
+def _load_entry_points_for_group(
+    group: str, exclude: Collection[PluginName] = ()
+) -> List[LoadedEntryPoint]:
+    # Entry points are read from the persistent index, which avoids scanning
+    # every *.dist-info directory on sys.path on each invocation
+    entry_points = [ep for ep in get_entry_points(group) if ep.name not in exclude]
+    return _load_entry_points(entry_points)
 
 
 AUTH_HANDLER_ALIASES = {
@@ -81,6 +267,10 @@ def _select_auth_handler_and_args(
     user input. Isolated to enable better testing to support legacy anaconda.org login
     flows.
     """
+    from anaconda_cli_base.console import console, select_from_list
+
+    invocation = current_invocation()
+
     # If we use one of the legacy anaconda-client parameters, we implicitly select
     # anaconda.org for the user.
     if (
@@ -127,64 +317,100 @@ def _select_auth_handler_and_args(
         if password:
             legacy_client_args.extend(["--password", password])
 
-        # We reconstruct sys.argv, dropping everything after the
-        # "login/logout/whoami" subcommand, and replacing with any passed options
+        # We reconstruct the command line, dropping everything after the
+        # "login/logout/whoami" subcommand, and replacing with any passed options.
+        # It is that of the invocation, which is sys.argv unless e.g. the command
+        # is one of several run by `anaconda batch`
+        argv = invocation.argv if invocation is not None else sys.argv
+
         def _find_subcommand_index(subcommands: list[str]) -> int:
             subcommands_str = "/".join(subcommands)
             for s in subcommands:
                 try:
-                    return sys.argv.index(s)
+                    return argv.index(s)
                 except ValueError:
                     pass
 
             raise ValueError(f"Must use a valid subcommand '{subcommands_str}'")
 
-        # Extend sys.argv so we grab everything including the entrypoint and
+        # Extend argv so we grab everything including the entrypoint and
         # the subcommand, but drop any options
         subcommand_index = _find_subcommand_index(["login", "logout", "whoami"])
-        sys.argv = sys.argv[: subcommand_index + 1] + legacy_client_args
+        argv = argv[: subcommand_index + 1] + legacy_client_args
 
-        # Now remove the '--at <value>' if it still appears in the sys.argv
+        # Now remove the '--at <value>' if it still appears in the argv
         # While still preserving any top-level args like '--verbose' or '--token <>'
         try:
-            at_index = sys.argv.index("--at")
-            sys.argv = sys.argv[:at_index] + sys.argv[at_index + 2 :]
+            at_index = argv.index("--at")
+            argv = argv[:at_index] + argv[at_index + 2 :]
         except ValueError:
             pass
 
+        if invocation is not None:
+            invocation.argv = argv
+        # The legacy anaconda-client handler reads sys.argv
+        sys.argv = argv
+
         args = legacy_client_args
     else:
         args = ctx.args
 
-        # Set globally to propagate to site config
-        os.environ["ANACONDA_DEFAULT_SITE"] = at
+        if invocation is not None:
+            invocation.site = at
+        # Set globally as well, for plugins which read the environment directly
+        os.environ[DEFAULT_SITE_ENV_VAR] = at
     return handler, args
 
 
+def _discover_auth_handlers(
+    auth_plugins: List[Tuple[PluginName, str, typer.Typer]],
+) -> Tuple[Dict[str, typer.Typer], List[Tuple[SiteName, SiteDisplayName]]]:
+    """Map the sites to log into onto the plugins which handle them.
+
+    Returns the auth handlers by site name, and the sorted choices for the picker.
+    """
+    auth_handlers: Dict[str, typer.Typer] = {}
+    auth_handler_selectors: List[Tuple[SiteName, SiteDisplayName]] = []
+    for name, value, subcommand_app in auth_plugins:
+        with startup_profile.profile_step(name, value, "auth_discovery_ms"):
+            _load_auth_handler(
+                subcommand_app, name, auth_handlers, auth_handler_selectors
+            )
+    return auth_handlers, sorted(auth_handler_selectors, key=_sort_selectors)
+
+
 def _add_auth_actions_to_app(
     app: typer.Typer,
-    auth_handlers: Dict[str, typer.Typer],
-    auth_handlers_dropdown: List[Tuple[SiteName, SiteDisplayName]],
+    auth_plugins: List[Tuple[PluginName, str, typer.Typer]],
 ) -> None:
+    # The sites are only discovered when one of the actions runs, since reading
+    # them imports anaconda_auth and validates its config
+
     # this ensures that we can reach the help message
     # for the handler chosen by the --at flag if it appears
     # before --help
     def handler_help(ctx: typer.Context, _: Any, at: Optional[str]) -> Optional[str]:
         show_help = ctx.params.get("help", False) is True
         if show_help:
+            from anaconda_cli_base.console import console
+
+            # Extract site names for help text
+            _, auth_handlers_dropdown = _discover_auth_handlers(auth_plugins)
+            site_names = [site_name for site_name, _ in auth_handlers_dropdown]
+            for param in ctx.command.params:
+                if isinstance(param, typer.core.TyperOption) and param.name == "at":
+                    param.help = f"Choose from {site_names}"
+
             help_str = ctx.get_help()
             console.print(help_str)
             raise typer.Exit()
 
         return at
 
-    # Extract site names for help text
-    site_names = [site_name for site_name, _ in auth_handlers_dropdown]
-
     def _action(
         ctx: typer.Context,
         at: Optional[str] = typer.Option(
-            None, help=f"Choose from {site_names}", callback=handler_help
+            None, help="Choose the site to use", callback=handler_help
         ),
         # Legacy options from anaconda-client login subcommand
         hostname: Optional[str] = typer.Option(None, hidden=True),
@@ -196,6 +422,7 @@ def _add_auth_actions_to_app(
         if ctx_at and at:
             raise ValueError("--at was specified twice")
 
+        auth_handlers, auth_handlers_dropdown = _discover_auth_handlers(auth_plugins)
         handler, args = _select_auth_handler_and_args(
             ctx=ctx,
             at=ctx_at or at,
@@ -277,54 +504,154 @@ def _sort_selectors(
         return (3, item)
 
 
-def load_registered_subcommands(app: typer.Typer) -> None:
-    """Load all subcommands from plugins."""
-    subcommand_entry_points = _load_entry_points_for_group(PLUGIN_GROUP_NAME)
-    auth_handlers: Dict[PluginName, typer.Typer] = {}
-    auth_handler_selectors: List[Tuple[SiteName, SiteDisplayName]] = []
-    plugin_versions: Set[Tuple[str, str]] = {
-        ("anaconda-cli-base", __version__),
-    }
+def _add_subcommands_to_app(
+    app: typer.Typer,
+    subcommand_entry_points: List[LoadedEntryPoint],
+    add_auth_actions: bool = True,
+) -> Dict[str, str]:
+    """Register loaded plugin apps as subcommands of app.
 
-    for name, value, subcommand_app, distribution in subcommand_entry_points:
-        # Allow plugins to disable this if they explicitly want to, but otherwise make True the default
+    The login/logout/whoami actions are only added when add_auth_actions is True,
+    since they need to know about every installed auth handler.
 
+    Returns the versions of the plugin distributions, by distribution name.
+    """
+    auth_plugins: List[Tuple[PluginName, str, typer.Typer]] = []
+    plugin_versions: Dict[str, str] = {}
+
+    for name, value, subcommand_app, distribution in subcommand_entry_points:
         if distribution is not None:
-            plugin_versions.add((distribution.name, distribution.version))
+            plugin_versions[distribution.name] = distribution.version
 
+        # Allow plugins to disable this if they explicitly want to, but otherwise make True the default
         if isinstance(subcommand_app.info.no_args_is_help, DefaultPlaceholder):
             subcommand_app.info.no_args_is_help = True
 
-        if "login" in [cmd.name for cmd in subcommand_app.registered_commands]:
-            _load_auth_handler(
-                subcommand_app, name, auth_handlers, auth_handler_selectors
+        if add_auth_actions and "login" in [
+            cmd.name for cmd in subcommand_app.registered_commands
+        ]:
+            auth_plugins.append((name, value, subcommand_app))
+
+        with startup_profile.profile_step(name, value, "add_typer_ms"):
+            app.add_typer(
+                subcommand_app,
+                name=name,
+                hidden=name in HIDDEN_PLUGINS,
+                rich_help_panel="Plugins",
             )
 
-        app.add_typer(
-            subcommand_app,
-            name=name,
-            hidden=name in HIDDEN_PLUGINS,
-            rich_help_panel="Plugins",
-        )
-
-    if auth_handlers:
-        auth_handlers_dropdown = sorted(auth_handler_selectors, key=_sort_selectors)
-        _add_auth_actions_to_app(
-            app=app,
-            auth_handlers=auth_handlers,
-            auth_handlers_dropdown=auth_handlers_dropdown,
-        )
-
         log.debug(
             "Loaded subcommand '%s' from '%s'",
             name,
             value,
         )
 
+    if auth_plugins:
+        _add_auth_actions_to_app(app=app, auth_plugins=auth_plugins)
+
+    return plugin_versions
+
+
+def print_versions_table(plugin_versions: Dict[str, str]) -> None:
+    from rich.table import Table
+
+    from anaconda_cli_base.console import console
+
+    table = Table("Package", "Version", header_style="bold green")
+    for plugin, version in plugin_versions.items():
+        table.add_row(plugin, version)
+    console.print(table)
+
+
+def _add_versions_command(app: typer.Typer, plugin_versions: Dict[str, str]) -> None:
+    plugin_versions = {"anaconda-cli-base": __version__, **plugin_versions}
+
     @app.command("versions", hidden=True)
     def versions() -> None:
-        table = Table("Package", "Version", header_style="bold green")
-        for plugin, version in plugin_versions:
-            table.add_row(plugin, version)
-        console.print(table)
+        print_versions_table(plugin_versions)
         raise typer.Exit()
+
+
+def _selected_plugins() -> Tuple[List[IndexedEntryPoint], List[IndexedEntryPoint]]:
+    """The plugin entry points to load, and those skipped by the plugin selection."""
+    selected, skipped = select_entry_points(
+        get_entry_points(PLUGIN_GROUP_NAME), plugin_selection()
+    )
+    if skipped:
+        log.debug("Skipping plugins %s", ", ".join(ep.name for ep in skipped))
+    return selected, skipped
+
+
+def _mark_skipped_versions(
+    plugin_versions: Dict[str, str], skipped: Sequence[IndexedEntryPoint]
+) -> Dict[str, str]:
+    """Record the distributions of which no plugin was loaded as skipped."""
+    plugin_versions = dict(plugin_versions)
+    for entry_point in skipped:
+        dist_name = entry_point.dist_name
+        if dist_name is not None and dist_name not in plugin_versions:
+            plugin_versions[dist_name] = f"{entry_point.dist_version or ''} (skipped)"
+    return plugin_versions
+
+
+def load_registered_subcommands(
+    app: typer.Typer,
+) -> Dict[PluginName, IndexedEntryPoint]:
+    """Load all subcommands from plugins.
+
+    Plugins left out by ANACONDA_CLI_PLUGINS or ANACONDA_CLI_SKIP_PLUGINS (see
+    `anaconda_cli_base.plugin_index.plugin_selection`) are never imported.
+
+    Plugins recorded as over the [plugin_loading] import budget are skipped when
+    defer_slow_plugins is set. They are returned by subcommand name, to be
+    registered lazily (see `anaconda_cli_base.cli.LazyPluginGroup`).
+    """
+    selected, skipped = _selected_plugins()
+    deferred = _deferred_plugins(selected)
+    subcommand_entry_points = _load_entry_points_for_group(
+        PLUGIN_GROUP_NAME, exclude={*deferred, *(ep.name for ep in skipped)}
+    )
+    plugin_versions = _add_subcommands_to_app(app, subcommand_entry_points)
+    for entry_point in deferred.values():
+        if entry_point.dist_name is not None:
+            plugin_versions[entry_point.dist_name] = entry_point.dist_version or ""
+    _add_versions_command(app, _mark_skipped_versions(plugin_versions, skipped))
+    return deferred
+
+
+def register_lazy_subcommands(
+    app: typer.Typer,
+) -> Dict[PluginName, IndexedEntryPoint]:
+    """Register plugin subcommands by name only, without importing any plugin.
+
+    The plugin versions are read from the shared entry-point metadata snapshot, so
+    that the versions command is available without loading the plugins.
+
+    Returns a mapping of subcommand name to entry point, for the group class to
+    import each plugin when its subcommand is resolved (see
+    `anaconda_cli_base.cli.LazyPluginGroup`). Plugins left out by the plugin
+    selection are not included.
+    """
+    selected, skipped = _selected_plugins()
+    loaded_dists = {ep.dist_name for ep in selected}
+    plugin_versions = {
+        dist_name: version
+        for dist_name, version in indexed_plugin_versions().items()
+        if dist_name in loaded_dists or dist_name == "anaconda-cli-base"
+    }
+    _add_versions_command(app, _mark_skipped_versions(plugin_versions, skipped))
+    return {entry_point.name: entry_point for entry_point in selected}
+
+
+def load_lazy_subcommands(
+    entry_points: List[IndexedEntryPoint], add_auth_actions: bool
+) -> typer.Typer:
+    """Import plugins which were registered lazily.
+
+    Returns a Typer app holding the plugin subcommands, and the auth actions if
+    add_auth_actions is True, ready to be merged into the root group.
+    """
+    loaded = _load_entry_points(entry_points)
+    staging_app = typer.Typer()
+    _add_subcommands_to_app(staging_app, loaded, add_auth_actions=add_auth_actions)
+    return staging_app
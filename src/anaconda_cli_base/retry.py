@@ -0,0 +1,55 @@
+"""Retrying a command whose error handler has corrected the cause of the error.
+
+An error handler registered with `register_error_handler` returns a `Retry` to
+have the command run again, e.g. after logging in, or after waiting for a service
+which was unavailable:
+
+    @register_error_handler(ServiceUnavailable)
+    def wait_and_retry(e: Exception) -> Union[int, Retry]:
+        return Retry(max_attempts=4, backoff=0.5, jitter=0.2)
+
+Returning -1, which predates `Retry`, retries once, without delay.
+
+Only the callback of the command which failed is run again, with the parameters
+click has already parsed and while its context is still open, rather than the whole
+command line. An error raised outside of a callback, e.g. while loading a plugin,
+runs the whole command again.
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Optional
+from typing import Union
+
+# The exit code of the error handlers which asks for a retry
+RETRY_EXIT_CODE = -1
+
+
+@dataclass(frozen=True)
+class Retry:
+    """The decision of an error handler to run the failed command again."""
+
+    # The number of attempts, including the one which failed first
+    max_attempts: int = 2
+    # The delay in seconds before the second attempt, multiplied for each further one
+    backoff: float = 0.0
+    multiplier: float = 2.0
+    max_backoff: float = 30.0
+    # The fraction of the delay which is random, from 0 to 1
+    jitter: float = 0.0
+    # The exit code once the attempts are exhausted, if the last error is not handled
+    exit_code: int = 1
+
+    def delay(self, attempt: int) -> float:
+        """The delay in seconds after the given attempt failed, counting from 1."""
+        delay = min(self.backoff * self.multiplier ** (attempt - 1), self.max_backoff)
+        return delay * (1 - self.jitter * random.random())
+
+
+def retry_decision(result: Union[int, Retry]) -> Optional[Retry]:
+    """The retry requested by the result of an error handler, if any."""
+    if isinstance(result, Retry):
+        return result
+    if result == RETRY_EXIT_CODE:
+        return Retry()
+    return None
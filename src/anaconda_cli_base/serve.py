@@ -0,0 +1,255 @@
+"""A JSON-RPC server, ``anaconda serve --stdio``, for IDE and agent integrations.
+
+Requests and responses are JSON-RPC 2.0 messages, one per line, on stdin and stdout.
+Commands are run in-process through the root command group, like ``anaconda
+shell`` does, so the CLI and its plugins are only loaded once. The ``run`` method
+takes the arguments of a command, without the leading ``anaconda``:
+
+    {"jsonrpc": "2.0", "id": 1, "method": "run", "params": {"args": ["--version"]}}
+
+and returns what the command printed, its exit code and duration, and the error
+which failed it, as reported by its handler from ERROR_HANDLERS:
+
+    {"jsonrpc": "2.0", "id": 1, "result": {"exit_code": 0, "stdout": "...",
+     "stderr": "", "duration_ms": 1.2, "error": null}}
+
+The ``shutdown`` method, EOF on stdin, SIGINT and SIGTERM stop the server. Batch
+requests are not supported.
+"""
+
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextlib import redirect_stderr
+from contextlib import redirect_stdout
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import Optional
+from typing import TextIO
+
+from anaconda_cli_base.batch import dispatch
+from anaconda_cli_base.batch import isolated
+from anaconda_cli_base.batch import Outcome
+from anaconda_cli_base.exceptions import ERROR_HANDLERS
+from anaconda_cli_base.lifecycle import long_running
+from anaconda_cli_base.lifecycle import register_shutdown_hook
+
+# The error codes defined by the JSON-RPC 2.0 specification
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+
+# How often, in seconds, the server checks whether it has been asked to stop
+POLL_INTERVAL = 0.2
+
+Message = Dict[str, Any]
+
+
+class InvalidParams(ValueError):
+    """Raised by a method for parameters it cannot accept."""
+
+
+def describe_error(outcome: Outcome) -> Optional[Dict[str, Any]]:
+    """The error which failed a command, as JSON."""
+    error = outcome.error
+    if error is None:
+        return None
+    format_message = getattr(error, "format_message", None)
+    handler: Optional[Callable] = None
+    if outcome.handled and isinstance(error, Exception):
+        handler = ERROR_HANDLERS[type(error)]
+    return {
+        "type": type(error).__name__,
+        "module": type(error).__module__,
+        "message": format_message() if callable(format_message) else str(error),
+        "handler": f"{handler.__module__}.{handler.__qualname__}" if handler else None,
+        "exit_code": outcome.exit_code,
+    }
+
+
+def _error(id_: Any, code: int, message: str) -> Message:
+    return {"jsonrpc": "2.0", "id": id_, "error": {"code": code, "message": message}}
+
+
+class Server:
+    """Answers the JSON-RPC requests read from input until it is stopped."""
+
+    def __init__(self, command: Any, input: TextIO, output: TextIO) -> None:
+        self.command = command
+        self.input = input
+        self.output = output
+        self.methods: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "run": self.run,
+            "shutdown": self.shutdown,
+        }
+        self._stopped = threading.Event()
+
+    def serve(self) -> int:
+        """Answer requests until EOF, `shutdown` or stop(), returning the exit code."""
+        lines: queue.Queue[Optional[str]] = queue.Queue()
+        # stdin is read from a thread, so that a shutdown hook, which cannot
+        # interrupt a blocking read, only has to set _stopped
+        reader = threading.Thread(
+            target=self._read, args=(lines,), name="anaconda-serve", daemon=True
+        )
+        reader.start()
+        try:
+            while not self._stopped.is_set():
+                try:
+                    line = lines.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+                if line is None:
+                    break
+                if not line.strip():
+                    continue
+                response = self.handle(line)
+                if response is not None:
+                    self._send(response)
+        except KeyboardInterrupt:
+            return 130
+        return 0
+
+    def stop(self) -> None:
+        """Stop serving once the current request has been answered."""
+        self._stopped.set()
+
+    def _read(self, lines: queue.Queue[Optional[str]]) -> None:
+        try:
+            for line in self.input:
+                lines.put(line)
+        finally:
+            lines.put(None)
+
+    def _send(self, message: Message) -> None:
+        self.output.write(json.dumps(message) + "\n")
+        self.output.flush()
+
+    def handle(self, line: str) -> Optional[Message]:
+        """Answer one request, returning None for a notification."""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return _error(None, PARSE_ERROR, f"Parse error: {e}")
+        if (
+            not isinstance(request, dict)
+            or request.get("jsonrpc") != "2.0"
+            or not isinstance(request.get("method"), str)
+        ):
+            id_ = request.get("id") if isinstance(request, dict) else None
+            return _error(id_, INVALID_REQUEST, "Invalid request")
+
+        id_ = request.get("id")
+        method = self.methods.get(request["method"])
+        params = request.get("params", {})
+        if method is None:
+            response = _error(
+                id_, METHOD_NOT_FOUND, f"Method not found: {request['method']}"
+            )
+        elif not isinstance(params, dict):
+            response = _error(id_, INVALID_PARAMS, "params must be an object")
+        else:
+            try:
+                response = {"jsonrpc": "2.0", "id": id_, "result": method(params)}
+            except InvalidParams as e:
+                response = _error(id_, INVALID_PARAMS, str(e))
+        # Notifications, without an id, are not answered
+        return response if "id" in request else None
+
+    def run(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a command, capturing its output.
+
+        params are `args`, the list of arguments, and optionally `stdin`, the text
+        the command reads from stdin, `env`, variables to add to the environment,
+        and `cwd`, the directory to run the command in.
+        """
+        args = params.get("args")
+        if not isinstance(args, list) or not all(isinstance(a, str) for a in args):
+            raise InvalidParams("args must be a list of strings")
+        stdin = params.get("stdin", "")
+        if not isinstance(stdin, str):
+            raise InvalidParams("stdin must be a string")
+        env = params.get("env", {})
+        if not isinstance(env, dict) or not all(
+            isinstance(v, str) for v in env.values()
+        ):
+            raise InvalidParams("env must be an object of strings")
+        cwd = params.get("cwd")
+        if cwd is not None and not (isinstance(cwd, str) and os.path.isdir(cwd)):
+            raise InvalidParams(f"cwd is not a directory: {cwd}")
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        saved_stdin, saved_cwd = sys.stdin, os.getcwd()
+        start = time.perf_counter()
+        with isolated(args):
+            os.environ.update(env)
+            try:
+                if cwd is not None:
+                    os.chdir(cwd)
+                # Commands must not read the requests which follow
+                sys.stdin = io.StringIO(stdin)
+                with redirect_stdout(stdout), redirect_stderr(stderr):
+                    outcome = dispatch(self.command, args, standalone_mode=False)
+            finally:
+                sys.stdin = saved_stdin
+                os.chdir(saved_cwd)
+        return {
+            "exit_code": outcome.exit_code,
+            "stdout": stdout.getvalue(),
+            "stderr": stderr.getvalue(),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            "error": describe_error(outcome),
+        }
+
+    def shutdown(self, params: Dict[str, Any]) -> None:
+        """Stop the server after answering."""
+        self.stop()
+
+
+@contextmanager
+def _protocol_output() -> Iterator[TextIO]:
+    """The stream for responses, which only the server may write to.
+
+    Where stdout is a file descriptor, its duplicate is used for responses and the
+    descriptor is pointed at stderr, so that output which bypasses sys.stdout, e.g.
+    from a subprocess, cannot corrupt the responses.
+    """
+    try:
+        fd = sys.stdout.fileno()
+        stderr_fd = sys.stderr.fileno()
+    except (AttributeError, ValueError, io.UnsupportedOperation):
+        yield sys.stdout
+        return
+
+    sys.stdout.flush()
+    saved_fd = os.dup(fd)
+    output = os.fdopen(os.dup(fd), "w", encoding="utf-8")
+    os.dup2(stderr_fd, fd)
+    try:
+        yield output
+    finally:
+        output.close()
+        sys.stdout.flush()
+        os.dup2(saved_fd, fd)
+        os.close(saved_fd)
+
+
+@long_running
+def serve_stdio(command: Any) -> int:
+    """Answer the JSON-RPC requests on stdin, returning the exit code.
+
+    SIGTERM and SIGINT stop the server, once the current request has been answered
+    for SIGTERM.
+    """
+    with _protocol_output() as output:
+        server = Server(command, sys.stdin, output)
+        register_shutdown_hook(server.stop)
+        return server.serve()
@@ -0,0 +1,180 @@
+"""An interactive shell, ``anaconda shell``, which runs commands in one process.
+
+The CLI, the plugins, the parsed configuration and the telemetry backend are only
+loaded once, so each command is dispatched without any startup cost. Commands are
+entered without the leading ``anaconda``, with line editing, history and TAB
+completion where the ``readline`` module is available.
+
+Each command runs through the root command group without standalone mode, so that
+neither an error nor ``typer.Exit`` ends the shell.
+"""
+
+import os
+import shlex
+import sys
+import time
+from pathlib import Path
+from typing import Any
+from typing import List
+from typing import Optional
+from typing import TextIO
+
+from anaconda_cli_base.batch import parse_line
+from anaconda_cli_base.batch import run_command
+from anaconda_cli_base.completion import CommandTree
+from anaconda_cli_base.completion import build_command_tree
+from anaconda_cli_base.completion import complete
+
+PROMPT = "anaconda> "
+EXIT_COMMANDS = ("exit", "quit")
+
+# The number of commands kept in the history file
+HISTORY_LENGTH = 1000
+
+
+def history_path() -> Path:
+    return Path(
+        os.path.expandvars(
+            os.path.expanduser(
+                os.getenv("ANACONDA_CLI_SHELL_HISTORY", "~/.anaconda/shell_history")
+            )
+        )
+    )
+
+
+class Shell:
+    """Reads commands from stdin and runs them until EOF or `exit`."""
+
+    def __init__(
+        self,
+        command: Any,
+        stdin: Optional[TextIO] = None,
+        timing: bool = False,
+    ) -> None:
+        self.command = command
+        self.stdin = stdin or sys.stdin
+        self.timing = timing
+        self.interactive = self.stdin.isatty()
+        self.exit_code = 0
+        self._tree: Optional[CommandTree] = None
+        self._matches: List[str] = []
+
+    @property
+    def tree(self) -> CommandTree:
+        """The command tree for completion, which imports every plugin once."""
+        if self._tree is None:
+            self._tree = build_command_tree(self.command)
+        return self._tree
+
+    def run(self) -> int:
+        """Run commands until EOF or `exit`, returning the last exit code."""
+        readline = self._setup_readline() if self.interactive else None
+        try:
+            while True:
+                try:
+                    line = self._read_line()
+                except KeyboardInterrupt:
+                    # Ctrl-C discards the line being edited, as in a shell
+                    print()
+                    continue
+                except EOFError:
+                    if self.interactive:
+                        print()
+                    break
+                if not self.run_line(line):
+                    break
+        finally:
+            if readline is not None:
+                self._save_history(readline)
+        return self.exit_code
+
+    def run_line(self, line: str) -> bool:
+        """Run the command on a line, returning False when the shell should exit."""
+        try:
+            args = parse_line(line)
+        except ValueError as e:
+            print(f"anaconda shell: {e}", file=sys.stderr)
+            self.exit_code = 2
+            return True
+        if not args:
+            return True
+        if args[0] in EXIT_COMMANDS:
+            if len(args) > 1 and args[1].isdigit():
+                self.exit_code = int(args[1])
+            return False
+        if args == ["help"]:
+            args = ["--help"]
+
+        start = time.perf_counter()
+        try:
+            self.exit_code = run_command(self.command, args, standalone_mode=False)
+        except KeyboardInterrupt:
+            print("\nInterrupted", file=sys.stderr)
+            self.exit_code = 130
+        if self.timing:
+            duration_ms = (time.perf_counter() - start) * 1000
+            print(
+                f"[exit code {self.exit_code} in {duration_ms:.1f} ms]",
+                file=sys.stderr,
+            )
+        return True
+
+    def _read_line(self) -> str:
+        if self.interactive:
+            return input(PROMPT)
+        line = self.stdin.readline()
+        if not line:
+            raise EOFError
+        return line
+
+    def completions(self, line: str) -> List[str]:
+        """The completions of the last word of line, which may be empty."""
+        try:
+            words = shlex.split(line)
+        except ValueError:
+            words = line.split()
+        if line and not line[-1].isspace() and words:
+            incomplete = words.pop()
+        else:
+            incomplete = ""
+        if words and words[0] == "anaconda":
+            words = words[1:]
+        return [value for value, _ in complete(self.tree, words, incomplete)]
+
+    def _complete(self, text: str, state: int) -> Optional[str]:
+        """The readline completer, called with state 0, 1, ... until it returns None."""
+        import readline
+
+        if state == 0:
+            line = readline.get_line_buffer()[: readline.get_endidx()]
+            self._matches = self.completions(line)
+        return self._matches[state] + " " if state < len(self._matches) else None
+
+    def _setup_readline(self) -> Optional[Any]:
+        try:
+            import readline
+        except ImportError:  # pragma: no cover
+            # Not available on Windows
+            return None
+
+        readline.set_completer(self._complete)
+        readline.set_completer_delims(" \t\n")
+        if "libedit" in (readline.__doc__ or ""):
+            readline.parse_and_bind("bind ^I rl_complete")
+        else:
+            readline.parse_and_bind("tab: complete")
+        try:
+            readline.read_history_file(history_path())
+        except OSError:
+            pass
+        readline.set_history_length(HISTORY_LENGTH)
+        return readline
+
+    @staticmethod
+    def _save_history(readline: Any) -> None:
+        path = history_path()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            readline.write_history_file(path)
+        except OSError:
+            pass
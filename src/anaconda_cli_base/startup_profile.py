@@ -0,0 +1,197 @@
+"""Instrumentation of plugin loading, enabled with ``ANACONDA_CLI_PROFILE_STARTUP``.
+
+For each plugin that is loaded, the profiler records the wall time of importing
+its entry point, the number of modules that import added to ``sys.modules``, the
+memory it allocated (as traced by ``tracemalloc``), and the time spent adding its
+Typer app to the CLI and discovering its auth handler.
+
+The report is written to stderr when the process exits, as a table by default or
+as JSON when ``ANACONDA_CLI_PROFILE_STARTUP=json``, so that it can be attached to
+a bug report against a slow plugin.
+
+Tracing allocations slows imports down considerably, so the absolute times in the
+report are only comparable with each other.
+"""
+
+import atexit
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict
+from dataclasses import dataclass
+from typing import Dict
+from typing import Iterator
+from typing import Optional
+from typing import TextIO
+
+ENV_VAR = "ANACONDA_CLI_PROFILE_STARTUP"
+
+_DISABLED_VALUES = ("", "0", "false", "no", "off")
+
+
+@dataclass
+class PluginProfile:
+    """The cost of loading a single plugin."""
+
+    name: str
+    entry_point: str
+    dist_name: Optional[str] = None
+    dist_version: Optional[str] = None
+    import_ms: float = 0.0
+    new_modules: int = 0
+    allocated_bytes: int = 0
+    add_typer_ms: float = 0.0
+    auth_discovery_ms: float = 0.0
+
+    @property
+    def total_ms(self) -> float:
+        return self.import_ms + self.add_typer_ms + self.auth_discovery_ms
+
+
+# Profiles by plugin name, in the order the plugins were loaded
+_profiles: Dict[str, PluginProfile] = {}
+_report_registered = False
+_started_tracemalloc = False
+
+
+def report_format() -> Optional[str]:
+    """Return "json" or "table" when profiling is enabled, otherwise None."""
+    value = os.getenv(ENV_VAR, "").strip().lower()
+    if value in _DISABLED_VALUES:
+        return None
+    return "json" if value == "json" else "table"
+
+
+def enabled() -> bool:
+    return report_format() is not None
+
+
+def _start() -> None:
+    global _report_registered, _started_tracemalloc
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    if not _report_registered:
+        atexit.register(report)
+        _report_registered = True
+
+
+@contextmanager
+def profile_import(
+    name: str,
+    entry_point: str,
+    dist_name: Optional[str] = None,
+    dist_version: Optional[str] = None,
+) -> Iterator[None]:
+    """Record the cost of importing the entry point of a plugin."""
+    if not enabled():
+        yield
+        return
+
+    _start()
+    profile = _profiles.setdefault(name, PluginProfile(name, entry_point))
+    profile.dist_name = dist_name
+    profile.dist_version = dist_version
+    modules_before = len(sys.modules)
+    allocated_before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.import_ms += (time.perf_counter() - start) * 1000
+        profile.new_modules += len(sys.modules) - modules_before
+        allocated_after, _ = tracemalloc.get_traced_memory()
+        profile.allocated_bytes += max(allocated_after - allocated_before, 0)
+
+
+@contextmanager
+def profile_step(name: str, entry_point: str, step: str) -> Iterator[None]:
+    """Record the time of a registration step for a plugin.
+
+    step is the name of the PluginProfile field to add the time to, i.e.
+    "add_typer_ms" or "auth_discovery_ms".
+    """
+    if not enabled():
+        yield
+        return
+
+    _start()
+    profile = _profiles.setdefault(name, PluginProfile(name, entry_point))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        setattr(profile, step, getattr(profile, step) + elapsed_ms)
+
+
+def get_profiles() -> Dict[str, PluginProfile]:
+    return dict(_profiles)
+
+
+def reset() -> None:
+    """Discard the recorded profiles, and stop tracing allocations if started here."""
+    global _started_tracemalloc
+    _profiles.clear()
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def report(stream: Optional[TextIO] = None) -> None:
+    """Write the profile of the plugins loaded so far to stream (stderr by default)."""
+    fmt = report_format()
+    if fmt is None:
+        return
+    stream = stream or sys.stderr
+    profiles = sorted(_profiles.values(), key=lambda p: p.total_ms, reverse=True)
+
+    if fmt == "json":
+        data = {
+            "plugins": [{**asdict(p), "total_ms": p.total_ms} for p in profiles],
+            "total_ms": sum(p.total_ms for p in profiles),
+        }
+        stream.write(json.dumps(data, indent=2) + "\n")
+        stream.flush()
+        return
+
+    from rich.console import Console
+    from rich.table import Table
+
+    table = Table(
+        title="Plugin startup profile (times in ms)", header_style="bold green"
+    )
+    table.add_column("Plugin", no_wrap=True)
+    table.add_column("Distribution", no_wrap=True)
+    for column in ("Import", "Modules", "Memory", "add_typer", "Auth", "Total"):
+        table.add_column(column, justify="right", no_wrap=True)
+    for p in profiles:
+        dist = f"{p.dist_name} {p.dist_version or ''}".strip() if p.dist_name else ""
+        table.add_row(
+            p.name,
+            dist,
+            f"{p.import_ms:.1f}",
+            str(p.new_modules),
+            _format_bytes(p.allocated_bytes),
+            f"{p.add_typer_ms:.1f}",
+            f"{p.auth_discovery_ms:.1f}",
+            f"{p.total_ms:.1f}",
+        )
+
+    # Never truncate the report to fit the terminal, it is meant to be shared
+    console = Console(file=stream)
+    width = console.measure(table, options=console.options.update_width(1000)).maximum
+    if width > console.width:
+        console = Console(file=stream, width=width)
+    console.print(table)
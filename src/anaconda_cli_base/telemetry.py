@@ -14,37 +14,71 @@ from collections.abc import Generator, Sequence
 from contextlib import contextmanager
 from contextvars import ContextVar
 from dataclasses import dataclass, field
-from functools import lru_cache
-from typing import Any, Dict, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
 
-from anaconda_cli_base.telemetry_config import (
-    TelemetryConfig,
-    AUTHENTICATED_ENDPOINT,
-    PUBLIC_ENDPOINT,
-)
+if TYPE_CHECKING:
+    from anaconda_cli_base.telemetry_config import TelemetryConfig
 
 logger = logging.getLogger(__name__)
 
 AttributeValue = Union[str, bool, int, float, Sequence[Union[str, bool, int, float]]]
 
-config = TelemetryConfig()
+_config: Optional["TelemetryConfig"] = None
+
+
+def _get_config() -> "TelemetryConfig":
+    """Read the telemetry settings on first use, to keep pydantic out of the import."""
+    global _config
+    if _config is None:
+        from anaconda_cli_base.telemetry_config import TelemetryConfig
+
+        _config = TelemetryConfig()
+    return _config
+
+
+def __getattr__(name: str) -> Any:
+    # The settings used to be read at import time as the module attribute `config`
+    if name == "config":
+        return _get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _sdk_disabled() -> bool:
+    # Also checked by TelemetryConfig, but this avoids reading the settings at all
+    return os.environ.get("OTEL_SDK_DISABLED", "").lower() in ("true", "1", "yes")
+
 
 _lock = threading.Lock()
 _initialized = False
 
+# Set while a long-lived process (e.g. `anaconda daemon`) runs several commands in
+# one telemetry session, which is shut down once when the session ends
+_session_active = False
+
+
+def _after_fork() -> None:
+    """Reset the backend state in a forked child process.
+
+    The exporter threads of the backend do not survive fork(), and _lock may have
+    been held by another thread at the time, so the child starts from scratch and
+    initializes its own backend when it first records something.
+    """
+    global _lock, _initialized, _session_active
+    _lock = threading.Lock()
+    _initialized = False
+    _session_active = False
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
 _suppress_http: ContextVar[bool] = ContextVar("_suppress_http", default=False)
 
 
-@lru_cache(maxsize=1)
 def _get_plugin_versions() -> Dict[str, str]:
-    from importlib.metadata import entry_points
-    from anaconda_cli_base import __version__
+    from anaconda_cli_base.plugin_index import plugin_versions
 
-    versions = {"anaconda-cli-base": __version__}
-    for ep in entry_points(group="anaconda_cli.subcommand"):
-        if ep.dist:
-            versions[ep.dist.name] = ep.dist.metadata["Version"]
-    return versions
+    return plugin_versions()
 
 
 def _detect_ci_vendor() -> str:
@@ -121,6 +155,9 @@ def _ensure_initialized() -> None:
     with _lock:
         if _initialized:
             return
+        if _sdk_disabled():
+            return
+        config = _get_config()
         if not config.enabled:
             return
         try:
@@ -133,6 +170,10 @@ def _ensure_initialized() -> None:
             import re
 
             from anaconda_cli_base import __version__
+            from anaconda_cli_base.telemetry_config import (
+                AUTHENTICATED_ENDPOINT,
+                PUBLIC_ENDPOINT,
+            )
 
             api_key = _get_api_key()
             if config.endpoint:
@@ -246,7 +287,52 @@ def _after_command(
     except Exception:
         pass
 
-    shutdown_telemetry()
+    if not _session_active:
+        shutdown_telemetry()
+
+
+def _record_attempt(
+    info: Optional[_CommandInfo],
+    attempt: int,
+    duration_ms: float,
+    error: Optional[BaseException] = None,
+) -> None:
+    """Record one attempt of a command which an error handler retries."""
+    if info is None:
+        return
+    try:
+        from anaconda_opentelemetry import record_histogram
+
+        attrs: Dict[str, AttributeValue] = {
+            "command": info.command,
+            "plugin": info.plugin,
+            "source": "anaconda-cli-base",
+            "attempt": attempt,
+            "success": error is None,
+            "error.type": type(error).__name__ if error else "",
+        }
+        record_histogram("cli_command_attempt_duration_ms", duration_ms, attrs)
+    except Exception:
+        pass
+
+
+@contextmanager
+def session() -> Generator[None, None, None]:
+    """Track every command run within the block in a single telemetry session.
+
+    The backend is kept alive between commands and flushed once on exit, rather
+    than after each command. Nested sessions are part of the outermost one.
+    """
+    global _session_active
+    if _session_active:
+        yield
+        return
+    _session_active = True
+    try:
+        yield
+    finally:
+        _session_active = False
+        shutdown_telemetry()
 
 
 def shutdown_telemetry(*, timeout_seconds: float | None = None) -> None:
@@ -269,7 +355,7 @@ def shutdown_telemetry(*, timeout_seconds: float | None = None) -> None:
         effective_timeout = (
             timeout_seconds
             if timeout_seconds is not None
-            else config.flush_timeout_ms / 1000.0
+            else _get_config().flush_timeout_ms / 1000.0
         )
         _upstream_shutdown(timeout_seconds=effective_timeout)
     except ImportError:
@@ -63,6 +63,14 @@ def disable_config_toml(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
     monkeypatch.setenv("ANACONDA_CONFIG_TOML", str(tmp_path / "empty-config.toml"))
 
 
+@pytest.fixture(autouse=True)
+def isolate_cache_dir(tmp_path: Path, monkeypatch: MonkeyPatch) -> Path:
+    """Keep the CLI's on-disk cache out of the user's home directory."""
+    path = tmp_path / "cli-cache"
+    monkeypatch.setenv("ANACONDA_CLI_CACHE_DIR", str(path))
+    return path
+
+
 @pytest.fixture()
 def tmp_cwd(monkeypatch: MonkeyPatch, tmp_path: Path) -> Path:
     """Create & return a temporary directory after setting current working directory to it."""
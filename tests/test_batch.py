@@ -0,0 +1,114 @@
+import json
+import os
+from pathlib import Path
+from typing import List
+
+import pytest
+import typer
+from pytest import MonkeyPatch
+from pytest_mock import MockerFixture
+
+import anaconda_cli_base.cli
+from anaconda_cli_base import telemetry
+from anaconda_cli_base.batch import parse_line
+from .conftest import CLIInvoker
+
+
+@pytest.fixture
+def contexts(monkeypatch: MonkeyPatch) -> List[typer.Context]:
+    """Register a command which records its context, and fails if asked to."""
+    # Set by --at in other tests
+    monkeypatch.delenv("ANACONDA_DEFAULT_SITE", raising=False)
+    recorded = []
+
+    @anaconda_cli_base.cli.app.command("record")
+    def record(ctx: typer.Context, fail: bool = False) -> None:
+        recorded.append(ctx)
+        print(f"site={os.getenv('ANACONDA_DEFAULT_SITE')}")
+        if fail:
+            raise typer.Exit(3)
+
+    return recorded
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("record --fail", ["record", "--fail"]),
+        ("anaconda --at 'my site' record", ["--at", "my site", "record"]),
+        ("  # a comment", []),
+        ("record  # trailing comment", ["record"]),
+        ("", []),
+    ],
+)
+def test_parse_line(line: str, expected: List[str]) -> None:
+    assert parse_line(line) == expected
+
+
+def test_parse_line_unbalanced_quotes() -> None:
+    with pytest.raises(ValueError):
+        parse_line("record 'oops")
+
+
+def test_batch(
+    invoke_cli: CLIInvoker, contexts: List[typer.Context], tmp_path: Path
+) -> None:
+    batch_file = tmp_path / "commands.txt"
+    batch_file.write_text(
+        "# Provisioning\n"
+        "anaconda --at example.com record\n"
+        "\n"
+        "record --fail\n"
+        "no-such-command\n"
+        "record\n"
+    )
+    report = tmp_path / "report.json"
+
+    result = invoke_cli(["batch", str(batch_file), "--report", str(report)])
+    assert result.exit_code == 3
+    # --at of the first command does not leak into the others
+    assert result.stdout.count("site=example.com\n") == 1
+    assert result.stdout.count("site=None\n") == 2
+    assert "line 4: exit code 3 in " in result.stderr
+    assert "4 commands, 2 failed" in result.stderr
+
+    # Every command has its own context extras
+    assert len({id(ctx.find_root().obj) for ctx in contexts}) == 3
+    assert contexts[0].find_root().obj.params["at"] == "example.com"
+    assert contexts[2].find_root().obj.params["at"] is None
+
+    results = json.loads(report.read_text())
+    assert [(r["line"], r["args"], r["exit_code"]) for r in results] == [
+        (2, ["--at", "example.com", "record"], 0),
+        (4, ["record", "--fail"], 3),
+        (5, ["no-such-command"], 2),
+        (6, ["record"], 0),
+    ]
+    assert all(r["duration_ms"] >= 0 for r in results)
+
+
+def test_batch_fail_fast_from_stdin(
+    invoke_cli: CLIInvoker, contexts: List[typer.Context]
+) -> None:
+    result = invoke_cli(
+        ["batch", "-", "--fail-fast"], input="record\nrecord --fail\nrecord\n"
+    )
+    assert result.exit_code == 3
+    assert len(contexts) == 2
+    assert "2 commands, 1 failed" in result.stderr
+
+
+def test_batch_missing_file(invoke_cli: CLIInvoker, tmp_path: Path) -> None:
+    result = invoke_cli(["batch", str(tmp_path / "missing.txt")])
+    assert result.exit_code == 2
+    assert "No such file or directory" in result.stderr
+
+
+def test_batch_flushes_telemetry_once(
+    invoke_cli: CLIInvoker, contexts: List[typer.Context], mocker: MockerFixture
+) -> None:
+    shutdown = mocker.patch.object(telemetry, "shutdown_telemetry")
+    result = invoke_cli(["batch", "-"], input="record\nrecord\nrecord\n")
+    assert result.exit_code == 0
+    assert len(contexts) == 3
+    shutdown.assert_called_once_with()
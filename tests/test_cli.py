@@ -1,12 +1,19 @@
 import importlib
+import io
 import itertools
+import json
 import os
 import re
 import subprocess
 import sys
+import threading
+import time
+import warnings
 from importlib.metadata import Distribution
 from functools import partial
+from pathlib import Path
 from typing import Annotated
+from typing import Dict
 from typing import Tuple
 from typing import Type
 from typing import cast
@@ -19,14 +26,23 @@ from packaging import version
 from pytest import MonkeyPatch
 from pytest_mock import MockerFixture
 from readchar import key
+from typer.testing import CliRunner
 
 import anaconda_cli_base.cli
 from anaconda_cli_base import __version__
 from anaconda_cli_base import console
+from anaconda_cli_base import startup_profile
 from anaconda_cli_base.cli import _select_main_entrypoint_app
+from anaconda_cli_base.exceptions import PluginLoadError
 from anaconda_cli_base.exceptions import register_error_handler
+from anaconda_cli_base.plugin_index import DistributionInfo
+from anaconda_cli_base.plugin_index import IndexedEntryPoint
+from anaconda_cli_base.plugin_index import plugin_versions
 from anaconda_cli_base.plugins import (
+    SLOW_PLUGINS_FILENAME,
+    _load_entry_points,
     load_registered_subcommands,
+    register_lazy_subcommands,
     _select_auth_handler_and_args,
 )
 
@@ -247,6 +263,349 @@ def test_load_dummy_plugin(
     assert "--force" in result.stdout
 
 
+@pytest.fixture
+def lazy_plugins(
+    plugin: ENTRY_POINT_TUPLE,
+    dummy_plugin: ENTRY_POINT_TUPLE,
+    mocker: MockerFixture,
+    monkeypatch: MonkeyPatch,
+) -> Generator[Dict[str, MagicMock], None, None]:
+    """Register two plugins lazily, returning their mocked entry points by name."""
+    entry_points = {}
+    for name, value, subcommand_app, dist in (plugin, dummy_plugin):
+        assert dist is not None
+        entry_point = mocker.Mock(spec=IndexedEntryPoint)
+        entry_point.name = name
+        entry_point.value = value
+        entry_point.dist = dist
+        entry_point.dist_name = dist.name
+        entry_point.dist_version = dist.version
+        entry_point.load.return_value = subcommand_app
+        entry_points[name] = entry_point
+
+    for target in ("plugins", "plugin_index"):
+        mocker.patch(
+            f"anaconda_cli_base.{target}.get_entry_points",
+            return_value=list(entry_points.values()),
+        )
+    plugin_versions.cache_clear()
+    monkeypatch.setattr(
+        anaconda_cli_base.cli.LazyPluginGroup,
+        "lazy_subcommands",
+        register_lazy_subcommands(cast(typer.Typer, anaconda_cli_base.cli.app)),
+    )
+    yield entry_points
+    plugin_versions.cache_clear()
+
+
+def test_lazy_plugin_imported_on_dispatch(
+    invoke_cli: CLIInvoker, lazy_plugins: Dict[str, MagicMock]
+) -> None:
+    assert anaconda_cli_base.cli.app.registered_groups == []
+
+    result = invoke_cli(["plugin", "action"])
+    assert result.exit_code == 0
+    assert result.stdout == "done\n"
+
+    lazy_plugins["plugin"].load.assert_called_once()
+    lazy_plugins["dummy"].load.assert_not_called()
+
+
+def test_lazy_plugin_versions_without_import(
+    invoke_cli: CLIInvoker, lazy_plugins: Dict[str, MagicMock]
+) -> None:
+    result = invoke_cli(["versions"])
+    assert result.exit_code == 0
+    assert plugin_version_in_table("plugin", "0.0.1plugin", result.stdout)
+    assert plugin_version_in_table("auth-plugin", "0.0.1auth-plugin", result.stdout)
+
+    for entry_point in lazy_plugins.values():
+        entry_point.load.assert_not_called()
+
+
+@pytest.mark.parametrize("flag", ["-V", "--version"])
+def test_version_flag_skips_command_tree(
+    flag: str,
+    lazy_plugins: Dict[str, MagicMock],
+    mocker: MockerFixture,
+    monkeypatch: MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    get_command = mocker.spy(typer.main, "get_command")
+    monkeypatch.setattr(sys, "argv", ["anaconda", flag])
+    with pytest.raises(SystemExit) as exc_info:
+        anaconda_cli_base.cli.app()
+
+    assert exc_info.value.code == 0
+    stdout = capsys.readouterr().out
+    assert plugin_version_in_table("anaconda-cli-base", __version__, stdout)
+    assert plugin_version_in_table("plugin", "0.0.1plugin", stdout)
+    get_command.assert_not_called()
+    for entry_point in lazy_plugins.values():
+        entry_point.load.assert_not_called()
+
+
+def test_lazy_plugins_help_imports_all(
+    invoke_cli: CLIInvoker, lazy_plugins: Dict[str, MagicMock]
+) -> None:
+    result = invoke_cli(["--help"])
+    assert result.exit_code == 0
+    assert "plugin" in result.stdout
+    assert "dummy" in result.stdout
+    assert "login" in result.stdout
+
+    for entry_point in lazy_plugins.values():
+        entry_point.load.assert_called()
+
+
+def test_lazy_plugins_login(
+    invoke_cli: CLIInvoker, lazy_plugins: Dict[str, MagicMock]
+) -> None:
+    result = invoke_cli(["login", "--at", "dummy"])
+    assert result.exit_code == 0
+    assert result.stdout == "dummy: You're in\n"
+
+
+def test_lazy_plugin_unknown_command(
+    invoke_cli: CLIInvoker, lazy_plugins: Dict[str, MagicMock]
+) -> None:
+    result = invoke_cli(["not-a-plugin"])
+    assert result.exit_code == 2
+
+
+@pytest.fixture
+def profile_startup(monkeypatch: MonkeyPatch) -> Generator[None, None, None]:
+    # Reports are written explicitly instead of when the test session exits
+    monkeypatch.setattr(startup_profile, "_report_registered", True)
+    startup_profile.reset()
+    yield
+    startup_profile.reset()
+
+
+def test_startup_profile_json(
+    invoke_cli: CLIInvoker,
+    lazy_plugins: Dict[str, MagicMock],
+    profile_startup: None,
+    monkeypatch: MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("ANACONDA_CLI_PROFILE_STARTUP", "json")
+    result = invoke_cli(["plugin", "action"])
+    assert result.exit_code == 0
+
+    stream = io.StringIO()
+    startup_profile.report(stream)
+    report = json.loads(stream.getvalue())
+    (profile,) = report["plugins"]
+    assert profile["name"] == "plugin"
+    assert profile["dist_name"] == "plugin"
+    assert profile["dist_version"] == "0.0.1plugin"
+    assert profile["import_ms"] >= 0
+    assert profile["add_typer_ms"] > 0
+    assert report["total_ms"] == profile["total_ms"]
+
+
+def test_startup_profile_table(
+    invoke_cli: CLIInvoker,
+    lazy_plugins: Dict[str, MagicMock],
+    profile_startup: None,
+    monkeypatch: MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("ANACONDA_CLI_PROFILE_STARTUP", "1")
+    result = invoke_cli(["login", "--help"])
+    assert result.exit_code == 0
+
+    profiles = startup_profile.get_profiles()
+    assert list(profiles) == ["plugin", "dummy"]
+    assert profiles["dummy"].auth_discovery_ms > 0
+    assert profiles["plugin"].auth_discovery_ms == 0
+
+    stream = io.StringIO()
+    startup_profile.report(stream)
+    assert "Plugin startup profile" in stream.getvalue()
+    assert "auth-plugin 0.0.1auth-plugin" in stream.getvalue()
+
+
+def test_startup_profile_disabled(
+    invoke_cli: CLIInvoker, lazy_plugins: Dict[str, MagicMock], profile_startup: None
+) -> None:
+    invoke_cli(["plugin", "action"])
+    assert startup_profile.get_profiles() == {}
+
+
+def make_entry_point(
+    mocker: MockerFixture,
+    name: str,
+    load: Callable[[], typer.Typer],
+    dist_version: Optional[str] = None,
+) -> MagicMock:
+    entry_point = mocker.Mock(spec=IndexedEntryPoint)
+    entry_point.name = name
+    entry_point.value = f"{name}.cli:app"
+    entry_point.dist_name = f"{name}-dist" if dist_version else None
+    entry_point.dist_version = dist_version
+    entry_point.dist = (
+        DistributionInfo(entry_point.dist_name, dist_version) if dist_version else None
+    )
+
+    def load_plugin() -> typer.Typer:
+        # Like a plugin package which was renamed
+        warnings.warn_explicit(
+            "renamed", DeprecationWarning, f"{name}/cli.py", 1, module=f"{name}.cli"
+        )
+        return load()
+
+    entry_point.module = f"{name}.cli"
+    entry_point.load.side_effect = load_plugin
+    return entry_point
+
+
+def slow_load(delay: float, error: Optional[Exception] = None) -> Callable:
+    def load() -> typer.Typer:
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return typer.Typer(name=threading.current_thread().name)
+
+    return load
+
+
+def test_parallel_plugin_imports_keep_order(
+    mocker: MockerFixture, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("ANACONDA_CLI_PARALLEL_PLUGIN_IMPORTS", "1")
+    entry_points = [
+        make_entry_point(mocker, f"plugin{i}", slow_load(delay))
+        for i, delay in enumerate([0.05, 0.0, 0.02])
+    ]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        loaded = _load_entry_points(entry_points)
+
+    assert [name for name, *_ in loaded] == ["plugin0", "plugin1", "plugin2"]
+    thread_names = {subcommand_app.info.name for _, _, subcommand_app, _ in loaded}
+    assert threading.current_thread().name not in thread_names
+
+
+def test_parallel_plugin_imports_only_ignore_plugin_deprecations(
+    mocker: MockerFixture, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("ANACONDA_CLI_PARALLEL_PLUGIN_IMPORTS", "1")
+
+    def load_warning_elsewhere() -> typer.Typer:
+        warnings.warn("not from a plugin", DeprecationWarning)
+        return typer.Typer()
+
+    entry_points = [
+        make_entry_point(mocker, "plugin0", slow_load(0.0)),
+        make_entry_point(mocker, "plugin1", load_warning_elsewhere),
+    ]
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        _load_entry_points(entry_points)
+
+    assert [str(w.message) for w in caught] == ["not from a plugin"]
+
+
+@pytest.mark.parametrize("parallel", [True, False], ids=["parallel", "serial"])
+def test_plugin_import_first_failure_named(
+    parallel: bool, mocker: MockerFixture, monkeypatch: MonkeyPatch
+) -> None:
+    if parallel:
+        monkeypatch.setenv("ANACONDA_CLI_PARALLEL_PLUGIN_IMPORTS", "1")
+    entry_points = [
+        make_entry_point(mocker, "good", slow_load(0.0)),
+        make_entry_point(mocker, "slow-bad", slow_load(0.05, ValueError("slow"))),
+        make_entry_point(mocker, "fast-bad", slow_load(0.0, ValueError("fast"))),
+    ]
+
+    with pytest.raises(PluginLoadError) as exc_info:
+        _load_entry_points(entry_points)
+
+    assert exc_info.value.plugin_name == "slow-bad"
+    assert exc_info.value.name == "slow-bad.cli"
+    assert "'slow-bad'" in str(exc_info.value)
+    assert isinstance(exc_info.value.__cause__, ValueError)
+
+
+@pytest.fixture
+def import_budget(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("ANACONDA_PLUGIN_LOADING_MAX_IMPORT_MS", "20")
+
+
+def test_plugin_over_import_budget_warns(
+    import_budget: None,
+    mocker: MockerFixture,
+    caplog: pytest.LogCaptureFixture,
+    isolate_cache_dir: Path,
+) -> None:
+    entry_points = [
+        make_entry_point(mocker, "fast", slow_load(0.0), dist_version="1.0"),
+        make_entry_point(mocker, "slow", slow_load(0.05), dist_version="2.0"),
+    ]
+    _load_entry_points(entry_points)
+
+    (record,) = caplog.records
+    assert record.levelname == "WARNING"
+    assert record.getMessage().startswith("Plugin 'slow' (slow-dist 2.0) took ")
+    assert record.getMessage().endswith("over the budget of 20 ms")
+    # Slow plugins are only recorded when asked to defer them
+    assert not (isolate_cache_dir / SLOW_PLUGINS_FILENAME).exists()
+
+
+def test_slow_plugin_deferred_on_later_runs(
+    import_budget: None,
+    mocker: MockerFixture,
+    monkeypatch: MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    monkeypatch.setenv("ANACONDA_PLUGIN_LOADING_DEFER_SLOW_PLUGINS", "true")
+    entry_points = [
+        make_entry_point(mocker, "fast", slow_load(0.0), dist_version="1.0"),
+        make_entry_point(mocker, "slow", slow_load(0.05), dist_version="2.0"),
+    ]
+    mocker.patch(
+        "anaconda_cli_base.plugins.get_entry_points", return_value=entry_points
+    )
+
+    app = typer.Typer()
+    assert load_registered_subcommands(app) == {}
+    assert [group.name for group in app.registered_groups] == ["fast", "slow"]
+    assert "over the budget" in caplog.text
+    caplog.clear()
+
+    app = typer.Typer()
+    deferred = load_registered_subcommands(app)
+    assert deferred == {"slow": entry_points[1]}
+    assert [group.name for group in app.registered_groups] == ["fast"]
+    assert entry_points[1].load.call_count == 1
+    assert caplog.records == []
+
+    # An upgraded plugin is measured again
+    entry_points[1].dist_version = "2.1"
+    assert load_registered_subcommands(typer.Typer()) == {}
+    assert entry_points[1].load.call_count == 2
+
+
+def test_slow_auth_plugin_not_deferred(
+    import_budget: None,
+    dummy_plugin: ENTRY_POINT_TUPLE,
+    mocker: MockerFixture,
+    monkeypatch: MonkeyPatch,
+    isolate_cache_dir: Path,
+) -> None:
+    monkeypatch.setenv("ANACONDA_PLUGIN_LOADING_DEFER_SLOW_PLUGINS", "true")
+
+    def load() -> typer.Typer:
+        time.sleep(0.05)
+        return dummy_plugin[2]
+
+    entry_point = make_entry_point(mocker, "dummy", load, dist_version="1.0")
+    _load_entry_points([entry_point])
+    assert not (isolate_cache_dir / SLOW_PLUGINS_FILENAME).exists()
+
+
 @pytest.fixture
 def org_plugin(mocker: MockerFixture) -> ENTRY_POINT_TUPLE:
     plugin = typer.Typer(name="org", add_completion=False, no_args_is_help=True)
@@ -282,6 +641,52 @@ def org_plugin(mocker: MockerFixture) -> ENTRY_POINT_TUPLE:
     return ("org", "org-plugin:app", plugin, dist)
 
 
+def test_skipped_plugins_not_imported(
+    mocker: MockerFixture, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("ANACONDA_CLI_SKIP_PLUGINS", "slow")
+    entry_points = [
+        make_entry_point(mocker, "fast", slow_load(0.0), dist_version="1.0"),
+        make_entry_point(mocker, "slow", slow_load(0.0), dist_version="2.0"),
+    ]
+    mocker.patch(
+        "anaconda_cli_base.plugins.get_entry_points", return_value=entry_points
+    )
+
+    app = typer.Typer()
+    assert load_registered_subcommands(app) == {}
+    assert [group.name for group in app.registered_groups] == ["fast"]
+    entry_points[1].load.assert_not_called()
+
+    result = CliRunner().invoke(app, ["versions"])
+    assert plugin_version_in_table("fast-dist", "1.0", result.stdout)
+    assert plugin_version_in_table("slow-dist", "2.0 (skipped)", result.stdout)
+
+
+def test_plugin_allowlist_registered_lazily(
+    mocker: MockerFixture, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("ANACONDA_CLI_PLUGINS", "fast")
+    entry_points = [
+        make_entry_point(mocker, "fast", slow_load(0.0), dist_version="1.0"),
+        make_entry_point(mocker, "slow", slow_load(0.0), dist_version="2.0"),
+    ]
+    for target in ("plugins", "plugin_index"):
+        mocker.patch(
+            f"anaconda_cli_base.{target}.get_entry_points", return_value=entry_points
+        )
+    plugin_versions.cache_clear()
+
+    app = typer.Typer()
+    assert register_lazy_subcommands(app) == {"fast": entry_points[0]}
+
+    # versions is the only command, so Typer makes it the root command
+    result = CliRunner().invoke(app, [])
+    assert plugin_version_in_table("fast-dist", "1.0", result.stdout)
+    assert plugin_version_in_table("slow-dist", "2.0 (skipped)", result.stdout)
+    plugin_versions.cache_clear()
+
+
 @pytest.fixture
 def legacy_main(mocker: MockerFixture) -> Generator[Callable, None, None]:
     def main(
@@ -381,6 +786,45 @@ def test_force_org_legacy(
     assert final_app.keywords["allow_plugin_main"] is False
 
 
+@pytest.mark.parametrize(
+    "names, expect_legacy",
+    [(["org"], True), (["org", "dummy"], False)],
+)
+def test_legacy_cli_selected_before_plugin_import(
+    names: Sequence[str],
+    expect_legacy: bool,
+    legacy_main: Callable,
+    mocker: MockerFixture,
+    monkeypatch: MonkeyPatch,
+) -> None:
+    """The legacy CLI is chosen from the entry-point metadata, without importing plugins"""
+
+    monkeypatch.delenv("ANACONDA_CLI_FORCE_NEW", raising=False)
+    monkeypatch.delenv("ANACONDA_CLIENT_FORCE_STANDALONE", raising=False)
+    monkeypatch.delenv("ANACONDA_CLI_DISABLE_PLUGINS", raising=False)
+    monkeypatch.setenv("ANACONDA_CLI_EAGER_PLUGINS", "1")
+
+    entry_points = tuple(
+        IndexedEntryPoint(name, f"{name}_plugin:app", "anaconda_cli.subcommand")
+        for name in names
+    )
+    mocker.patch(
+        "anaconda_cli_base.plugin_index.get_entry_points", return_value=entry_points
+    )
+    load = mocker.patch(
+        "anaconda_cli_base.plugins._load_entry_points_for_group", return_value=[]
+    )
+    importlib.reload(anaconda_cli_base.cli)
+
+    if expect_legacy:
+        assert isinstance(anaconda_cli_base.cli.app, partial)
+        assert anaconda_cli_base.cli.app.func is legacy_main
+        load.assert_not_called()
+    else:
+        assert isinstance(anaconda_cli_base.cli.app, typer.Typer)
+        load.assert_called_once()
+
+
 def test_org_subcommand(
     invoke_cli: CLIInvoker,
     org_plugin: ENTRY_POINT_TUPLE,
@@ -914,6 +1358,13 @@ def test_python_m_invocation() -> None:
     assert "Welcome to the Anaconda CLI!" in result.stdout
 
 
+def test_usage_error_is_click_exception() -> None:
+    """Usage errors are caught as ClickException with any supported typer."""
+    command = typer.main.get_command(anaconda_cli_base.cli.app)
+    with pytest.raises(anaconda_cli_base.cli.ClickException):
+        command.main(["--no-such-option"], standalone_mode=False)
+
+
 def test_python_m_bad_command() -> None:
     """Ensure `python -m anaconda_cli_base` exits non-zero on unknown commands."""
     result = subprocess.run(
@@ -923,3 +1374,27 @@ def test_python_m_bad_command() -> None:
         timeout=10,
     )
     assert result.returncode != 0
+
+
+def test_auth_sites_discovered_on_demand(
+    invoke_cli: CLIInvoker,
+    org_plugin: ENTRY_POINT_TUPLE,
+    dummy_plugin: ENTRY_POINT_TUPLE,
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch(
+        "anaconda_cli_base.plugins._load_entry_points_for_group",
+        return_value=[org_plugin, dummy_plugin],
+    )
+    load_auth_handler = mocker.spy(anaconda_cli_base.plugins, "_load_auth_handler")
+    load_registered_subcommands(cast(typer.Typer, anaconda_cli_base.cli.app))
+    load_auth_handler.assert_not_called()
+
+    result = invoke_cli(["org", "--help"])
+    assert result.exit_code == 0
+    load_auth_handler.assert_not_called()
+
+    result = invoke_cli(["login", "--help"], terminal_width=200)
+    assert result.exit_code == 0
+    assert "Choose from ['anaconda.com', 'anaconda.org']" in result.stdout
+    assert load_auth_handler.call_count == 2
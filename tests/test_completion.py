@@ -0,0 +1,156 @@
+import json
+import subprocess
+import sys
+from enum import Enum
+from pathlib import Path
+from typing import List
+from typing import Optional
+
+import pytest
+import typer
+from pytest import MonkeyPatch
+from pytest_mock import MockerFixture
+
+from anaconda_cli_base import completion
+from anaconda_cli_base.completion import CommandTree
+from anaconda_cli_base.completion import complete
+from .conftest import CLIInvoker
+
+
+@pytest.fixture
+def tree() -> CommandTree:
+    app = typer.Typer(add_completion=False)
+
+    @app.callback()
+    def main(
+        verbose: bool = typer.Option(False, "-v", "--verbose", help="Be loud."),
+        at: Optional[str] = typer.Option(None, help="The site."),
+        token: Optional[str] = typer.Option(None, hidden=True),
+    ) -> None:
+        pass
+
+    org = typer.Typer()
+
+    @org.command()
+    def upload(
+        channel: str = typer.Option("main", "--channel", "-c"),
+    ) -> None:
+        """Upload a package.
+
+        More details.
+        """
+
+    @org.command(hidden=True)
+    def secret() -> None:
+        pass
+
+    app.add_typer(org, name="org", help="anaconda.org")
+    return completion.build_command_tree(typer.main.get_command(app))
+
+
+def names(completions: List[tuple]) -> List[str]:
+    return [value for value, _ in completions]
+
+
+def test_complete_commands(tree: CommandTree) -> None:
+    assert complete(tree, [], "") == [("org", "anaconda.org")]
+    assert names(complete(tree, ["org"], "")) == ["upload"]
+    assert complete(tree, ["org"], "up") == [("upload", "Upload a package.")]
+    assert complete(tree, ["org"], "x") == []
+
+
+def test_complete_options(tree: CommandTree) -> None:
+    assert names(complete(tree, [], "--")) == ["--verbose", "--at", "--help"]
+    assert names(complete(tree, [], "-")) == ["-v", "--verbose", "--at", "--help"]
+    assert ("--verbose", "Be loud.") in complete(tree, [], "--v")
+    assert names(complete(tree, ["org", "upload"], "--c")) == ["--channel"]
+
+
+def test_complete_skips_option_values(tree: CommandTree) -> None:
+    # "org" is the value of --at here, not the subcommand
+    assert complete(tree, ["--at", "org"], "") == [("org", "anaconda.org")]
+    assert complete(tree, ["--at"], "") == []
+    assert names(complete(tree, ["--at=x", "org"], "")) == ["upload"]
+    assert names(complete(tree, ["-v", "org"], "")) == ["upload"]
+
+
+class Color(str, Enum):
+    red = "red"
+    green = "green"
+
+
+def test_complete_choices() -> None:
+    app = typer.Typer()
+
+    @app.command()
+    def pick(color: Color = typer.Option(...)) -> None:
+        pass
+
+    tree = completion.build_command_tree(typer.main.get_command(app))
+    assert names(complete(tree, ["--color"], "")) == ["red", "green"]
+    assert names(complete(tree, ["--color"], "g")) == ["green"]
+
+
+@pytest.mark.parametrize(
+    "shell, expected",
+    [
+        ("bash", "a:b\nc\n"),
+        ("zsh", "a\\:b:Help\nc\n"),
+        ("fish", "a:b\tHelp\nc\n"),
+    ],
+)
+def test_format_completions(shell: str, expected: str) -> None:
+    assert (
+        completion.format_completions(shell, [("a:b", "Help"), ("c", "")]) == expected
+    )
+
+
+def test_snapshot_rebuilt_when_plugins_change(
+    isolate_cache_dir: Path, mocker: MockerFixture, monkeypatch: MonkeyPatch
+) -> None:
+    refresh = mocker.spy(completion, "refresh_snapshot")
+    tree = completion.load_snapshot()
+    assert "versions" in tree["commands"]
+    assert refresh.call_count == 1
+
+    assert completion.load_snapshot() == tree
+    assert refresh.call_count == 1
+
+    monkeypatch.setattr(completion, "plugin_fingerprint", lambda: "new-plugin")
+    completion.load_snapshot()
+    assert refresh.call_count == 2
+
+
+def test_completion_command(invoke_cli: CLIInvoker, isolate_cache_dir: Path) -> None:
+    result = invoke_cli(["completion", "bash"])
+    assert result.exit_code == 0
+    assert "-m anaconda_cli_base.completion bash" in result.stdout
+    assert "complete -o default -F _anaconda_completion anaconda" in result.stdout
+
+    snapshot = json.loads((isolate_cache_dir / "completion.json").read_text())
+    assert snapshot["key"] == completion.snapshot_key()
+    assert "some-test-subcommand" in snapshot["tree"]["commands"]
+
+
+def test_completion_command_unknown_shell(
+    invoke_cli: CLIInvoker, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("SHELL", "/bin/tcsh")
+    result = invoke_cli(["completion"])
+    assert result.exit_code == 2
+    assert "'tcsh' is not supported" in result.stderr
+
+
+def test_completion_does_not_import_typer(invoke_cli: CLIInvoker) -> None:
+    assert invoke_cli(["completion", "zsh"]).exit_code == 0
+
+    code = (
+        "import sys\n"
+        "from anaconda_cli_base import completion\n"
+        "completion.main(['fish', '1', 'anaconda', 'some-test'])\n"
+        "print(sorted({'typer', 'click', 'rich'} & set(sys.modules)))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout == "some-test-subcommand\n[]\n"
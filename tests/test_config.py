@@ -16,6 +16,7 @@ from pytest_mock import MockerFixture
 import anaconda_cli_base.cli
 from anaconda_cli_base.config import AnacondaBaseSettings
 from anaconda_cli_base.config import AnacondaConfigTomlSettingsSource
+from anaconda_cli_base.config import ConfigFileCache
 from anaconda_cli_base.exceptions import AnacondaConfigTomlSyntaxError
 from anaconda_cli_base.exceptions import AnacondaConfigValidationError
 from anaconda_cli_base.plugins import load_registered_subcommands
@@ -87,7 +88,6 @@ def test_settings_priority(
     assert config.nested.field == "default"
     assert config.docker_test == "default"
 
-    AnacondaConfigTomlSettingsSource._cache.clear()
     config_file.write_text(
         dedent("""\
         [plugin.derived]
@@ -102,7 +102,6 @@ def test_settings_priority(
     assert config.nested.field == "toml"
     assert config.docker_test == "toml"
 
-    AnacondaConfigTomlSettingsSource._cache.clear()
     config_file.write_text(
         dedent("""\
         [plugin.derived]
@@ -116,7 +115,6 @@ def test_settings_priority(
     assert config.nested.field == "toml_inline"
     assert config.docker_test == "toml"
 
-    AnacondaConfigTomlSettingsSource._cache.clear()
     config_file.write_text(
         dedent("""\
         [plugin.derived]
@@ -980,3 +978,69 @@ def test_write_sibling_nested_models_no_bleed(config_toml: Path, val: str) -> No
     contents = config_toml.read_text()
     assert "[plugin.multi.container.a]" in contents
     assert "[plugin.multi.container.b]" not in contents
+
+
+@pytest.fixture
+def config_cache(monkeypatch: MonkeyPatch) -> ConfigFileCache:
+    cache = ConfigFileCache(maxsize=2)
+    monkeypatch.setattr(AnacondaConfigTomlSettingsSource, "_cache", cache)
+    return cache
+
+
+def _age(path: Path, seconds: int = 60) -> None:
+    """Set the mtime of path in the past, as if it was last edited long ago."""
+    mtime = path.stat().st_mtime_ns - seconds * 1_000_000_000
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_config_cache_revalidated(
+    config_toml: Path, config_cache: ConfigFileCache
+) -> None:
+    config_toml.write_text('[plugin.plugged]\nfoo = "one"\n')
+    _age(config_toml, 120)
+    assert Plugin().foo == "one"
+    assert Plugin().foo == "one"
+    info = AnacondaConfigTomlSettingsSource.cache_info()
+    assert (info.hits, info.misses, info.revalidations) == (1, 1, 0)
+
+    # Edited in place by another process, with the same size
+    config_toml.write_text('[plugin.plugged]\nfoo = "two"\n')
+    _age(config_toml)
+    assert Plugin().foo == "two"
+    assert Plugin().foo == "two"
+    info = AnacondaConfigTomlSettingsSource.cache_info()
+    assert (info.hits, info.misses, info.revalidations) == (2, 1, 1)
+    assert info.currsize == 1
+
+
+def test_config_cache_skips_recent_files(
+    config_toml: Path, config_cache: ConfigFileCache
+) -> None:
+    config_toml.write_text('[plugin.plugged]\nfoo = "one"\n')
+    assert Plugin().foo == "one"
+    # Edited again within the resolution of the mtime
+    mtime = config_toml.stat().st_mtime_ns
+    config_toml.write_text('[plugin.plugged]\nfoo = "two"\n')
+    os.utime(config_toml, ns=(mtime, mtime))
+    assert Plugin().foo == "two"
+    info = config_cache.info()
+    assert (info.hits, info.misses, info.currsize) == (0, 2, 0)
+
+
+def test_config_cache_bounded(tmp_path: Path) -> None:
+    cache = ConfigFileCache(maxsize=2)
+    paths = [tmp_path / f"{name}.toml" for name in "abc"]
+    for path in paths:
+        path.write_text("")
+        _age(path)
+
+    def read(path: Path) -> Dict[str, str]:
+        return {"name": path.stem}
+
+    for path in [*paths, paths[2], paths[0]]:
+        assert cache.read(path, read) == {"name": path.stem}
+    info = cache.info()
+    # a was dropped when c was read, as the least recently read
+    assert (info.hits, info.misses, info.currsize) == (1, 4, 2)
+    cache.clear()
+    assert cache.info() == (0, 0, 0, 2, 0)
@@ -0,0 +1,217 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from pytest import MonkeyPatch
+
+from anaconda_cli_base import daemon
+
+pytestmark = pytest.mark.skipif(
+    not daemon.daemon_supported(), reason="The daemon requires Unix domain sockets"
+)
+
+CLIENT = [
+    sys.executable,
+    "-c",
+    "from anaconda_cli_base.daemon import client_main; client_main()",
+]
+
+
+@pytest.fixture
+def socket_path(monkeypatch: MonkeyPatch) -> Generator[Path, None, None]:
+    # pytest's tmp_path is often too long for a Unix socket path
+    with tempfile.TemporaryDirectory(prefix="acd-") as tmp:
+        path = Path(tmp) / "daemon.sock"
+        monkeypatch.setenv("ANACONDA_CLI_DAEMON_SOCKET", str(path))
+        yield path
+
+
+def start_daemon(
+    socket_path: Path, idle_timeout: float = 30.0, *args: str
+) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "anaconda_cli_base",
+            "daemon",
+            "--idle-timeout",
+            str(idle_timeout),
+            *args,
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    deadline = time.monotonic() + 15
+    while not socket_path.exists():
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            _, stderr = process.communicate()
+            pytest.fail(f"Daemon did not start: {stderr.decode()}")
+        time.sleep(0.05)
+    return process
+
+
+@pytest.fixture
+def running_daemon(socket_path: Path) -> Generator[subprocess.Popen, None, None]:
+    process = start_daemon(socket_path)
+    yield process
+    process.terminate()
+    process.wait(timeout=10)
+
+
+def run_client(*args: str, **kwargs: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [*CLIENT, *args],
+        capture_output=True,
+        text=True,
+        timeout=30,
+        env={**os.environ, **kwargs},
+    )
+
+
+def test_daemon_runs_command(running_daemon: subprocess.Popen) -> None:
+    result = run_client("versions")
+    assert result.returncode == 0
+    assert "anaconda-cli-base" in result.stdout
+
+
+def test_daemon_exit_code_and_stderr(running_daemon: subprocess.Popen) -> None:
+    result = run_client("not-a-command")
+    assert result.returncode == 2
+    assert "No such command 'not-a-command'" in result.stderr
+    assert result.stdout == ""
+
+
+def test_daemon_uses_client_environment(running_daemon: subprocess.Popen) -> None:
+    for columns in (60, 90):
+        result = run_client("--help", COLUMNS=str(columns))
+        assert result.returncode == 0
+        width = max(len(line) for line in result.stdout.splitlines())
+        assert width == columns
+
+
+def test_client_falls_back_without_daemon(socket_path: Path) -> None:
+    assert daemon.run_on_daemon(["versions"]) is None
+
+    result = run_client("versions")
+    assert result.returncode == 0
+    assert "anaconda-cli-base" in result.stdout
+
+
+def test_stale_daemon_exits(
+    running_daemon: subprocess.Popen, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(daemon, "_environment_key", lambda: "plugins-changed")
+    assert daemon.run_on_daemon(["versions"]) is None
+    assert running_daemon.wait(timeout=10) == 0
+
+
+def test_daemon_idle_timeout(socket_path: Path) -> None:
+    process = start_daemon(socket_path, idle_timeout=0.5)
+    assert process.wait(timeout=10) == 0
+    assert not socket_path.exists()
+
+
+def test_second_daemon_refused(
+    running_daemon: subprocess.Popen, socket_path: Path
+) -> None:
+    with pytest.raises(daemon.DaemonError, match="already listening"):
+        daemon.Daemon(socket_path)._bind()
+
+
+def test_socket_dir_must_be_private(tmp_path: Path) -> None:
+    private = tmp_path / "private"
+    daemon._ensure_private_dir(private)
+    assert private.stat().st_mode & 0o777 == 0o700
+    # Already created, e.g. by another user
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o755)
+    shared.chmod(0o755)
+    with pytest.raises(daemon.DaemonError, match="mode 0700"):
+        daemon._ensure_private_dir(shared)
+    link = tmp_path / "link"
+    link.symlink_to(private)
+    with pytest.raises(daemon.DaemonError, match="mode 0700"):
+        daemon._ensure_private_dir(link)
+
+
+def test_peer_uid() -> None:
+    left, right = socket.socketpair(socket.AF_UNIX)
+    with left, right:
+        assert daemon._peer_uid(left) == os.getuid()
+
+
+def test_client_refuses_daemon_of_other_user(
+    running_daemon: subprocess.Popen, monkeypatch: MonkeyPatch
+) -> None:
+    with monkeypatch.context() as m:
+        m.setattr(daemon, "_peer_uid", lambda conn: os.getuid() + 1)
+        assert daemon.run_on_daemon(["versions"]) is None
+    # The daemon is unaffected by the connection closed without a request
+    assert daemon.run_on_daemon(["versions"]) == 0
+    assert running_daemon.poll() is None
+
+
+requires_fork = pytest.mark.skipif(
+    not daemon.fork_supported(), reason="The fork server is only available on Linux"
+)
+
+
+@pytest.fixture
+def fork_daemon(socket_path: Path) -> Generator[subprocess.Popen, None, None]:
+    process = start_daemon(socket_path, 30.0, "--fork")
+    yield process
+    process.terminate()
+    process.wait(timeout=10)
+
+
+@requires_fork
+def test_fork_daemon_runs_commands(fork_daemon: subprocess.Popen) -> None:
+    result = run_client("versions")
+    assert result.returncode == 0
+    assert "anaconda-cli-base" in result.stdout
+
+    result = run_client("not-a-command")
+    assert result.returncode == 2
+    assert "No such command 'not-a-command'" in result.stderr
+
+    # The commands ran in children, the server itself is still waiting
+    assert fork_daemon.poll() is None
+
+
+@requires_fork
+def test_fork_daemon_runs_commands_concurrently(fork_daemon: subprocess.Popen) -> None:
+    clients = [
+        subprocess.Popen(
+            [*CLIENT, "versions"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(4)
+    ]
+    for client in clients:
+        stdout, _ = client.communicate(timeout=30)
+        assert client.returncode == 0
+        assert "anaconda-cli-base" in stdout
+
+
+@requires_fork
+def test_fork_daemon_idle_timeout(socket_path: Path) -> None:
+    process = start_daemon(socket_path, 0.5, "--fork")
+    assert run_client("versions").returncode == 0
+    assert process.wait(timeout=10) == 0
+    assert not socket_path.exists()
+
+
+@pytest.mark.skipif(daemon.fork_supported(), reason="The fork server is supported")
+def test_fork_daemon_unsupported(socket_path: Path) -> None:
+    with pytest.raises(daemon.DaemonError, match="only available on Linux"):
+        daemon.Daemon(socket_path, fork=True)
@@ -0,0 +1,154 @@
+import json
+import sys
+from importlib.util import cache_from_source
+from pathlib import Path
+from textwrap import dedent
+
+from pytest import MonkeyPatch
+from pytest_mock import MockerFixture
+
+from anaconda_cli_base import debug
+from anaconda_cli_base.debug import ImportNode
+from .conftest import CLIInvoker
+
+IMPORTTIME = dedent(
+    """\
+    import time: self [us] | cumulative | imported package
+    import time:       100 |        100 |     _io
+    import time:       200 |        300 |   io
+    import time:      1000 |       1000 |   pydantic_core
+    import time:      2000 |       3300 | pydantic
+    import time:       500 |        500 |     rich.style
+    import time:       400 |        900 |   rich.console
+    import time:       700 |       1600 | my_plugin
+    some other output
+    import time:        50 |         50 | mystery
+    """
+)
+
+
+def test_parse_importtime() -> None:
+    roots = debug.parse_importtime(IMPORTTIME)
+    assert [(n.name, n.self_us, n.cumulative_us) for n in roots] == [
+        ("pydantic", 2000, 3300),
+        ("my_plugin", 700, 1600),
+        ("mystery", 50, 50),
+    ]
+    pydantic = roots[0]
+    assert [n.name for n in pydantic.children] == ["io", "pydantic_core"]
+    assert pydantic.children[0].children == [ImportNode("_io", 100, 100)]
+    assert [n.name for n in roots[1].children] == ["rich.console"]
+
+
+def test_attribute() -> None:
+    roots = debug.parse_importtime(IMPORTTIME)
+    components = debug.attribute(roots, {"my_plugin": "my-plugin-dist"})
+    assert [(c.name, c.modules, c.self_us) for c in components] == [
+        ("pydantic", 2, 3000),
+        ("rich", 2, 900),
+        ("plugin: my-plugin-dist", 1, 700),
+        ("stdlib", 2, 300),
+        ("other", 1, 50),
+    ]
+
+
+def test_prune() -> None:
+    pydantic = debug.parse_importtime(IMPORTTIME)[0]
+    tree = debug._prune(pydantic, min_us=250, depth=2)
+    assert tree is not None
+    assert [child["name"] for child in tree["children"]] == ["pydantic_core", "io"]
+    assert tree["children"][1]["children"] == []
+    assert debug._prune(pydantic, min_us=5000, depth=2) is None
+
+
+def test_debug_imports_json(invoke_cli: CLIInvoker) -> None:
+    result = invoke_cli(["debug", "imports", "--json", "--", "versions", "--help"])
+    assert result.exit_code == 0, result.stdout
+    report = json.loads(result.stdout)
+    assert report["args"] == ["versions", "--help"]
+    assert report["exit_code"] == 0
+    names = {component["name"] for component in report["components"]}
+    assert {"anaconda-cli-base", "typer/click", "stdlib"} <= names
+    assert any(node["name"] == "anaconda_cli_base.cli" for node in report["tree"])
+
+
+def test_requirement_names(mocker: MockerFixture) -> None:
+    dist = mocker.Mock()
+    dist.requires = [
+        "typer>=0.17",
+        "pydantic-settings >= 2.3",
+        'colorama; platform_system == "Windows"',
+        "pytest; extra == 'dev'",
+    ]
+    assert debug._requirement_names(dist) == ["typer", "pydantic-settings", "colorama"]
+
+
+def test_find_sources() -> None:
+    sources = debug.find_sources(dependencies=False)
+    assert Path(debug.__file__).resolve() in {path.resolve() for path in sources}
+    assert not any(path.parts[-2:] == ("typer", "main.py") for path in sources)
+
+    sources = debug.find_sources(dependencies=True)
+    assert any(path.parts[-2:] == ("typer", "main.py") for path in sources)
+
+
+def test_compile_sources(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    good = tmp_path / "src" / "good.py"
+    bad = tmp_path / "src" / "bad.py"
+    good.parent.mkdir()
+    good.write_text("x = 1\n")
+    bad.write_text("def (:\n")
+    prefix = tmp_path / "pycache"
+
+    assert debug.compile_sources([good, bad], prefix) == (1, 1)
+    assert sys.pycache_prefix is None
+
+    monkeypatch.setattr(sys, "pycache_prefix", str(prefix))
+    assert Path(cache_from_source(str(good))).is_file()
+
+
+def test_debug_precompile_json(
+    invoke_cli: CLIInvoker, tmp_path: Path, mocker: MockerFixture
+) -> None:
+    source = tmp_path / "module.py"
+    source.write_text("x = 1\n")
+    mocker.patch.object(debug, "find_sources", return_value=[source])
+    time_startup = mocker.patch.object(debug, "_time_startup", return_value=100.0)
+
+    prefix = tmp_path / "pycache"
+    result = invoke_cli(
+        ["debug", "precompile", "--prefix", str(prefix), "--runs", "0", "--json"]
+    )
+    assert result.exit_code == 0, result.stdout
+    report = json.loads(result.stdout)
+    assert report["prefix"] == str(prefix.resolve())
+    assert (report["compiled"], report["failed"]) == (1, 0)
+    assert report["before_ms"] is None
+    # Only the run which compiles the modules imported from the standard library
+    assert time_startup.call_count == 1
+    ((args, env), _) = time_startup.call_args
+    assert env["PYTHONPYCACHEPREFIX"] == str(prefix.resolve())
+
+
+def test_debug_precompile_times_cold_start(
+    invoke_cli: CLIInvoker, tmp_path: Path, mocker: MockerFixture
+) -> None:
+    mocker.patch.object(debug, "find_sources", return_value=[])
+    time_startup = mocker.patch.object(
+        debug, "_time_startup", side_effect=[100.0, 300.0, 100.0]
+    )
+
+    prefix = tmp_path / "pycache"
+    result = invoke_cli(
+        ["debug", "precompile", "--prefix", str(prefix), "--runs", "1", "--json"]
+    )
+    assert result.exit_code == 0, result.stdout
+    report = json.loads(result.stdout)
+    assert (report["before_ms"], report["after_ms"]) == (300.0, 100.0)
+    (_, before, after) = time_startup.call_args_list
+    cold_env = before.args[1]
+    # Neither the bytecode next to the sources nor the prefix is used
+    assert cold_env["PYTHONPYCACHEPREFIX"] != str(prefix.resolve())
+    assert cold_env["PYTHONDONTWRITEBYTECODE"] == "1"
+    assert not Path(cold_env["PYTHONPYCACHEPREFIX"]).exists()
+    assert after.args[1]["PYTHONPYCACHEPREFIX"] == str(prefix.resolve())
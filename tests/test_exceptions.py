@@ -0,0 +1,94 @@
+from typing import Type
+
+import pytest
+import typer
+
+import anaconda_cli_base.cli
+from anaconda_cli_base.exceptions import ERROR_HANDLERS
+from anaconda_cli_base.exceptions import ErrorHandlers
+from anaconda_cli_base.exceptions import catch_all
+from anaconda_cli_base.exceptions import register_error_handler
+from .conftest import CLIInvoker
+
+
+class BaseError(Exception):
+    pass
+
+
+class LeafError(BaseError):
+    pass
+
+
+class OtherError(Exception):
+    pass
+
+
+def handle_base(e: Exception) -> int:
+    return 2
+
+
+def handle_leaf(e: Exception) -> int:
+    return 3
+
+
+@pytest.mark.parametrize(
+    "exc, expected",
+    [
+        (BaseError, handle_base),
+        (LeafError, handle_base),
+        (OtherError, catch_all),
+        (ValueError, catch_all),
+    ],
+)
+def test_resolve_by_mro(exc: Type[Exception], expected: object) -> None:
+    handlers = ErrorHandlers({BaseError: handle_base})
+    assert handlers[exc] is expected
+    # Resolving does not register a handler
+    assert list(handlers) == [BaseError]
+
+
+def test_resolution_invalidated() -> None:
+    handlers = ErrorHandlers({BaseError: handle_base})
+    assert handlers[LeafError] is handle_base
+    handlers[LeafError] = handle_leaf
+    assert handlers[LeafError] is handle_leaf
+    del handlers[LeafError]
+    assert handlers[LeafError] is handle_base
+    handlers.pop(BaseError)
+    assert handlers[LeafError] is catch_all
+    handlers.update({Exception: handle_leaf})
+    assert handlers[LeafError] is handle_leaf
+    handlers.clear()
+    assert handlers[LeafError] is catch_all
+
+
+def test_subclass_handled(invoke_cli: CLIInvoker) -> None:
+    class PluginError(Exception):
+        pass
+
+    class PluginLeafError(PluginError):
+        pass
+
+    @register_error_handler(PluginError)
+    def handle_plugin_error(e: Exception) -> int:
+        print(f"handled {type(e).__name__}")
+        return 4
+
+    @anaconda_cli_base.cli.app.command("fail")
+    def fail() -> None:
+        raise PluginLeafError()
+
+    try:
+        result = invoke_cli(["fail"])
+        assert result.exit_code == 4
+        assert result.stdout.startswith("handled PluginLeafError\n")
+    finally:
+        del ERROR_HANDLERS[PluginError]
+
+
+def test_typer_exit_not_handled(invoke_cli: CLIInvoker) -> None:
+    @anaconda_cli_base.cli.app.command("exit")
+    def exit() -> None:
+        raise typer.Exit(5)
+
+    assert invoke_cli(["exit"]).exit_code == 5
@@ -0,0 +1,153 @@
+import io
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+import typer
+from pytest import MonkeyPatch
+from pytest_mock import MockerFixture
+
+import anaconda_cli_base.cli
+from anaconda_cli_base import help_cache
+from anaconda_cli_base.help_cache import is_cacheable_help_request
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        pytest.param([], True, id="no-args"),
+        pytest.param(["--help"], True, id="--help"),
+        pytest.param(["-h"], True, id="-h"),
+        pytest.param(["plugin", "--help"], True, id="plugin-help"),
+        pytest.param(["other", "--help"], False, id="not-a-plugin"),
+        pytest.param(["plugin", "action", "--help"], False, id="command-help"),
+        pytest.param(["--verbose", "--help"], False, id="extra-option"),
+        pytest.param(["plugin"], False, id="plugin-no-help"),
+    ],
+)
+def test_is_cacheable_help_request(args: list, expected: bool) -> None:
+    assert is_cacheable_help_request(args, ["plugin"]) is expected
+
+
+@pytest.fixture
+def get_command(mocker: MockerFixture) -> MagicMock:
+    return mocker.spy(typer.main, "get_command")
+
+
+def run_app(
+    args: list,
+    monkeypatch: MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    prog: str = "anaconda",
+) -> tuple:
+    monkeypatch.setattr(sys, "argv", [prog, *args])
+    with pytest.raises(SystemExit) as exc_info:
+        anaconda_cli_base.cli.app()
+    return exc_info.value.code, capsys.readouterr().out
+
+
+def test_help_served_from_cache(
+    get_command: MagicMock,
+    isolate_cache_dir: Path,
+    monkeypatch: MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    code, rendered = run_app(["--help"], monkeypatch, capsys)
+    assert code == 0
+    assert "Welcome to the Anaconda CLI!" in rendered
+    assert get_command.call_count == 1
+    assert (isolate_cache_dir / help_cache.CACHE_FILENAME).exists()
+
+    code, cached = run_app(["--help"], monkeypatch, capsys)
+    assert code == 0
+    assert cached == rendered
+    assert get_command.call_count == 1
+
+
+def test_help_no_args_exit_code_cached(
+    get_command: MagicMock,
+    monkeypatch: MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    first_code, rendered = run_app([], monkeypatch, capsys)
+    code, cached = run_app([], monkeypatch, capsys)
+    assert code == first_code
+    assert cached == rendered
+    assert get_command.call_count == 1
+
+
+def test_help_cache_keyed_by_terminal_width(
+    get_command: MagicMock,
+    monkeypatch: MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    monkeypatch.setenv("COLUMNS", "80")
+    run_app(["--help"], monkeypatch, capsys)
+    monkeypatch.setenv("COLUMNS", "120")
+    run_app(["--help"], monkeypatch, capsys)
+    assert get_command.call_count == 2
+
+
+def test_help_cache_keyed_by_prog_name(
+    get_command: MagicMock,
+    monkeypatch: MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    _, rendered = run_app(["--help"], monkeypatch, capsys)
+    _, other = run_app(["--help"], monkeypatch, capsys, prog="/bin/anaconda-fast")
+    assert "anaconda-fast" not in rendered
+    assert "anaconda-fast" in other
+    assert get_command.call_count == 2
+
+
+def test_help_cache_keyed_by_plugins(
+    get_command: MagicMock,
+    mocker: MockerFixture,
+    monkeypatch: MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    run_app(["--help"], monkeypatch, capsys)
+    mocker.patch.object(help_cache, "plugin_fingerprint", return_value="changed")
+    run_app(["--help"], monkeypatch, capsys)
+    assert get_command.call_count == 2
+
+
+def test_help_cache_disabled(
+    get_command: MagicMock,
+    monkeypatch: MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    monkeypatch.setenv("ANACONDA_CLI_DISABLE_CACHE", "1")
+    run_app(["--help"], monkeypatch, capsys)
+    run_app(["--help"], monkeypatch, capsys)
+    assert get_command.call_count == 2
+
+
+def test_failed_help_not_cached(isolate_cache_dir: Path) -> None:
+    def fail() -> None:
+        print("partial output")
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        help_cache.record_help(["--help"], fail)
+
+    assert not (isolate_cache_dir / help_cache.CACHE_FILENAME).exists()
+
+
+def test_help_cache_is_bounded(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(help_cache, "MAX_ENTRIES", 2)
+    for key in "abc":
+        help_cache._store(key, f"output {key}", 0)
+
+    assert list(help_cache._read_entries()) == ["c", "b"]
+
+
+def test_tee_stream_rejects_bytes_like_its_stream() -> None:
+    stream = io.StringIO()
+    tee = help_cache._TeeStream(stream)
+    # click checks whether a stream is binary this way before writing bytes
+    with pytest.raises(TypeError):
+        tee.write(b"")  # type: ignore[arg-type]
+    tee.write("help\n")
+    assert tee.getvalue() == stream.getvalue() == "help\n"
@@ -0,0 +1,154 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Set
+
+import pytest
+
+# Run in a fresh interpreter, since the test session has imported everything already
+LIST_IMPORTED_MODULES = """
+import json, sys
+before = set(sys.modules)
+import anaconda_cli_base.cli
+print(json.dumps(sorted(set(sys.modules) - before)))
+"""
+
+LIST_PLUGIN_LOADING_MODULES = """
+import json, sys
+from anaconda_cli_base.plugins import _deferred_plugins, _load_entry_points
+assert _deferred_plugins([]) == {}
+_load_entry_points([])
+print(json.dumps(sorted(sys.modules)))
+"""
+
+# Prints the modules imported to stderr, as the help is printed to stdout
+SHOW_HELP_MODULES = """
+import atexit, json, sys
+atexit.register(lambda: print(json.dumps(sorted(sys.modules)), file=sys.stderr))
+sys.argv = ["anaconda", "--help"]
+from anaconda_cli_base.cli import app
+app()
+"""
+
+# Only needed once a command prints something or reads its settings
+DEFERRED_PACKAGES = {
+    "dotenv",
+    "pydantic",
+    "pydantic_core",
+    "pydantic_settings",
+    "readchar",
+    "rich",
+    "tomlkit",
+}
+
+EXPECTED_SUBMODULES = {
+    "anaconda_cli_base",
+    "anaconda_cli_base._version",
+    "anaconda_cli_base.cache",
+    "anaconda_cli_base.cli",
+    "anaconda_cli_base.console",
+    "anaconda_cli_base.exceptions",
+    "anaconda_cli_base.help_cache",
+    "anaconda_cli_base.invocation",
+    "anaconda_cli_base.plugin_index",
+    "anaconda_cli_base.plugins",
+    "anaconda_cli_base.startup_profile",
+    "anaconda_cli_base.telemetry",
+}
+
+
+@pytest.fixture(scope="module")
+def imported_modules() -> Set[str]:
+    env = {**os.environ, "ANACONDA_CLI_DISABLE_PLUGINS": "1"}
+    env.pop("LOGLEVEL", None)
+    result = subprocess.run(
+        [sys.executable, "-c", LIST_IMPORTED_MODULES],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    return set(json.loads(result.stdout))
+
+
+def test_cli_import_defers_heavy_packages(imported_modules: Set[str]) -> None:
+    packages = {name.partition(".")[0] for name in imported_modules}
+    assert packages & DEFERRED_PACKAGES == set()
+
+
+def test_cli_import_submodules(imported_modules: Set[str]) -> None:
+    submodules = {m for m in imported_modules if m.startswith("anaconda_cli_base")}
+    assert submodules == EXPECTED_SUBMODULES
+
+
+def test_plugin_loading_defers_settings(tmp_path: Path) -> None:
+    """Without an import budget, loading plugins does not read PluginLoadingConfig."""
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if not key.upper().startswith("ANACONDA_PLUGIN_LOADING_")
+    }
+    env["ANACONDA_CONFIG_TOML"] = str(tmp_path / "config.toml")
+    result = subprocess.run(
+        [sys.executable, "-c", LIST_PLUGIN_LOADING_MODULES],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    packages = {name.partition(".")[0] for name in json.loads(result.stdout)}
+    assert "pydantic" not in packages
+
+
+def test_cached_help_defers_settings(tmp_path: Path) -> None:
+    """Help served from the cache does not import pydantic for the config file."""
+    (tmp_path / "config.toml").write_text("")
+    env = {
+        **os.environ,
+        "ANACONDA_CLI_DISABLE_PLUGINS": "1",
+        "ANACONDA_CLI_CACHE_DIR": str(tmp_path / "cache"),
+        "ANACONDA_CONFIG_TOML": str(tmp_path / "config.toml"),
+        # Telemetry reads its own settings when it is enabled
+        "OTEL_SDK_DISABLED": "true",
+    }
+    env.pop("ANACONDA_CLI_DISABLE_CACHE", None)
+    env.pop("LOGLEVEL", None)
+    outputs = []
+    for _ in range(2):
+        result = subprocess.run(
+            [sys.executable, "-c", SHOW_HELP_MODULES],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=env,
+        )
+        outputs.append(result.stdout)
+    assert outputs[0] == outputs[1]
+    modules = set(json.loads(result.stderr))
+    # Served from the cache, without rendering it with rich
+    assert "rich.console" not in modules
+    assert "anaconda_cli_base.config" not in modules
+    assert {name.partition(".")[0] for name in modules} & {"pydantic"} == set()
+
+
+def test_console_attribute_is_console() -> None:
+    from rich.console import Console
+
+    import anaconda_cli_base
+    import anaconda_cli_base.console
+    from anaconda_cli_base import console
+
+    assert isinstance(console, Console)
+    # Importing the submodule did not replace the console on the package
+    assert anaconda_cli_base.console is console
+    assert sys.modules["anaconda_cli_base.console"].console is console
+
+
+def test_telemetry_config_attribute() -> None:
+    from anaconda_cli_base import telemetry
+    from anaconda_cli_base.telemetry_config import TelemetryConfig
+
+    assert isinstance(telemetry.config, TelemetryConfig)
+    assert telemetry.config is telemetry.config
@@ -0,0 +1,155 @@
+import os
+import sys
+import threading
+from typing import Dict
+from typing import List
+from typing import Optional
+from unittest.mock import MagicMock
+
+import pytest
+import typer
+from pytest import MonkeyPatch
+
+import anaconda_cli_base.cli
+from anaconda_cli_base import invocation
+from anaconda_cli_base.config import AnacondaBaseSettings
+from anaconda_cli_base.invocation import Invocation
+from anaconda_cli_base.invocation import invoked
+from anaconda_cli_base.plugins import _select_auth_handler_and_args
+from .conftest import CLIInvoker
+
+
+class SiteSettings(AnacondaBaseSettings):
+    default_site: Optional[str] = None
+
+
+@pytest.fixture
+def invocations(monkeypatch: MonkeyPatch) -> List[Invocation]:
+    """Register a command which records its invocation."""
+    # Set by --at in other tests
+    monkeypatch.delenv("ANACONDA_DEFAULT_SITE", raising=False)
+    recorded = []
+
+    @anaconda_cli_base.cli.app.command("record")
+    def record(ctx: typer.Context) -> None:
+        current = invocation.current()
+        assert current is not None
+        assert ctx.obj.invocation is current
+        recorded.append(current)
+        print(f"site={SiteSettings().default_site}")
+
+    return recorded
+
+
+def test_invoked() -> None:
+    assert invocation.current() is None
+    with invoked(["anaconda", "record"]) as outer:
+        assert invocation.current() is outer
+        with invoked(["anaconda", "other"]) as inner:
+            inner.site = "example.com"
+            assert invocation.invocation_environ() == {
+                "ANACONDA_DEFAULT_SITE": "example.com"
+            }
+        assert invocation.current() is outer
+        assert outer.site is None
+    assert invocation.current() is None
+
+
+def test_settings_read_invocation_first(monkeypatch: MonkeyPatch) -> None:
+    # Left behind by a previous command of the same process
+    monkeypatch.setenv("ANACONDA_DEFAULT_SITE", "stale")
+    assert SiteSettings().default_site == "stale"
+    with invoked(["anaconda"]) as current:
+        current.site = "example.com"
+        assert SiteSettings().default_site == "example.com"
+
+
+def test_settings_per_thread() -> None:
+    barrier = threading.Barrier(2, timeout=10)
+    sites: Dict[str, Optional[str]] = {}
+
+    def read(site: str) -> None:
+        with invoked(["anaconda"]) as current:
+            current.site = site
+            # Both threads have chosen their site before either reads it
+            barrier.wait()
+            sites[site] = SiteSettings().default_site
+
+    threads = [threading.Thread(target=read, args=(site,)) for site in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sites == {"a": "a", "b": "b"}
+
+
+def test_at_sets_invocation_site(
+    invoke_cli: CLIInvoker, invocations: List[Invocation]
+) -> None:
+    result = invoke_cli(["--at", "example.com", "record"])
+    assert result.exit_code == 0, result.stderr
+    assert result.stdout == "site=example.com\n"
+    assert invocations[0].site == "example.com"
+    assert invocations[0].argv[1:] == ["--at", "example.com", "record"]
+    # Still written to the environment, for plugins which read it directly
+    assert os.getenv("ANACONDA_DEFAULT_SITE") == "example.com"
+    assert invocation.current() is None
+
+
+def test_batch_invocations(
+    invoke_cli: CLIInvoker, invocations: List[Invocation]
+) -> None:
+    result = invoke_cli(
+        ["batch", "-"], input="--at example.com record\nrecord\n--at other record\n"
+    )
+    assert result.exit_code == 0, result.stderr
+    assert result.stdout.splitlines() == [
+        "site=example.com",
+        "site=None",
+        "site=other",
+    ]
+    assert [current.site for current in invocations] == ["example.com", None, "other"]
+
+
+def test_legacy_login_argv_from_invocation(monkeypatch: MonkeyPatch) -> None:
+    # The process runs e.g. `anaconda batch`, not the login itself
+    monkeypatch.setattr(sys, "argv", ["/path/to/anaconda", "batch", "-"])
+    ctx = MagicMock()
+    ctx.obj.params = {}
+    with invoked(["anaconda", "--verbose", "--at", "anaconda.org", "login"]) as current:
+        handler, args = _select_auth_handler_and_args(
+            ctx=ctx,
+            at="anaconda.org",
+            hostname=None,
+            username="some-user",
+            password=None,
+            help=False,
+            auth_handlers={"anaconda.org": "dot-org-handler"},  # type: ignore
+            auth_handlers_dropdown=[],
+        )
+    assert handler == "dot-org-handler"
+    assert args == ["--username", "some-user"]
+    expected = ["anaconda", "--verbose", "login", "--username", "some-user"]
+    assert current.argv == expected
+    # Still written to sys.argv, for the legacy handler
+    assert sys.argv == expected
+
+
+def test_auth_handler_sets_invocation_site(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.delenv("ANACONDA_DEFAULT_SITE", raising=False)
+    ctx = MagicMock()
+    ctx.args = []
+    ctx.obj.params = {}
+    with invoked(["anaconda", "login", "--at", "example.com"]) as current:
+        _select_auth_handler_and_args(
+            ctx=ctx,
+            at="example.com",
+            hostname=None,
+            username=None,
+            password=None,
+            help=False,
+            auth_handlers={"example.com": "handler"},  # type: ignore
+            auth_handlers_dropdown=[],
+        )
+    assert current.site == "example.com"
+    assert os.getenv("ANACONDA_DEFAULT_SITE") == "example.com"
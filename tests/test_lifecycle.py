@@ -103,6 +103,27 @@ class TestTriggerShutdownIdempotency:
         assert timer_instance.start.call_count == 1
 
 
+class TestAfterFork:
+    def test_child_can_shut_down_again(
+        self,
+        monkeypatch: MonkeyPatch,
+        fake_timer: MagicMock,
+        mock_shutdown_telemetry: MagicMock,
+    ) -> None:
+        calls: List[str] = []
+        mod.register_shutdown_hook(lambda: calls.append("hook"))
+        monkeypatch.setattr(mod, "_trigger_lock", mod._trigger_lock)
+        mod.trigger_shutdown()
+        monkeypatch.setattr(mod, "_handlers_installed", True)
+
+        mod._after_fork()
+
+        assert mod._triggered is False
+        assert mod._handlers_installed is False
+        mod.trigger_shutdown()
+        assert calls == ["hook", "hook"]
+
+
 class TestTriggerShutdownTelemetry:
     def test_calls_shutdown_telemetry_with_2s_timeout(
         self,
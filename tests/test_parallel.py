@@ -0,0 +1,142 @@
+import io
+import os
+import threading
+import time
+from typing import List
+
+import pytest
+import typer
+from pytest import MonkeyPatch
+
+import anaconda_cli_base.cli
+from anaconda_cli_base.parallel import ThreadOutput
+from anaconda_cli_base.parallel import is_exclusive
+from anaconda_cli_base.parallel import run_concurrently
+from .conftest import CLIInvoker
+
+
+@pytest.fixture
+def contexts(monkeypatch: MonkeyPatch) -> List[typer.Context]:
+    """Register commands which wait for each other, and record their contexts."""
+    # Set by --at in other tests
+    monkeypatch.delenv("ANACONDA_DEFAULT_SITE", raising=False)
+    recorded = []
+    barrier = threading.Barrier(2, timeout=10)
+
+    @anaconda_cli_base.cli.app.command("record")
+    def record(
+        ctx: typer.Context, name: str, wait: bool = False, fail: bool = False
+    ) -> None:
+        recorded.append(ctx)
+        if wait:
+            # Only returns once another command waits too
+            barrier.wait()
+        if name == "first":
+            # Let the other commands print first
+            time.sleep(0.1)
+        print(f"{name}: site={os.getenv('ANACONDA_DEFAULT_SITE')}")
+        typer.echo(f"{name}: done", err=True)
+        if fail:
+            raise typer.Exit(3)
+
+    return recorded
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        (["record", "--name", "a"], False),
+        (["--at", "example.com", "record"], True),
+        (["--at=example.com", "record"], True),
+        (["login"], True),
+        (["--verbose", "whoami"], True),
+        (["batch", "-"], True),
+    ],
+)
+def test_is_exclusive(args: List[str], expected: bool) -> None:
+    assert is_exclusive(args) is expected
+
+
+def test_thread_output() -> None:
+    stream = io.StringIO()
+    output = ThreadOutput(stream)
+    captured = []
+
+    def capture() -> None:
+        with output.capture() as buffer:
+            output.write("thread")
+        captured.append(buffer.getvalue())
+
+    with output.capture() as buffer:
+        thread = threading.Thread(target=capture)
+        thread.start()
+        thread.join()
+        output.write("main")
+    output.write("uncaptured")
+    assert captured == ["thread"]
+    assert buffer.getvalue() == "main"
+    assert stream.getvalue() == "uncaptured"
+
+
+def test_run_concurrently(contexts: List[typer.Context]) -> None:
+    command = typer.main.get_command(anaconda_cli_base.cli.app)
+    completed = list(
+        run_concurrently(
+            command,
+            [
+                ["record", "first", "--wait"],
+                ["record", "second", "--wait"],
+                ["--at", "example.com", "record", "third"],
+                ["record", "fourth", "--fail"],
+            ],
+            jobs=2,
+        )
+    )
+    assert [c.outcome.exit_code for c in completed] == [0, 0, 0, 3]
+    assert [c.stdout for c in completed] == [
+        "first: site=None\n",
+        "second: site=None\n",
+        "third: site=example.com\n",
+        "fourth: site=None\n",
+    ]
+    assert completed[0].stderr == "first: done\n"
+    # Every command has its own context
+    assert len({id(ctx.find_root().obj) for ctx in contexts}) == 4
+    assert os.getenv("ANACONDA_DEFAULT_SITE") is None
+
+
+def test_batch_jobs(invoke_cli: CLIInvoker, contexts: List[typer.Context]) -> None:
+    result = invoke_cli(
+        ["batch", "-", "--jobs", "2"],
+        input=(
+            "record first --wait\n"
+            "record second --wait\n"
+            "record 'unbalanced\n"
+            "record third --fail\n"
+        ),
+    )
+    assert result.exit_code == 2, result.stderr
+    # The output of each command is printed in the order of the lines
+    assert result.stdout.splitlines() == [
+        "first: site=None",
+        "second: site=None",
+        "third: site=None",
+    ]
+    lines = result.stderr.splitlines()
+    assert lines[0] == "first: done"
+    assert lines[1].startswith("anaconda batch: line 1: exit code 0 ")
+    assert lines[2] == "second: done"
+    assert lines[4] == "anaconda batch: line 3: No closing quotation"
+    assert lines[-1].startswith("anaconda batch: 4 commands, 2 failed")
+
+
+def test_batch_jobs_fail_fast(
+    invoke_cli: CLIInvoker, contexts: List[typer.Context]
+) -> None:
+    result = invoke_cli(
+        ["batch", "-", "--jobs", "2", "--fail-fast"],
+        input="record first --fail\nrecord second\nrecord third\nrecord fourth\n",
+    )
+    assert result.exit_code == 3
+    assert result.stdout.splitlines()[0] == "first: site=None"
+    assert "anaconda batch: 1 commands, 1 failed" in result.stderr
@@ -0,0 +1,176 @@
+from pathlib import Path
+from typing import Generator
+from unittest.mock import MagicMock
+
+import pytest
+from pytest import MonkeyPatch
+from pytest_mock import MockerFixture
+
+from anaconda_cli_base import plugin_index
+from anaconda_cli_base.plugin_index import MAIN_GROUP_NAME
+from anaconda_cli_base.plugin_index import PLUGIN_GROUP_NAME
+from anaconda_cli_base.plugin_index import IndexedEntryPoint
+from anaconda_cli_base.plugin_index import get_entry_points
+from anaconda_cli_base.plugin_index import load_index
+
+
+@pytest.fixture(autouse=True)
+def clear_index() -> Generator[None, None, None]:
+    load_index.cache_clear()
+    yield
+    load_index.cache_clear()
+
+
+@pytest.fixture
+def scan(mocker: MockerFixture) -> MagicMock:
+    groups = {
+        PLUGIN_GROUP_NAME: [
+            IndexedEntryPoint(
+                name="plugin",
+                value="plugin.cli:app",
+                group=PLUGIN_GROUP_NAME,
+                dist_name="plugin-dist",
+                dist_version="1.2.3",
+            )
+        ],
+        MAIN_GROUP_NAME: [],
+    }
+    return mocker.patch.object(plugin_index, "_scan_entry_points", return_value=groups)
+
+
+def test_index_is_written_and_reused(scan: MagicMock, isolate_cache_dir: Path) -> None:
+    (entry_point,) = get_entry_points(PLUGIN_GROUP_NAME)
+    assert entry_point.name == "plugin"
+    assert entry_point.dist == ("plugin-dist", "1.2.3")
+    assert scan.call_count == 1
+    assert list(isolate_cache_dir.glob("entry-points-*.json"))
+
+    # A new process reads the index from disk instead of scanning
+    load_index.cache_clear()
+    assert get_entry_points(PLUGIN_GROUP_NAME) == (entry_point,)
+    assert scan.call_count == 1
+
+
+def test_index_invalidated_by_install(
+    scan: MagicMock, tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    site_packages = tmp_path / "site-packages"
+    site_packages.mkdir()
+    monkeypatch.syspath_prepend(str(site_packages))
+
+    get_entry_points(PLUGIN_GROUP_NAME)
+    assert scan.call_count == 1
+
+    # Simulate installing a package, which adds a directory to site-packages
+    load_index.cache_clear()
+    (site_packages / "new_package-1.0.dist-info").mkdir()
+    get_entry_points(PLUGIN_GROUP_NAME)
+    assert scan.call_count == 2
+
+
+def test_index_disabled(scan: MagicMock, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("ANACONDA_CLI_DISABLE_CACHE", "1")
+
+    get_entry_points(PLUGIN_GROUP_NAME)
+    load_index.cache_clear()
+    get_entry_points(PLUGIN_GROUP_NAME)
+    assert scan.call_count == 2
+
+
+def test_index_corrupt_file_rescans(scan: MagicMock, isolate_cache_dir: Path) -> None:
+    get_entry_points(PLUGIN_GROUP_NAME)
+    (index_file,) = isolate_cache_dir.glob("entry-points-*.json")
+    index_file.write_text("{not json")
+
+    load_index.cache_clear()
+    get_entry_points(PLUGIN_GROUP_NAME)
+    assert scan.call_count == 2
+
+
+def test_unindexed_group() -> None:
+    with pytest.raises(ValueError):
+        get_entry_points("some.other.group")
+
+
+def test_scan_finds_base_main_entry_point() -> None:
+    groups = plugin_index._scan_entry_points()
+    names = {(ep.name, ep.value) for ep in groups[MAIN_GROUP_NAME]}
+    assert ("anaconda", "anaconda_cli_base.cli:app") in names
+
+
+def test_indexed_entry_point_load() -> None:
+    entry_point = IndexedEntryPoint(
+        name="anaconda", value="anaconda_cli_base:__version__", group=MAIN_GROUP_NAME
+    )
+    from anaconda_cli_base import __version__
+
+    assert entry_point.load() == __version__
+    assert entry_point.module == "anaconda_cli_base"
+    assert entry_point.dist is None
+
+
+def test_plugin_selection(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    config = tmp_path / "config.toml"
+    config.write_text(
+        '[plugin_loading]\nplugins = ["auth", "org"]\nskip_plugins = ["org"]\n'
+    )
+    monkeypatch.setenv("ANACONDA_CONFIG_TOML", str(config))
+    monkeypatch.delenv("ANACONDA_CLI_PLUGINS", raising=False)
+    monkeypatch.delenv("ANACONDA_CLI_SKIP_PLUGINS", raising=False)
+
+    selection = plugin_index.plugin_selection()
+    assert selection.allow == {"auth", "org"}
+    assert selection.skip == {"org"}
+    assert [selection.includes(name) for name in ("auth", "org", "other")] == [
+        True,
+        False,
+        False,
+    ]
+
+    # The environment variables take precedence, each on its own
+    monkeypatch.setenv("ANACONDA_CLI_PLUGINS", "org, other")
+    selection = plugin_index.plugin_selection()
+    assert selection.allow == {"org", "other"}
+    assert selection.skip == {"org"}
+
+    monkeypatch.setenv("ANACONDA_CLI_SKIP_PLUGINS", "other")
+    selection = plugin_index.plugin_selection()
+    assert selection.skip == {"other"}
+    assert selection.includes("org")
+
+
+def test_plugin_selection_defaults(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    config = tmp_path / "config.toml"
+    config.write_text("not [valid toml")
+    monkeypatch.setenv("ANACONDA_CONFIG_TOML", str(config))
+    monkeypatch.delenv("ANACONDA_CLI_PLUGINS", raising=False)
+    monkeypatch.delenv("ANACONDA_CLI_SKIP_PLUGINS", raising=False)
+
+    assert plugin_index.plugin_selection() == plugin_index.PluginSelection()
+
+
+def test_import_budget_set(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    config = tmp_path / "config.toml"
+    monkeypatch.setenv("ANACONDA_CONFIG_TOML", str(config))
+    monkeypatch.delenv("ANACONDA_PLUGIN_LOADING_MAX_IMPORT_MS", raising=False)
+    monkeypatch.delenv("ANACONDA_PLUGIN_LOADING_DEFER_SLOW_PLUGINS", raising=False)
+    config.write_text('[plugin_loading]\nplugins = ["auth"]\n')
+    assert not plugin_index.import_budget_set()
+
+    config.write_text("[plugin_loading]\nmax_import_ms = 100\n")
+    assert plugin_index.import_budget_set()
+
+    config.write_text("")
+    monkeypatch.setenv("anaconda_plugin_loading_defer_slow_plugins", "true")
+    assert plugin_index.import_budget_set()
+
+
+def test_select_entry_points() -> None:
+    entry_points = [
+        IndexedEntryPoint(name, f"{name}:app", PLUGIN_GROUP_NAME)
+        for name in ("a", "b", "c")
+    ]
+    selection = plugin_index.PluginSelection(skip=frozenset({"b"}))
+    selected, skipped = plugin_index.select_entry_points(entry_points, selection)
+    assert [ep.name for ep in selected] == ["a", "c"]
+    assert [ep.name for ep in skipped] == ["b"]
@@ -0,0 +1,180 @@
+from pathlib import Path
+from typing import Any
+from typing import List
+from typing import Union
+from unittest.mock import MagicMock
+
+import pytest
+import typer
+from pytest import MonkeyPatch
+from pytest_mock import MockerFixture
+
+import anaconda_cli_base.cli
+from anaconda_cli_base.exceptions import register_error_handler
+from anaconda_cli_base.retry import Retry
+from anaconda_cli_base.retry import retry_decision
+from .conftest import CLIInvoker
+
+
+class Unavailable(Exception):
+    pass
+
+
+class Flaky(Exception):
+    pass
+
+
+@register_error_handler(Unavailable)
+def retry_unavailable(e: Exception) -> Union[int, Retry]:
+    print(f"handled: {e}")
+    return Retry(max_attempts=3, backoff=0.5, exit_code=75)
+
+
+@register_error_handler(Flaky)
+def retry_flaky(e: Exception) -> Union[int, Retry]:
+    return -1
+
+
+@pytest.fixture
+def contexts(monkeypatch: MonkeyPatch) -> List[typer.Context]:
+    """Register a command failing with the number of attempts left given."""
+    monkeypatch.delenv("ANACONDA_DEFAULT_SITE", raising=False)
+    recorded = []
+
+    @anaconda_cli_base.cli.app.command("attempt")
+    def attempt(ctx: typer.Context, failures: int, flaky: bool = False) -> None:
+        recorded.append(ctx)
+        if len(recorded) <= failures:
+            raise Flaky("again") if flaky else Unavailable(f"attempt {len(recorded)}")
+        print(f"succeeded on attempt {len(recorded)}")
+
+    return recorded
+
+
+@pytest.fixture
+def sleep(mocker: MockerFixture) -> MagicMock:
+    return mocker.patch("anaconda_cli_base.cli.time.sleep")
+
+
+def test_delay() -> None:
+    retry = Retry(backoff=1.0, multiplier=3.0, max_backoff=5.0)
+    assert [retry.delay(attempt) for attempt in (1, 2, 3)] == [1.0, 3.0, 5.0]
+
+
+@pytest.mark.parametrize("random", [0.0, 0.5, 0.999])
+def test_delay_jitter(mocker: MockerFixture, random: float) -> None:
+    mocker.patch("anaconda_cli_base.retry.random.random", return_value=random)
+    delay = Retry(backoff=2.0, jitter=0.25).delay(1)
+    assert 1.5 < delay <= 2.0
+    assert delay == pytest.approx(2.0 * (1 - 0.25 * random))
+
+
+@pytest.mark.parametrize(
+    "result, expected",
+    [(0, None), (1, None), (-1, Retry()), (Retry(4), Retry(4))],
+)
+def test_retry_decision(result: Union[int, Retry], expected: Retry) -> None:
+    assert retry_decision(result) == expected
+
+
+def test_retry_invokes_callback(
+    invoke_cli: CLIInvoker,
+    contexts: List[typer.Context],
+    sleep: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    record_attempt = mocker.patch("anaconda_cli_base.telemetry._record_attempt")
+    result = invoke_cli(["--at", "example.com", "attempt", "2"])
+    assert result.exit_code == 0, result.stderr
+    assert result.stdout.splitlines() == [
+        "handled: attempt 1",
+        "handled: attempt 2",
+        "succeeded on attempt 3",
+    ]
+    # The failed callback is invoked again in its context, not parsed again
+    assert len({id(ctx) for ctx in contexts}) == 1
+    assert [c.args[0] for c in sleep.call_args_list] == [0.5, 1.0]
+    assert [c.args[1] for c in record_attempt.call_args_list] == [1, 2, 3]
+    _, second, third = record_attempt.call_args_list
+    assert isinstance(second.args[3], Unavailable)
+    assert third.args[3] is None
+
+
+def test_retry_exhausted(
+    invoke_cli: CLIInvoker, contexts: List[typer.Context], sleep: MagicMock
+) -> None:
+    result = invoke_cli(["attempt", "5"])
+    assert result.exit_code == 75
+    assert len(contexts) == 3
+    assert "succeeded" not in result.stdout
+    assert "anaconda --verbose attempt 5" in result.stdout
+
+
+def test_retry_once(
+    invoke_cli: CLIInvoker, contexts: List[typer.Context], sleep: MagicMock
+) -> None:
+    result = invoke_cli(["attempt", "2", "--flaky"])
+    # -1 retries once, and the second error is handled as a failure
+    assert result.exit_code == 1
+    assert len(contexts) == 2
+    sleep.assert_called_once_with(0.0)
+
+
+def test_no_retry_records_no_attempts(
+    invoke_cli: CLIInvoker, mocker: MockerFixture
+) -> None:
+    record_attempt = mocker.patch("anaconda_cli_base.telemetry._record_attempt")
+
+    @anaconda_cli_base.cli.app.command("fail")
+    def fail() -> None:
+        raise ValueError("not retried")
+
+    result = invoke_cli(["fail"])
+    assert result.exit_code == 1
+    record_attempt.assert_not_called()
+
+
+def test_retry_reads_file_argument(
+    invoke_cli: CLIInvoker, sleep: MagicMock, tmp_path: Path
+) -> None:
+    # The file click opened for the argument is still open for the retry
+    source = tmp_path / "source.txt"
+    source.write_text("contents\n")
+    attempts = []
+
+    @anaconda_cli_base.cli.app.command("read")
+    def read(source: typer.FileText) -> None:
+        attempts.append(source)
+        if len(attempts) == 1:
+            raise Flaky("again")
+        print(source.read(), end="")
+
+    result = invoke_cli(["read", str(source)])
+    assert result.exit_code == 0, result.stdout
+    assert result.stdout == "contents\n"
+    assert len(attempts) == 2
+    assert attempts[0].closed
+
+
+def test_retry_outside_callback(
+    invoke_cli: CLIInvoker,
+    contexts: List[typer.Context],
+    sleep: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    # An error raised before the callback runs the whole command again
+    group = anaconda_cli_base.cli.ErrorHandledGroup
+    resolve_command = group.resolve_command
+    calls = []
+
+    def fail_first(self: Any, ctx: Any, args: List[str]) -> Any:
+        calls.append(args)
+        if len(calls) == 1:
+            raise Flaky("not loaded")
+        return resolve_command(self, ctx, args)
+
+    mocker.patch.object(group, "resolve_command", fail_first)
+    result = invoke_cli(["attempt", "0"])
+    assert result.exit_code == 0, result.stdout
+    assert result.stdout == "succeeded on attempt 1\n"
+    assert len(calls) == 2
@@ -0,0 +1,175 @@
+import io
+import json
+import os
+import threading
+from typing import Any
+from typing import Dict
+from typing import List
+
+import pytest
+import typer
+from pytest import MonkeyPatch
+
+import anaconda_cli_base.cli
+from anaconda_cli_base import lifecycle
+from anaconda_cli_base.exceptions import ERROR_HANDLERS
+from anaconda_cli_base.serve import INVALID_PARAMS
+from anaconda_cli_base.serve import INVALID_REQUEST
+from anaconda_cli_base.serve import METHOD_NOT_FOUND
+from anaconda_cli_base.serve import PARSE_ERROR
+from anaconda_cli_base.serve import Server
+from .conftest import CLIInvoker
+
+
+class RecordError(Exception):
+    pass
+
+
+def handle_record_error(e: Exception) -> int:
+    print(f"handled: {e}")
+    return 4
+
+
+@pytest.fixture
+def record(monkeypatch: MonkeyPatch) -> None:
+    """Register a command which prints its input, and fails if asked to."""
+    # Set by --at in other tests
+    monkeypatch.delenv("ANACONDA_DEFAULT_SITE", raising=False)
+    monkeypatch.setitem(ERROR_HANDLERS, RecordError, handle_record_error)
+
+    @anaconda_cli_base.cli.app.command("record")
+    def record(
+        fail: bool = False, error: bool = False, read: bool = False, err: str = ""
+    ) -> None:
+        print(f"site={os.getenv('ANACONDA_DEFAULT_SITE')}")
+        if read:
+            print(f"stdin={input()}")
+        if err:
+            typer.echo(err, err=True)
+        if error:
+            raise RecordError("broken")
+        if fail:
+            raise typer.Exit(3)
+
+
+def request(id_: Any, method: str, **params: Any) -> str:
+    return json.dumps({"jsonrpc": "2.0", "id": id_, "method": method, "params": params})
+
+
+def serve(lines: List[str]) -> List[Dict[str, Any]]:
+    output = io.StringIO()
+    server = Server(
+        typer.main.get_command(anaconda_cli_base.cli.app),
+        io.StringIO("".join(line + "\n" for line in lines)),
+        output,
+    )
+    assert server.serve() == 0
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_serve_run(record: None) -> None:
+    responses = serve(
+        [
+            request(1, "run", args=["record", "--err", "warning"]),
+            request(2, "run", args=["record", "--fail"]),
+            request(3, "run", args=["--at", "example.com", "record"]),
+            request(4, "run", args=["record", "--read"], stdin="text\n"),
+            request(5, "run", args=["record"], env={"ANACONDA_DEFAULT_SITE": "env"}),
+            request(6, "run", args=["record"]),
+        ]
+    )
+    results = [response["result"] for response in responses]
+    assert [response["id"] for response in responses] == [1, 2, 3, 4, 5, 6]
+    assert [result["exit_code"] for result in results] == [0, 3, 0, 0, 0, 0]
+    assert [result["error"] for result in results] == [None] * 6
+    assert [result["stdout"] for result in results] == [
+        "site=None\n",
+        "site=None\n",
+        "site=example.com\n",
+        "site=None\nstdin=text\n",
+        "site=env\n",
+        "site=None\n",
+    ]
+    assert results[0]["stderr"] == "warning\n"
+    assert all(result["duration_ms"] >= 0 for result in results)
+
+
+def test_serve_run_errors(record: None) -> None:
+    handled, usage = (
+        response["result"]
+        for response in serve(
+            [
+                request(1, "run", args=["record", "--error"]),
+                request(2, "run", args=["no-such-command"]),
+            ]
+        )
+    )
+    assert handled["exit_code"] == 4
+    assert handled["stdout"].startswith("site=None\nhandled: broken\n")
+    assert handled["error"] == {
+        "type": "RecordError",
+        "module": __name__,
+        "message": "broken",
+        "handler": f"{__name__}.handle_record_error",
+        "exit_code": 4,
+    }
+    assert usage["exit_code"] == 2
+    assert "No such command 'no-such-command'" in usage["stderr"]
+    # NoSuchCommand is a UsageError of its own in older click versions
+    assert usage["error"]["type"] in ("UsageError", "NoSuchCommand")
+    assert usage["error"]["handler"] is None
+
+
+def test_serve_protocol_errors(record: None) -> None:
+    responses = serve(
+        [
+            "not json",
+            json.dumps({"id": 1, "method": "run"}),
+            request(2, "no-such-method"),
+            request(3, "run", args="record"),
+            request(4, "run", args=["record"], cwd="/no/such/directory"),
+            json.dumps({"jsonrpc": "2.0", "id": 5, "method": "run", "params": []}),
+            # A notification is not answered
+            json.dumps({"jsonrpc": "2.0", "method": "run", "params": {"args": []}}),
+            request(6, "shutdown"),
+            request(7, "run", args=["record"]),
+        ]
+    )
+    assert [(r["id"], r.get("error", {}).get("code")) for r in responses] == [
+        (None, PARSE_ERROR),
+        (1, INVALID_REQUEST),
+        (2, METHOD_NOT_FOUND),
+        (3, INVALID_PARAMS),
+        (4, INVALID_PARAMS),
+        (5, INVALID_PARAMS),
+        (6, None),
+    ]
+
+
+def test_serve_stop() -> None:
+    read_fd, write_fd = os.pipe()
+    with os.fdopen(read_fd) as input, os.fdopen(write_fd, "w"):
+        server = Server(None, input, io.StringIO())
+        threading.Timer(0.1, server.stop).start()
+        # The pipe stays open, so only stop() ends serve()
+        assert server.serve() == 0
+
+
+def test_serve_cli(
+    invoke_cli: CLIInvoker, record: None, monkeypatch: MonkeyPatch
+) -> None:
+    # Leave the signal handlers and shutdown hooks of the test process alone
+    monkeypatch.setattr(lifecycle, "_handlers_installed", True)
+    monkeypatch.setattr(lifecycle, "_hooks", [])
+
+    result = invoke_cli(["serve", "--stdio"], input=request(1, "run", args=["record"]))
+    assert result.exit_code == 0, result.stderr
+    response = json.loads(result.stdout)
+    assert response["result"]["stdout"] == "site=None\n"
+    assert len(lifecycle._hooks) == 1
+
+
+def test_serve_requires_stdio(invoke_cli: CLIInvoker) -> None:
+    result = invoke_cli(["serve"])
+    assert result.exit_code == 2
+    assert "only the --stdio transport is supported" in result.stderr
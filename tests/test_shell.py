@@ -0,0 +1,89 @@
+import io
+import os
+import re
+from typing import List
+
+import pytest
+import typer
+from pytest import MonkeyPatch
+
+import anaconda_cli_base.cli
+from anaconda_cli_base.shell import Shell
+from .conftest import CLIInvoker
+
+
+@pytest.fixture
+def contexts(monkeypatch: MonkeyPatch) -> List[typer.Context]:
+    """Register a command which records its context, and fails if asked to."""
+    # Set by --at in other tests
+    monkeypatch.delenv("ANACONDA_DEFAULT_SITE", raising=False)
+    recorded = []
+
+    @anaconda_cli_base.cli.app.command("record")
+    def record(ctx: typer.Context, fail: bool = False) -> None:
+        recorded.append(ctx)
+        print(f"site={os.getenv('ANACONDA_DEFAULT_SITE')}")
+        if fail:
+            raise typer.Exit(3)
+
+    return recorded
+
+
+@pytest.fixture
+def shell(contexts: List[typer.Context]) -> Shell:
+    return Shell(typer.main.get_command(anaconda_cli_base.cli.app))
+
+
+def test_shell_survives_errors(
+    invoke_cli: CLIInvoker, contexts: List[typer.Context]
+) -> None:
+    result = invoke_cli(
+        ["shell"],
+        input=(
+            "record --fail\n"
+            "no-such-command\n"
+            "record --no-such-option\n"
+            "record 'unbalanced\n"
+            "--at example.com record\n"
+            "anaconda record\n"
+        ),
+    )
+    assert result.exit_code == 0, result.stdout
+    assert len(contexts) == 3
+    assert "No such command 'no-such-command'" in result.stderr
+    # Worded differently between click versions
+    assert re.search(r"No such option:? '?--no-such-option", result.stderr)
+    assert "No closing quotation" in result.stderr
+    # --at does not leak into the next command
+    assert result.stdout.splitlines() == [
+        "site=None",
+        "site=example.com",
+        "site=None",
+    ]
+
+
+def test_shell_exit_code(shell: Shell, contexts: List[typer.Context]) -> None:
+    shell.stdin = io.StringIO("record --fail\n")
+    assert shell.run() == 3
+
+    shell.stdin = io.StringIO("record --fail\nrecord\n")
+    assert shell.run() == 0
+
+    shell.stdin = io.StringIO("exit 4\nrecord\n")
+    assert shell.run() == 4
+    assert len(contexts) == 3
+
+
+def test_shell_timing(invoke_cli: CLIInvoker, contexts: List[typer.Context]) -> None:
+    result = invoke_cli(["shell", "--timing"], input="record\nrecord --fail\n")
+    assert result.exit_code == 3
+    assert "[exit code 0 in " in result.stderr
+    assert "[exit code 3 in " in result.stderr
+
+
+def test_shell_completions(shell: Shell, contexts: List[typer.Context]) -> None:
+    assert shell.completions("rec") == ["record"]
+    assert shell.completions("anaconda some-") == ["some-test-subcommand"]
+    assert shell.completions("record --f") == ["--fail"]
+    assert "record" in shell.completions("")
+    assert shell.completions("record --") == ["--fail", "--no-fail", "--help"]
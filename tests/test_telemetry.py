@@ -224,6 +224,82 @@ class TestDetection:
 
         assert _detect_tty() is False
 
+    def test_plugin_versions_read_from_index(self, mocker: MockerFixture) -> None:
+        from anaconda_cli_base import __version__
+        from anaconda_cli_base import plugin_index
+        from anaconda_cli_base.telemetry import _get_plugin_versions
+
+        entry_point = plugin_index.IndexedEntryPoint(
+            name="plugin",
+            value="plugin.cli:app",
+            group=plugin_index.PLUGIN_GROUP_NAME,
+            dist_name="plugin-dist",
+            dist_version="1.2.3",
+        )
+        mocker.patch.object(
+            plugin_index, "get_entry_points", return_value=(entry_point,)
+        )
+        plugin_index.plugin_versions.cache_clear()
+        try:
+            assert _get_plugin_versions() == {
+                "anaconda-cli-base": __version__,
+                "plugin-dist": "1.2.3",
+            }
+        finally:
+            plugin_index.plugin_versions.cache_clear()
+
+
+class TestSession:
+    def test_session_flushes_once(
+        self, monkeypatch: MonkeyPatch, mocker: MockerFixture
+    ) -> None:
+        import anaconda_cli_base.telemetry as mod
+
+        monkeypatch.setattr(mod, "_initialized", True)
+        monkeypatch.setitem(sys.modules, "anaconda_opentelemetry", mocker.MagicMock())
+        shutdown = mocker.patch.object(mod, "shutdown_telemetry")
+
+        with mod.session():
+            for command in ("first", "second"):
+                info = mod._CommandInfo(command=command, plugin="root", flags="")
+                mod._after_command(info, success=True)
+            assert shutdown.call_count == 0
+
+            with mod.session():
+                pass
+            assert shutdown.call_count == 0
+
+        shutdown.assert_called_once_with()
+        assert mod._session_active is False
+
+    def test_after_command_flushes_outside_session(
+        self, monkeypatch: MonkeyPatch, mocker: MockerFixture
+    ) -> None:
+        import anaconda_cli_base.telemetry as mod
+
+        monkeypatch.setattr(mod, "_initialized", True)
+        monkeypatch.setitem(sys.modules, "anaconda_opentelemetry", mocker.MagicMock())
+        shutdown = mocker.patch.object(mod, "shutdown_telemetry")
+
+        info = mod._CommandInfo(command="first", plugin="root", flags="")
+        mod._after_command(info, success=True)
+        shutdown.assert_called_once_with()
+
+    def test_after_fork_resets_state(self, monkeypatch: MonkeyPatch) -> None:
+        import anaconda_cli_base.telemetry as mod
+
+        lock = mod._lock
+        monkeypatch.setattr(mod, "_lock", lock)
+        monkeypatch.setattr(mod, "_initialized", True)
+        monkeypatch.setattr(mod, "_session_active", True)
+        with lock:
+            mod._after_fork()
+            assert not mod._lock.locked()
+
+        assert mod._lock is not lock
+        assert mod._initialized is False
+        assert mod._session_active is False
+
 
 class TestHttpSuppression:
     def test_suppress_http_spans(self) -> None: